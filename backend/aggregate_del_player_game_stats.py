@@ -3,7 +3,6 @@
 
 import os
 import csv
-import json
 import yaml
 import argparse
 from datetime import timedelta
@@ -13,6 +12,9 @@ from collections import defaultdict
 from dateutil.parser import parse
 
 from utils import calculate_age, iso_country_codes, get_season
+from pipeline_data import is_held, read_json, write_json
+from sqlite_store import open_store_table
+from shot_table import get_shot_lookup
 
 # loading external configuration
 CONFIG = yaml.safe_load(open(os.path.join(
@@ -20,7 +22,6 @@ CONFIG = yaml.safe_load(open(os.path.join(
 
 PLAYER_GAME_STATS_SRC = 'del_player_game_stats.json'
 GOALIE_GAME_STATS_SRC = 'del_goalie_game_stats.json'
-SHOTS_DATA_SRC = 'del_shots.json'
 AGGREGATED_PLAYER_STATS_TGT = 'del_player_game_stats_aggregated.json'
 AGGREGATED_GOALIE_STATS_TGT = 'del_goalie_game_stats_aggregated.json'
 PLAYER_PERSONAL_DATA_TGT = 'del_player_personal_data.json'
@@ -141,13 +142,7 @@ def get_shot_stats(player_id, team, season_type, shot_data):
     all_shots = 0
     on_goal = 0
 
-    for shot in shot_data:
-        if shot['player_id'] != player_id:
-            continue
-        if shot['team'] != team:
-            continue
-        if shot['season_type'] != season_type:
-            continue
+    for shot in shot_data.find(player_id=player_id, team=team, season_type=season_type):
         all_shots += 1
         if "goal" in shot['target_type']:
             on_goal += 1
@@ -249,7 +244,6 @@ if __name__ == '__main__':
     tgt_dir = os.path.join(CONFIG['tgt_processing_dir'], str(season))
 
     src_path = os.path.join(tgt_dir, PLAYER_GAME_STATS_SRC)
-    shot_src_path = os.path.join(tgt_dir, SHOTS_DATA_SRC)
     goalie_src_path = os.path.join(tgt_dir, GOALIE_GAME_STATS_SRC)
     tgt_path = os.path.join(tgt_dir, AGGREGATED_PLAYER_STATS_TGT)
     tgt_goalies_path = os.path.join(tgt_dir, AGGREGATED_GOALIE_STATS_TGT)
@@ -257,11 +251,25 @@ if __name__ == '__main__':
         tgt_dir, AGGREGATED_PLAYER_STATS_TGT.replace('json', 'csv'))
     tgt_personal_data_path = os.path.join(tgt_dir, PLAYER_PERSONAL_DATA_TGT)
 
-    # loading collected single-game player data
-    last_modified, player_game_stats = json.loads(open(src_path).read())
-    goalie_game_stats = json.loads(open(goalie_src_path).read())
+    # loading collected single-game player data, retrieving only data for
+    # the specified time frame if it is available from the store
+    player_games = open_store_table(tgt_dir, 'player_games')
+    goalie_games = open_store_table(tgt_dir, 'goalie_games')
+    if (
+        (from_date is not None or to_date is not None) and
+        player_games is not None and goalie_games is not None and
+        not is_held(src_path) and not is_held(goalie_src_path)
+    ):
+        from_day = from_date.date() if from_date is not None else None
+        to_day = to_date.date() if to_date is not None else None
+        last_modified, = player_games.get_header()
+        player_game_stats = player_games.find_between(from_day, to_day)
+        goalie_game_stats = goalie_games.find_between(from_day, to_day)
+    else:
+        last_modified, player_game_stats = read_json(src_path)
+        goalie_game_stats = read_json(goalie_src_path)
     # loading shot data
-    shot_data = json.loads(open(shot_src_path).read())
+    shot_data = get_shot_lookup(tgt_dir)
 
     print("+ %d player-in-game items collected overall" % len(
         player_game_stats))
@@ -511,9 +519,9 @@ if __name__ == '__main__':
         tgt_path = os.path.join(tgt_dir, adjusted_player_stats_tgt)
         tgt_csv_path = os.path.join(tgt_dir, adjusted_player_stats_tgt.replace('json', 'csv'))
 
-    open(tgt_path, 'w').write(json.dumps(output, indent=2, default=convert_to_minutes))
-    open(tgt_goalies_path, 'w').write(json.dumps(aggregated_goalie_stats, indent=2, default=convert_to_minutes))
-    open(tgt_personal_data_path, 'w').write(json.dumps(output_personal_data, indent=2))
+    write_json(tgt_path, output, default=convert_to_minutes)
+    write_json(tgt_goalies_path, aggregated_goalie_stats, default=convert_to_minutes)
+    write_json(tgt_personal_data_path, output_personal_data)
 
     keys = aggregated_stats_as_list[0].keys()
 
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import yaml
+import argparse
+import tempfile
+
+import download_game_data
+import download_team_data
+
+from download_engine import AdaptiveLimiter, run_downloads
+from mock_del_api import start_mock_server
+from schedule_index import load_schedule_index
+
+# loading external configuration
+CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
+
+
+def get_benchmark_config(config, api_url, del_url, tgt_base_dir):
+    """
+    Sets up copy of specified configuration pointing to the mock server and
+    a temporary target directory.
+    """
+    benchmark_config = dict(config)
+    benchmark_config['base_url'] = api_url
+    benchmark_config['del_base_url'] = del_url
+    benchmark_config['tgt_base_dir'] = tgt_base_dir
+
+    return benchmark_config
+
+
+def get_team_download_tasks(seasons, config):
+    """
+    Sets up download tasks for all team data using the task builder of the
+    team data download script.
+    """
+    download_tasks = list()
+    for category in download_team_data.CATEGORIES:
+        for season in seasons:
+            download_tasks.extend(download_team_data.get_download_tasks(
+                category, season, list(config['game_types'].keys()), config['teams'], config))
+
+    return download_tasks
+
+
+def get_game_download_tasks(seasons, categories, config):
+    """
+    Sets up download tasks for game data of all games registered in
+    previously downloaded schedules using the task builder of the game data
+    download script.
+    """
+    schedule_src_dir = os.path.join(config['tgt_base_dir'], 'schedules')
+    schedule_index = load_schedule_index(schedule_src_dir)
+
+    download_tasks = list()
+    for season in seasons:
+        for game_type in config['game_types']:
+            games_and_teams, game_dates = download_game_data.get_game_ids_dates_and_teams(
+                schedule_src_dir, season, game_type, schedule_index=schedule_index)
+            for category in categories:
+                download_tasks.extend(download_game_data.get_download_tasks(
+                    category, season, game_type, games_and_teams, game_dates, config))
+
+    return download_tasks
+
+
+def time_downloads(
+        download_tasks, last_modified_dict, max_connections, max_per_host, rate_limit, adaptive, transform=None):
+    """
+    Runs specified download tasks and measures wall time as well as the
+    number of files retrieved per second.
+    """
+    limiter = AdaptiveLimiter(max_connections) if adaptive else None
+    start = time.perf_counter()
+    results = run_downloads(
+        download_tasks, last_modified_dict, max_connections, max_per_host, rate_limit,
+        transform=transform, quiet=True, limiter=limiter)
+    wall_time = time.perf_counter() - start
+
+    return {
+        'final_limit': limiter.limit if limiter is not None else max_connections,
+        'tasks': len(download_tasks),
+        'downloaded': len([result for result in results if result.status == 200]),
+        'not_modified': len([result for result in results if result.status == 304]),
+        'failed': len(download_tasks) - len([result for result in results if result.status in (200, 304)]),
+        'wall_time': round(wall_time, 3),
+        'files_per_sec': round(len(results) / wall_time, 1) if wall_time else 0,
+    }
+
+
+def run_benchmark(api_url, del_url, seasons, categories, max_connections, max_per_host, rate_limit, adaptive):
+    """
+    Runs full and subsequent incremental download of team and game data
+    using the specified concurrency settings.
+    """
+    benchmark = dict()
+
+    with tempfile.TemporaryDirectory() as tgt_base_dir:
+        config = get_benchmark_config(CONFIG, api_url, del_url, tgt_base_dir)
+        last_modified_dict = dict()
+
+        for download_pass in ['full', 'incremental']:
+            # team data has to be downloaded first to retrieve the games to download data for
+            team_tasks = get_team_download_tasks(seasons, config)
+            benchmark[(download_pass, 'team_data')] = time_downloads(
+                team_tasks, last_modified_dict, max_connections, max_per_host, rate_limit, adaptive,
+                download_team_data.sort_roster_stats)
+            game_tasks = get_game_download_tasks(seasons, categories, config)
+            benchmark[(download_pass, 'game_data')] = time_downloads(
+                game_tasks, last_modified_dict, max_connections, max_per_host, rate_limit, adaptive)
+
+    return benchmark
+
+
+if __name__ == '__main__':
+
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(description='Benchmark DEL data download against a local mock server.')
+    parser.add_argument(
+        '-s', '--seasons', dest='seasons', required=False, type=int, nargs='+', metavar='seasons to download',
+        default=[CONFIG['default_season']], choices=CONFIG['seasons'],
+        help="The seasons for which data will be downloaded")
+    parser.add_argument(
+        '--categories', dest='categories', required=False, nargs='+', metavar='game data categories',
+        default=download_game_data.CATEGORIES, choices=download_game_data.CATEGORIES,
+        help="The game data categories to be downloaded")
+    parser.add_argument(
+        '--max_connections', dest='max_connections', required=False, type=int, nargs='+',
+        default=[1, 4, 8, 16], metavar='numbers of concurrent connections',
+        help="The maximum numbers of concurrent connections to benchmark")
+    parser.add_argument(
+        '--max_per_host', dest='max_per_host', required=False, type=int,
+        metavar='maximum number of concurrent connections per host',
+        help="The maximum number of concurrent connections to a single host (default: no separate limit)")
+    parser.add_argument(
+        '--rate_limit', dest='rate_limit', required=False, type=float, default=0,
+        metavar='maximum number of requests per second',
+        help="The maximum number of requests per second (0 for no limit)")
+    parser.add_argument(
+        '--adaptive', dest='adaptive', required=False, action='store_true',
+        help="Adjust number of concurrent requests dynamically (with maximum number of connections as upper bound)")
+    parser.add_argument(
+        '--latency', dest='latency', required=False, type=float, default=0.05, metavar='latency in seconds',
+        help="Latency added to each response by the mock server")
+    parser.add_argument(
+        '--jitter', dest='jitter', required=False, type=float, default=0.0, metavar='jitter in seconds',
+        help="Maximum random deviation from the specified latency")
+    parser.add_argument(
+        '--modified_ratio', dest='modified_ratio', required=False, type=float, default=0.1,
+        metavar='ratio of modified data',
+        help="Ratio of data considered modified in incremental downloads")
+    parser.add_argument(
+        '--not_found_ratio', dest='not_found_ratio', required=False, type=float, default=0.0,
+        metavar='ratio of missing data',
+        help="Ratio of data missing from the JSON API")
+    parser.add_argument(
+        '--error_ratio', dest='error_ratio', required=False, type=float, default=0.0,
+        metavar='ratio of server errors',
+        help="Ratio of requests randomly answered with server errors")
+    parser.add_argument(
+        '--payload_dir', dest='payload_dir', required=False, metavar='directory with recorded payloads',
+        help="Directory with recorded payloads served by the mock server")
+    parser.add_argument(
+        '--report', dest='report', required=False, metavar='path to benchmark report',
+        help="Path to save benchmark results as JSON")
+
+    args = parser.parse_args()
+
+    server = start_mock_server(
+        payload_dir=args.payload_dir, latency=args.latency, jitter=args.jitter,
+        modified_ratio=args.modified_ratio, not_found_ratio=args.not_found_ratio, error_ratio=args.error_ratio)
+    api_url, del_url = server.get_base_urls()
+    print("+ Using mock server at %s" % api_url)
+
+    benchmark_results = list()
+
+    try:
+        for max_connections in args.max_connections:
+            max_per_host = args.max_per_host or max_connections
+            benchmark = run_benchmark(
+                api_url, del_url, args.seasons, args.categories, max_connections, max_per_host, args.rate_limit,
+                args.adaptive)
+            for (download_pass, data_type), result in benchmark.items():
+                print(
+                    "+ %2d connections, %-11s %-9s: %5d files in %7.2f s "
+                    "(%6.1f files/sec, %d failed, final limit %d)" % (
+                        max_connections, download_pass, data_type, result['tasks'],
+                        result['wall_time'], result['files_per_sec'], result['failed'], result['final_limit']))
+                benchmark_results.append({
+                    'max_connections': max_connections, 'max_per_host': max_per_host,
+                    'rate_limit': args.rate_limit, 'adaptive': args.adaptive, 'pass': download_pass,
+                    'data_type': data_type, **result})
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    if args.report:
+        open(args.report, 'w').write(json.dumps(benchmark_results, indent=2))
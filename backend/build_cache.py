@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import ast
+import json
+import yaml
+import hashlib
+
+from collections import defaultdict
+
+from data_archive import CATEGORIES, get_raw_data_paths, find_packed_data
+from schedule_index import get_games
+
+# loading external configuration
+CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
+
+SRC_DIR = os.path.dirname(os.path.realpath(__file__))
+BUILD_CACHE_TGT = 'build_cache.json'
+BUILD_CHANGES_DIR = 'build_changes'
+
+# configuration settings affecting the results of data processing
+PROCESSING_CONFIG_KEYS = ['base_data_dir', 'tgt_processing_dir', 'game_types', 'teams']
+
+
+def get_code_fingerprint(script, src_dir=SRC_DIR):
+    """
+    Gets fingerprint of the source code of specified script and all local
+    modules it (indirectly) imports.
+    """
+    sources = dict()
+    to_visit = [os.path.splitext(script)[0]]
+
+    while to_visit:
+        module = to_visit.pop()
+        if module in sources:
+            continue
+        src_path = os.path.join(src_dir, "%s.py" % module)
+        # skipping modules from the standard library or third-party packages
+        if not os.path.isfile(src_path):
+            continue
+        sources[module] = open(src_path, 'rb').read()
+        for node in ast.walk(ast.parse(sources[module])):
+            if isinstance(node, ast.Import):
+                to_visit.extend([alias.name.split('.')[0] for alias in node.names])
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                to_visit.append(node.module.split('.')[0])
+
+    digest = hashlib.sha1()
+    for module in sorted(sources):
+        digest.update(module.encode('utf-8'))
+        digest.update(sources[module])
+
+    return digest.hexdigest()
+
+
+def get_config_fingerprint(config=CONFIG):
+    """
+    Gets fingerprint of all configuration settings affecting the results of
+    data processing.
+    """
+    relevant_config = {key: config.get(key) for key in PROCESSING_CONFIG_KEYS}
+
+    return hashlib.sha1(json.dumps(relevant_config, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class BuildCache():
+    """
+    Persisted fingerprints of the inputs each processing stage was last run
+    with, i.e. its code and configuration, further raw data and the raw data
+    of each game. Digests of raw data files are re-used as long as the files
+    haven't been modified.
+    """
+    def __init__(self, cache_path, base_data_dir=CONFIG['base_data_dir']):
+        self.cache_path = cache_path
+        self.base_data_dir = base_data_dir
+        if os.path.isfile(cache_path):
+            cache = json.loads(open(cache_path).read())
+        else:
+            cache = dict()
+        self.files = cache.get('files', dict())
+        self.stages = cache.get('stages', dict())
+
+    def get_raw_data_digest(self, src_path):
+        """
+        Gets digest of JSON raw data originally stored at specified path, as
+        read from the corresponding pack (if available) or from the original
+        file.
+        """
+        packed_data = find_packed_data(src_path, self.base_data_dir)
+        # packed data is compressed already and therefore digested right away
+        if packed_data is not None:
+            pack, offset, length = packed_data
+            return hashlib.sha1(pack[offset:offset + length]).hexdigest()
+
+        # re-using digest of original file if it hasn't been modified since
+        stat = os.stat(src_path)
+        if src_path in self.files and self.files[src_path][:2] == [stat.st_size, stat.st_mtime]:
+            return self.files[src_path][2]
+        digest = hashlib.sha1(open(src_path, 'rb').read()).hexdigest()
+        self.files[src_path] = [stat.st_size, stat.st_mtime, digest]
+
+        return digest
+
+    def get_game_fingerprints(self, season, schedule_index):
+        """
+        Gets fingerprints of all raw data (and the indexed schedule
+        information) for each game of specified season. Returns fingerprints
+        and game types by game id.
+        """
+        game_data = defaultdict(list)
+        game_types = dict()
+
+        for category in CATEGORIES:
+            for src_path in get_raw_data_paths(self.base_data_dir, category, season):
+                game_type_dir, file_name = os.path.split(src_path)
+                game_id = int(os.path.splitext(file_name)[0].split('_')[0])
+                game_data[game_id].append((category, file_name, self.get_raw_data_digest(src_path)))
+                game_types[game_id] = int(os.path.basename(game_type_dir))
+
+        for game in get_games(schedule_index, season):
+            # excluding position in full schedule that shifts with each added game
+            schedule_data = {key: value for key, value in game.items() if key != 'position'}
+            game_data[game['game_id']].append(('schedule', json.dumps(schedule_data, sort_keys=True)))
+            game_types.setdefault(game['game_id'], game['game_type'])
+
+        game_fingerprints = dict()
+        for game_id, data in game_data.items():
+            digest = hashlib.sha1(json.dumps(sorted(data)).encode('utf-8'))
+            game_fingerprints[game_id] = (digest.hexdigest(), game_types[game_id])
+
+        return game_fingerprints
+
+    def get_changed_games(self, stage_name, season, game_fingerprints):
+        """
+        Gets games with fingerprints differing from the ones registered for
+        specified stage (or not registered at all), in the form used for
+        download manifests.
+        """
+        registered_games = self.stages.get(stage_name, dict()).get('games', dict())
+        changed_games = dict()
+        for game_id, (fingerprint, game_type) in game_fingerprints.items():
+            if registered_games.get(str(game_id)) != fingerprint:
+                changed_games[game_id] = {'season': int(season), 'game_type': game_type, 'categories': list()}
+
+        return changed_games
+
+    def get_stage_fingerprints(self, stage):
+        """
+        Gets fingerprints of code (and configuration) as well as further raw
+        data the specified stage is based upon.
+        """
+        code_fingerprint = hashlib.sha1(
+            (get_code_fingerprint(stage.script) + get_config_fingerprint()).encode('utf-8')).hexdigest()
+
+        input_data = list()
+        for category in stage.raw_inputs:
+            category_dir = os.path.join(self.base_data_dir, category)
+            for src_dir, dirs, file_names in os.walk(category_dir):
+                dirs.sort()
+                for file_name in sorted(file_names):
+                    if file_name.endswith('.json'):
+                        src_path = os.path.join(src_dir, file_name)
+                        input_data.append((os.path.relpath(src_path, category_dir), self.get_raw_data_digest(src_path)))
+        input_fingerprint = hashlib.sha1(json.dumps(input_data).encode('utf-8')).hexdigest()
+
+        return {'code': code_fingerprint, 'inputs': input_fingerprint}
+
+    def is_modified(self, stage_name, stage_fingerprints, key):
+        """
+        Checks whether specified fingerprint of stage differs from the one
+        registered in the cache.
+        """
+        return self.stages.get(stage_name, dict()).get(key) != stage_fingerprints[key]
+
+    def register_stage(self, stage_name, stage_fingerprints, game_fingerprints):
+        """
+        Registers fingerprints of specified stage and of all games it has
+        (successfully) been run with.
+        """
+        self.stages[stage_name] = {
+            **stage_fingerprints,
+            'games': {str(game_id): fingerprint for game_id, (fingerprint, _) in game_fingerprints.items()}}
+
+    def save(self):
+        cache = {'files': self.files, 'stages': self.stages}
+        open(self.cache_path, 'w').write(json.dumps(cache, indent=2, sort_keys=True))
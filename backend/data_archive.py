@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import mmap
+import zlib
+import yaml
+import struct
+import hashlib
+import argparse
+
+# loading external configuration
+CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
+
+PACK_DIR = 'packs'
+# trailer of each pack file, i.e. a magic marker followed by the offset of
+# the offset index stored at the end of the pack
+PACK_TRAILER = struct.Struct('>4sQ')
+PACK_MAGIC = b'DELP'
+
+# raw data categories that are stored per game and may therefore be packed
+CATEGORIES = [
+    'game_info', 'game_events', 'game_roster', 'game_team_stats',
+    'game_goalies', 'shifts', 'game_player_stats', 'shots', 'faceoffs'
+]
+
+# currently opened packs, i.e. memory-mapped pack files along with their
+# offset index and time of last modification
+OPEN_PACKS = dict()
+
+
+def get_pack_paths(base_data_dir, category, season):
+    """
+    Gets paths to pack file and (previously used) separate offset index for
+    specified category and season.
+    """
+    pack_dir = os.path.join(base_data_dir, PACK_DIR, category)
+    return os.path.join(pack_dir, "%s.pack" % season), os.path.join(pack_dir, "%s.idx.json" % season)
+
+
+def read_pack_index(pack, index_path):
+    """
+    Reads offset index stored at the end of specified memory-mapped pack,
+    falling back to a separate index file for packs created without one.
+    """
+    if len(pack) >= PACK_TRAILER.size:
+        magic, index_offset = PACK_TRAILER.unpack(pack[-PACK_TRAILER.size:])
+        if magic == PACK_MAGIC:
+            return json.loads(pack[index_offset:-PACK_TRAILER.size])
+
+    return json.loads(open(index_path).read())
+
+
+def split_raw_data_path(src_path, base_data_dir):
+    """
+    Splits path to raw data file into category, season and key used in the
+    offset index of the corresponding pack. Returns None if the specified
+    path is not part of the regular raw data layout, i.e.
+    <base_data_dir>/<category>/<season>/<game_type>/<file>.
+    """
+    try:
+        rel_path = os.path.relpath(src_path, base_data_dir)
+    except ValueError:
+        # paths on different drives
+        return
+    tokens = rel_path.split(os.sep)
+    if len(tokens) != 4 or tokens[0] not in CATEGORIES:
+        return
+    category, season, game_type, file_name = tokens
+
+    return category, season, "/".join((game_type, file_name))
+
+
+def get_pack(base_data_dir, category, season):
+    """
+    Gets memory-mapped pack file, offset index and time of last modification
+    for specified category and season. Returns None if no pack is available.
+    """
+    pack_path, index_path = get_pack_paths(base_data_dir, category, season)
+    try:
+        pack_mtime = os.path.getmtime(pack_path)
+    except FileNotFoundError:
+        return
+
+    # re-using previously opened pack unless it has been re-packed since
+    if (category, season) in OPEN_PACKS and OPEN_PACKS[(category, season)][-1] == pack_mtime:
+        return OPEN_PACKS[(category, season)]
+
+    with open(pack_path, 'rb') as pack_file:
+        pack = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+    index = read_pack_index(pack, index_path)
+    OPEN_PACKS[(category, season)] = (pack, index, pack_mtime)
+
+    return OPEN_PACKS[(category, season)]
+
+
+def find_packed_data(src_path, base_data_dir):
+    """
+    Finds location of raw data with specified original path in the
+    corresponding pack. Returns None if the data hasn't been packed or the
+    original file has been modified after packing.
+    """
+    split_path = split_raw_data_path(src_path, base_data_dir)
+    if split_path is None:
+        return
+    category, season, key = split_path
+
+    pack = get_pack(base_data_dir, category, season)
+    if pack is None:
+        return
+    pack, index, pack_mtime = pack
+    if key not in index:
+        return
+
+    # preferring original file if it has been updated after packing
+    try:
+        if os.path.getmtime(src_path) > pack_mtime:
+            return
+    except FileNotFoundError:
+        pass
+
+    offset, length = index[key]
+
+    return pack, offset, length
+
+
+def load_raw_data(src_path, base_data_dir=CONFIG['base_data_dir']):
+    """
+    Loads JSON raw data originally stored at specified path, either from the
+    corresponding pack (if available) or from the original file.
+    """
+    packed_data = find_packed_data(src_path, base_data_dir)
+    if packed_data is None:
+        return json.loads(open(src_path).read())
+
+    pack, offset, length = packed_data
+
+    return json.loads(zlib.decompress(pack[offset:offset + length]))
+
+
+def raw_data_exists(src_path, base_data_dir=CONFIG['base_data_dir']):
+    """
+    Checks whether JSON raw data originally stored at specified path is
+    available, either from the corresponding pack or from the original file.
+    """
+    return os.path.isfile(src_path) or find_packed_data(src_path, base_data_dir) is not None
+
+
+def get_raw_data_mtime(src_path, base_data_dir=CONFIG['base_data_dir']):
+    """
+    Gets time of last modification of JSON raw data originally stored at
+    specified path, either of the original file or the corresponding pack.
+    Returns None if the data isn't available.
+    """
+    if os.path.isfile(src_path):
+        return os.path.getmtime(src_path)
+    packed_data = find_packed_data(src_path, base_data_dir)
+    if packed_data is None:
+        return
+    category, season, _ = split_raw_data_path(src_path, base_data_dir)
+
+    return OPEN_PACKS[(category, season)][-1]
+
+
+def get_raw_data_digest(src_path, base_data_dir=CONFIG['base_data_dir']):
+    """
+    Gets digest of JSON raw data originally stored at specified path, as read
+    from the corresponding pack (if available) or from the original file.
+    """
+    packed_data = find_packed_data(src_path, base_data_dir)
+    if packed_data is not None:
+        pack, offset, length = packed_data
+        return hashlib.sha1(pack[offset:offset + length]).hexdigest()
+
+    return hashlib.sha1(open(src_path, 'rb').read()).hexdigest()
+
+
+def get_raw_data_paths(base_data_dir, category, season):
+    """
+    Gets original paths of all JSON raw data of specified category and season
+    that is available either as original file or from the corresponding pack.
+    """
+    src_dir = os.path.join(base_data_dir, category, str(season))
+    keys = set()
+
+    if os.path.isdir(src_dir):
+        for game_type in os.listdir(src_dir):
+            if not os.path.isdir(os.path.join(src_dir, game_type)):
+                continue
+            for file_name in os.listdir(os.path.join(src_dir, game_type)):
+                if file_name.endswith('.json'):
+                    keys.add("/".join((game_type, file_name)))
+
+    pack = get_pack(base_data_dir, category, str(season))
+    if pack is not None:
+        keys.update(pack[1])
+
+    return [os.path.join(src_dir, *key.split("/")) for key in sorted(keys)]
+
+
+def pack_raw_data(base_data_dir, category, season, remove_files=False):
+    """
+    Packs all raw data files of specified category and season into a single
+    compressed pack file with the offset index stored at its end. The pack is
+    written to a temporary file first and then replaces the existing pack in
+    one go, readers having mapped the previous pack continue to use it along
+    with its own index. Optionally removes original files after packing.
+    """
+    src_dir = os.path.join(base_data_dir, category, str(season))
+    if not os.path.isdir(src_dir):
+        return 0
+
+    pack_path, index_path = get_pack_paths(base_data_dir, category, season)
+    if not os.path.isdir(os.path.dirname(pack_path)):
+        os.makedirs(os.path.dirname(pack_path))
+
+    # retaining data from existing pack that is no longer available as original file
+    index = dict()
+    existing_pack = get_pack(base_data_dir, category, str(season))
+    records = dict()
+    if existing_pack is not None:
+        pack, existing_index, _ = existing_pack
+        for key, (offset, length) in existing_index.items():
+            records[key] = pack[offset:offset + length]
+
+    src_paths = list()
+    for game_type in sorted(os.listdir(src_dir)):
+        for file_name in sorted(os.listdir(os.path.join(src_dir, game_type))):
+            if not file_name.endswith('.json'):
+                continue
+            src_path = os.path.join(src_dir, game_type, file_name)
+            # re-serializing raw data without indentation before compressing it
+            data = json.loads(open(src_path).read())
+            records["/".join((game_type, file_name))] = zlib.compress(
+                json.dumps(data, separators=(',', ':')).encode('utf-8'), 9)
+            src_paths.append(src_path)
+
+    if not records:
+        return 0
+
+    tmp_pack_path = "%s.tmp" % pack_path
+    with open(tmp_pack_path, 'wb') as pack_file:
+        offset = 0
+        for key in sorted(records):
+            pack_file.write(records[key])
+            index[key] = (offset, len(records[key]))
+            offset += len(records[key])
+        pack_file.write(json.dumps(index).encode('utf-8'))
+        pack_file.write(PACK_TRAILER.pack(PACK_MAGIC, offset))
+        pack_file.flush()
+        os.fsync(pack_file.fileno())
+
+    os.replace(tmp_pack_path, pack_path)
+    # removing separate index of a pack created previously
+    if os.path.isfile(index_path):
+        os.remove(index_path)
+
+    if remove_files:
+        for src_path in src_paths:
+            os.remove(src_path)
+
+    return len(records)
+
+
+if __name__ == '__main__':
+
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(description='Pack DEL raw data into compressed archives.')
+    parser.add_argument(
+        '-s', '--season', dest='season', required=False, type=int, metavar='season to pack data for',
+        default=CONFIG['default_season'], choices=CONFIG['seasons'],
+        help="The season for which raw data will be packed")
+    parser.add_argument(
+        '--remove_files', dest='remove_files', required=False, action='store_true',
+        help="Remove original files after packing (only advisable for completed seasons)")
+    parser.add_argument(
+        'categories', metavar='information categories', nargs='+', choices=CATEGORIES + ['all'],
+        help="Information categories (or 'all') to be packed")
+
+    args = parser.parse_args()
+
+    if 'all' in args.categories:
+        categories = CATEGORIES
+    else:
+        categories = args.categories
+
+    for category in categories:
+        print("+ Packing %s data for %d-%d" % (category, args.season, args.season + 1))
+        cnt = pack_raw_data(CONFIG['base_data_dir'], category, args.season, args.remove_files)
+        print("\t+ %d items packed" % cnt)
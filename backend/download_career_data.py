@@ -5,9 +5,11 @@ import os
 import re
 import json
 import yaml
+import argparse
 import requests
 
 from lxml import html
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 
 CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
 
@@ -29,9 +31,170 @@ CURRENT_SEASON = 2020
 
 PLR_IDS_TO_SKIP = [1567]
 
+# default number of concurrent page downloads and of parallel page parsers
+FETCH_WORKERS = 8
+PARSE_WORKERS = os.cpu_count()
+
+
+def fetch_page(session, url):
+    """
+    Retrieves HTML page from specified url.
+    """
+    r = session.get(url)
+    return r.text
+
+
+def get_player_urls(team_page):
+    """
+    Retrieves active players' urls from specified team page.
+    """
+    doc = html.fromstring(team_page)
+    return set(doc.xpath("//div[@class='profile']/ancestor::a/@href"))
+
+
+def parse_career_page(plr_id, player_page, first_name, last_name):
+    """
+    Parses career stats for player with specified id from corresponding player
+    page.
+    """
+    doc = html.fromstring(player_page)
+
+    # retrieving player's position and full name
+    position = full_name = ''
+    position = doc.xpath("//span[@class='position']/text()")
+    if position:
+        position = POSITIONS.get(position.pop(0), 'NA')
+    full_name = doc.xpath("//span[@class='name']/text()")
+    if full_name:
+        full_name = full_name.pop(0)
+
+    # retrieving table rows with career stats from player page
+    trs = doc.xpath("//th[@class='acenlef']/ancestor::tr")
+    # setting up player career stats dictionary
+    plr_career_stats = dict()
+    plr_career_stats['player_id'] = plr_id
+    # setting name of player as retrieved from dictionary of all players
+    plr_career_stats['first_name'] = first_name
+    plr_career_stats['last_name'] = last_name
+    # TODO: check and mark different position from dictionary of all players (?)
+    plr_career_stats['position'] = position
+    plr_career_stats['seasons'] = list()
+    plr_career_stats['career'] = dict()
+
+    # we no longer need to retrieve stats for current season from here as we're doing it separately in
+    # processing step
+
+    # getting stats from previous seasons
+    for tr in trs:
+        single_stat_line = dict()
+        season_season_type_team = tr.xpath("th/span[@class='hidedesktop']/text()")
+        # retrieving season, season type and team from table row
+        if len(season_season_type_team) == 2:
+            season_season_type, team = season_season_type_team
+            if season_season_type.endswith('PO'):
+                season, season_type = season_season_type.split()
+            else:
+                season = season_season_type
+                season_type = 'RS'
+            try:
+                season = int(season.split("/")[0])
+            except ValueError:
+                # print("+ Unable to retrieve season from '%s'" % season)
+                continue
+            single_stat_line['season'] = season
+            single_stat_line['season_type'] = season_type
+            single_stat_line['team'] = team
+        # retrieving full career season from according table rows
+        else:
+            career_type = season_season_type_team.pop(0)
+            if career_type.endswith('Hauptrunden'):
+                season_type = 'RS'
+            elif career_type.endswith('Playoffs'):
+                season_type = 'PO'
+            else:
+                season_type = 'all'
+            single_stat_line['season_type'] = season_type
+
+        # retrieving table cells in table row
+        tds = tr.xpath("td/text()")
+
+        # skipping seasons when player didn't play at all
+        if tds[0].startswith('0'):
+            continue
+
+        # retrieving skater stats
+        if position != 'GK':
+            for category, td in zip(SKATER_CATEGORIES, tds):
+                if not td.endswith('%'):
+                    single_stat_line[category] = int(td)
+                else:
+                    # re-calculating shooting percentage
+                    if single_stat_line['sog']:
+                        single_stat_line[category] = round(
+                            single_stat_line['g'] / single_stat_line['sog'] * 100., 2)
+                    else:
+                        single_stat_line[category] = 0.0
+            single_stat_line['gpg'] = round(single_stat_line['g'] / single_stat_line['gp'], 2)
+            single_stat_line['apg'] = round(single_stat_line['a'] / single_stat_line['gp'], 2)
+            single_stat_line['ptspg'] = round(single_stat_line['pts'] / single_stat_line['gp'], 2)
+        # retrieving goalie stats
+        else:
+            for category, td in zip(GOALIE_CATEGORIES, tds):
+                if category in ['gaa', 'sv_pctg']:
+                    continue
+                if category == 'min':
+                    single_stat_line[category] = td
+                else:
+                    single_stat_line[category] = int(td)
+            else:
+                # transforming minutes string to time on ice in seconds
+                minutes, seconds = [int(t) for t in single_stat_line['min'].split(":")]
+                single_stat_line['toi'] = minutes * 60 + seconds
+                # calculating shots against
+                single_stat_line['sa'] = single_stat_line['sv'] + single_stat_line['ga']
+                # re-calculating save percentage
+                if single_stat_line['sa']:
+                    single_stat_line['sv_pctg'] = round(
+                        100 - single_stat_line['ga'] / single_stat_line['sa'] * 100., 3)
+                # re-calculating goals against average
+                if single_stat_line['ga']:
+                    single_stat_line['gaa'] = round(single_stat_line['ga'] * 3600 / single_stat_line['toi'], 2)
+                else:
+                    single_stat_line['gaa'] = 0
+
+        # adding single season stats to according container
+        if 'season' in single_stat_line:
+            plr_career_stats['seasons'].append(single_stat_line)
+        # adding full career stats to according container
+        else:
+            plr_career_stats['career'][single_stat_line['season_type']] = single_stat_line
+
+    plr_career_stats['seasons'] = list(reversed(plr_career_stats['seasons']))
+    if 'PO' in plr_career_stats['career']:
+        plr_career_stats['career'] = {
+            'RS': plr_career_stats['career']['RS'],
+            'PO': plr_career_stats['career']['PO'],
+            'all': plr_career_stats['career']['all']
+        }
+
+    return plr_career_stats
+
 
 if __name__ == '__main__':
 
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(description='Download DEL player career data.')
+    parser.add_argument(
+        '--fetchers', dest='fetchers', required=False, type=int, default=FETCH_WORKERS,
+        metavar='number of concurrent page downloads',
+        help="The maximum number of player pages downloaded concurrently")
+    parser.add_argument(
+        '--parsers', dest='parsers', required=False, type=int, default=PARSE_WORKERS,
+        metavar='number of parallel page parsers',
+        help="The number of processes used to parse downloaded player pages")
+
+    args = parser.parse_args()
+
     del_base_url = CONFIG['del_base_url']
     team_url_component = CONFIG['url_components']['team_profile']
     teams = CONFIG['teams']
@@ -49,184 +212,95 @@ if __name__ == '__main__':
     tgt_path = os.path.join(tgt_dir, 'pre_season_career_stats.json')
 
     careers = list()
-    # set of processed player ids to avoid duplicate entries in final data set
-    # have to check whether this will lead to problems with legitimate player team changes during the season
-    processed_plr_ids = set()
     # loading players ids where there is an existing career dataset available
     existing_career_datasets = set()
-    pre_season_career_data = json.loads(open(tgt_path).read())
-    for item in pre_season_career_data:
+    if os.path.isfile(tgt_path):
+        existing_careers = json.loads(open(tgt_path).read())
+    else:
+        existing_careers = list()
+    for item in existing_careers:
         existing_career_datasets.add(item['player_id'])
 
-    for team_id in list(teams.keys())[:]:
-        # setting up team page url
-        team_url = "/".join((del_base_url, team_url_component, str(team_id)))
-        print("+ Accessing %s to get links to player pages" % team_url)
-
-        r = requests.get(team_url)
-        doc = html.fromstring(r.text)
-
-        # retrieving active players' urls from team page
-        plr_urls = set(doc.xpath("//div[@class='profile']/ancestor::a/@href"))
-
-        # TODO: download in parallel
-        for plr_url in plr_urls:
-            # setting up complete player page url
-            plr_url = "/".join((del_base_url, plr_url))
-            # retrieving player id from player page url
-            match = re.search(PLR_ID_REGEX, plr_url)
-            if match:
+    # using a single session to re-use connections across all page downloads
+    session = requests.Session()
+    session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=args.fetchers))
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=args.fetchers))
+
+    with ThreadPoolExecutor(max_workers=args.fetchers) as fetchers:
+        # retrieving all team pages concurrently
+        team_urls = ["/".join((del_base_url, team_url_component, str(team_id))) for team_id in teams]
+        for team_url in team_urls:
+            print("+ Accessing %s to get links to player pages" % team_url)
+        team_pages = fetchers.map(lambda team_url: fetch_page(session, team_url), team_urls)
+
+        # collecting player page urls in team order to determine players to download data for
+        # set of processed player ids to avoid duplicate entries in final data set
+        # have to check whether this will lead to problems with legitimate player team changes during the season
+        plr_ids_urls = dict()
+        for team_page in team_pages:
+            for plr_url in sorted(get_player_urls(team_page)):
+                # setting up complete player page url
+                plr_url = "/".join((del_base_url, plr_url))
+                # retrieving player id from player page url
+                match = re.search(PLR_ID_REGEX, plr_url)
+                if not match:
+                    continue
                 plr_id = int(match.group(1))
 
-            # checking whether current player has already been processed in this run, i.e. because he switched
-            # teams but is still registered with both
-            if plr_id in processed_plr_ids:
-                print("=> Career data for player id %d (URL: %s) already collected previously" % (plr_id, plr_url))
-                continue
-
-            # checking whether an existing career dataset is already available for current player
-            if plr_id not in existing_career_datasets:
-                print("+ Downloading new dataset for player id %d from %s" % (plr_id, plr_url))
-            else:
-                continue
-
-            print("+ Collecting data from %s" % plr_url)
-
-            r = requests.get(plr_url)
-            doc = html.fromstring(r.text)
-
-            # retrieving player's position and full name
-            position = full_name = ''
-            position = doc.xpath("//span[@class='position']/text()")
-            if position:
-                position = POSITIONS.get(position.pop(0), 'NA')
-            full_name = doc.xpath("//span[@class='name']/text()")
-            if full_name:
-                full_name = full_name.pop(0)
-
-            # retrieving table rows with career stats from player page
-            trs = doc.xpath("//th[@class='acenlef']/ancestor::tr")
-            # setting up player career stats dictionary
-            plr_career_stats = dict()
-            plr_career_stats['player_id'] = plr_id
-            # retrieving name of player from dictionary of all players
-            plr_career_stats['first_name'] = all_players[str(plr_id)]['first_name']
-            plr_career_stats['last_name'] = all_players[str(plr_id)]['last_name']
-            # TODO: check and mark different position from dictionary of all players (?)
-            plr_career_stats['position'] = position
-            plr_career_stats['seasons'] = list()
-            plr_career_stats['career'] = dict()
-
-            # we no longer need to retrieve stats for current season from here as we're doing it separately in
-            # processing step
-
-            # getting stats from previous seasons
-            for tr in trs:
-                single_stat_line = dict()
-                season_season_type_team = tr.xpath("th/span[@class='hidedesktop']/text()")
-                # retrieving season, season type and team from table row
-                if len(season_season_type_team) == 2:
-                    season_season_type, team = season_season_type_team
-                    if season_season_type.endswith('PO'):
-                        season, season_type = season_season_type.split()
-                    else:
-                        season = season_season_type
-                        season_type = 'RS'
-                    try:
-                        season = int(season.split("/")[0])
-                    except ValueError:
-                        # print("+ Unable to retrieve season from '%s'" % season)
-                        continue
-                    single_stat_line['season'] = season
-                    single_stat_line['season_type'] = season_type
-                    single_stat_line['team'] = team
-                # retrieving full career season from according table rows
-                else:
-                    career_type = season_season_type_team.pop(0)
-                    if career_type.endswith('Hauptrunden'):
-                        season_type = 'RS'
-                    elif career_type.endswith('Playoffs'):
-                        season_type = 'PO'
-                    else:
-                        season_type = 'all'
-                    single_stat_line['season_type'] = season_type
-
-                # retrieving table cells in table row
-                tds = tr.xpath("td/text()")
-
-                # skipping seasons when player didn't play at all
-                if tds[0].startswith('0'):
+                # checking whether current player has already been registered in this run, i.e. because he switched
+                # teams but is still registered with both
+                if plr_id in plr_ids_urls:
+                    print("=> Career data for player id %d (URL: %s) already collected previously" % (
+                        plr_id, plr_url))
                     continue
 
-                # retrieving skater stats
-                if position != 'GK':
-                    for category, td in zip(SKATER_CATEGORIES, tds):
-                        if not td.endswith('%'):
-                            single_stat_line[category] = int(td)
-                        else:
-                            # re-calculating shooting percentage
-                            if single_stat_line['sog']:
-                                single_stat_line[category] = round(
-                                    single_stat_line['g'] / single_stat_line['sog'] * 100., 2)
-                            else:
-                                single_stat_line[category] = 0.0
-                    single_stat_line['gpg'] = round(single_stat_line['g'] / single_stat_line['gp'], 2)
-                    single_stat_line['apg'] = round(single_stat_line['a'] / single_stat_line['gp'], 2)
-                    single_stat_line['ptspg'] = round(single_stat_line['pts'] / single_stat_line['gp'], 2)
-                # retrieving goalie stats
-                else:
-                    for category, td in zip(GOALIE_CATEGORIES, tds):
-                        if category in ['gaa', 'sv_pctg']:
-                            continue
-                        if category == 'min':
-                            single_stat_line[category] = td
-                        else:
-                            single_stat_line[category] = int(td)
-                    else:
-                        # transforming minutes string to time on ice in seconds
-                        minutes, seconds = [int(t) for t in single_stat_line['min'].split(":")]
-                        single_stat_line['toi'] = minutes * 60 + seconds
-                        # calculating shots against
-                        single_stat_line['sa'] = single_stat_line['sv'] + single_stat_line['ga']
-                        # re-calculating save percentage
-                        if single_stat_line['sa']:
-                            single_stat_line['sv_pctg'] = round(
-                                100 - single_stat_line['ga'] / single_stat_line['sa'] * 100., 3)
-                        # re-calculating goals against average
-                        if single_stat_line['ga']:
-                            single_stat_line['gaa'] = round(single_stat_line['ga'] * 3600 / single_stat_line['toi'], 2)
-                        else:
-                            single_stat_line['gaa'] = 0
-
-                # adding single season stats to according container
-                if 'season' in single_stat_line:
-                    plr_career_stats['seasons'].append(single_stat_line)
-                # adding full career stats to according container
-                else:
-                    plr_career_stats['career'][single_stat_line['season_type']] = single_stat_line
-
-            # exporting single player career stats
-            plr_career_stats['seasons'] = list(reversed(plr_career_stats['seasons']))
-            if 'PO' in plr_career_stats['career']:
-                plr_career_stats['career'] = {
-                    'RS': plr_career_stats['career']['RS'],
-                    'PO': plr_career_stats['career']['PO'],
-                    'all': plr_career_stats['career']['all']
-                }
+                # checking whether an existing career dataset is already available for current player
+                if plr_id in existing_career_datasets:
+                    continue
 
-            plr_tgt_path = os.path.join(per_player_tgt_dir, "%d.json" % plr_id)
-            open(plr_tgt_path, 'w').write(json.dumps(plr_career_stats, indent=2))
+                print("+ Downloading new dataset for player id %d from %s" % (plr_id, plr_url))
+                plr_ids_urls[plr_id] = plr_url
+
+        # downloading player pages concurrently and handing them over to a pool of parsers as soon as they arrive,
+        # failures are registered per player without affecting other players
+        failed_plr_ids = dict()
+        with ProcessPoolExecutor(max_workers=args.parsers) as parsers:
+            fetch_tasks = {
+                fetchers.submit(fetch_page, session, plr_url): plr_id for plr_id, plr_url in plr_ids_urls.items()
+            }
+            parse_tasks = dict()
+            for completed_fetch_task in as_completed(fetch_tasks):
+                plr_id = fetch_tasks[completed_fetch_task]
+                try:
+                    player_page = completed_fetch_task.result()
+                    player = all_players[str(plr_id)]
+                except Exception as e:
+                    print("+ Unable to collect data from %s: %r" % (plr_ids_urls[plr_id], e))
+                    failed_plr_ids[plr_id] = repr(e)
+                    continue
+                print("+ Collected data from %s" % plr_ids_urls[plr_id])
+                parse_tasks[parsers.submit(
+                    parse_career_page, plr_id, player_page, player['first_name'], player['last_name'])] = plr_id
+            for parse_task in as_completed(parse_tasks):
+                plr_id = parse_tasks[parse_task]
+                try:
+                    plr_career_stats = parse_task.result()
+                except Exception as e:
+                    print("+ Unable to parse career data for player id %d: %r" % (plr_id, e))
+                    failed_plr_ids[plr_id] = repr(e)
+                    continue
+                # exporting single player career stats as soon as they are available
+                plr_tgt_path = os.path.join(per_player_tgt_dir, "%d.json" % plr_id)
+                open(plr_tgt_path, 'w').write(json.dumps(plr_career_stats, indent=2))
+                careers.append(plr_career_stats)
 
-            careers.append(plr_career_stats)
-            # adding current player id to set of already processed ones
-            processed_plr_ids.add(plr_id)
+    if failed_plr_ids:
+        print("+ Unable to retrieve career data for %d player(s): %s" % (
+            len(failed_plr_ids), ", ".join(str(plr_id) for plr_id in sorted(failed_plr_ids))))
 
+    # sorting career stats by player id to merge them in a deterministic order
     careers = sorted(careers, key=lambda k: k['player_id'])
 
-    if os.path.isfile(tgt_path):
-        existing_careers = json.loads(open(tgt_path).read())
-        # existing_careers = dict((plr['player_id'], plr) for plr in existing_careers)
-
     tgt_careers = existing_careers
 
     for plr in careers:
@@ -0,0 +1,372 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import time
+import asyncio
+
+from collections import namedtuple, deque
+
+import aiohttp
+
+# default settings for concurrent downloads, usually overridden by configuration
+MAX_CONNECTIONS = 8
+MAX_PER_HOST = 4
+RATE_LIMIT = 20
+# timeout (in seconds) for a single request
+REQUEST_TIMEOUT = 60
+
+# settings for adaptive concurrency: initial number of requests in flight,
+# latency (relative to the best recent latency) regarded as congestion,
+# factor to reduce concurrency by on congestion or errors, and ratio of
+# unmodified data allowing to increase concurrency more aggressively
+ADAPTIVE_INITIAL_LIMIT = 4
+ADAPTIVE_LATENCY_FACTOR = 2.0
+ADAPTIVE_BACKOFF_FACTOR = 0.5
+ADAPTIVE_NOT_MODIFIED_RATIO = 0.5
+# weight of latest latency in exponentially weighted moving average
+LATENCY_EWMA_WEIGHT = 0.2
+# time span (in seconds) the best recent latency is determined over
+LATENCY_BASELINE_WINDOW = 30.0
+
+# named tuples to define single download tasks and their results
+DownloadTask = namedtuple('DownloadTask', ['tgt_url', 'alt_url', 'tgt_path', 'category'], defaults=[None])
+DownloadResult = namedtuple('DownloadResult', [
+    'tgt_url', 'src_url', 'tgt_path', 'category', 'status', 'last_modified'])
+
+
+class TokenBucket():
+    """
+    Rate limiter allowing short bursts of requests while keeping the overall
+    request rate at the specified number of requests per second.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity else max(1, rate)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """
+        Waits until a token is available and consumes it.
+        """
+        async with self.lock:
+            while True:
+                # refilling bucket according to time passed since last refill
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                # waiting until the next token becomes available
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AdaptiveLimiter():
+    """
+    Limits the number of requests in flight adaptively, i.e. additively
+    increases the limit after each window of successful requests and
+    multiplicatively decreases it when the server responds with errors,
+    throttles requests or latency rises significantly. Windows dominated by
+    unmodified data allow for a faster increase. Latency is compared to the
+    best latency within a sliding time window, so that a single fast response
+    doesn't pin the baseline for the remainder of a run. Counters are
+    available at any time while downloading.
+    """
+    def __init__(
+            self, max_limit, min_limit=1, initial_limit=ADAPTIVE_INITIAL_LIMIT,
+            latency_factor=ADAPTIVE_LATENCY_FACTOR, backoff_factor=ADAPTIVE_BACKOFF_FACTOR,
+            baseline_window=LATENCY_BASELINE_WINDOW):
+        self.max_limit = max(min_limit, max_limit)
+        self.min_limit = min_limit
+        self.limit = min(self.max_limit, max(min_limit, initial_limit))
+        self.latency_factor = latency_factor
+        self.backoff_factor = backoff_factor
+        self.baseline_window = baseline_window
+        self.in_flight = 0
+        self.condition = None
+        # counters
+        self.started = None
+        self.completed = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.increases = 0
+        self.decreases = 0
+        self.latency = None
+        self.best_latency = None
+        # candidates for the best latency within the baseline window as pairs
+        # of time and average latency with latencies ascending
+        self.latency_samples = deque()
+        # current window of successful requests
+        self.window_completed = 0
+        self.window_not_modified = 0
+        self.last_decrease = 0
+
+    async def acquire(self):
+        """
+        Waits until another request may be put in flight.
+        """
+        # condition is set up lazily to be bound to the running event loop
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+            self.started = time.monotonic()
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, status, latency):
+        """
+        Registers completed request with specified status (None for requests
+        failed altogether) and latency and adjusts limit accordingly.
+        """
+        async with self.condition:
+            self.in_flight -= 1
+            self.completed += 1
+            self.update_limit(status, latency)
+            self.condition.notify_all()
+
+    def update_limit(self, status, latency):
+        """
+        Adjusts limit of requests in flight according to the specified status
+        and latency of a completed request.
+        """
+        # updating moving average of latency and its minimum within the
+        # baseline window
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency = (1 - LATENCY_EWMA_WEIGHT) * self.latency + LATENCY_EWMA_WEIGHT * latency
+        now = time.monotonic()
+        while self.latency_samples and self.latency_samples[-1][1] >= self.latency:
+            self.latency_samples.pop()
+        self.latency_samples.append((now, self.latency))
+        while self.latency_samples[0][0] < now - self.baseline_window:
+            self.latency_samples.popleft()
+        self.best_latency = self.latency_samples[0][1]
+
+        error = status is None or status == 429 or status >= 500
+        if error:
+            self.errors += 1
+        elif status == 304:
+            self.not_modified += 1
+
+        # decreasing limit on errors, throttling or congestion, at most once
+        # per round trip to let requests already in flight complete
+        if error or self.latency > self.best_latency * self.latency_factor:
+            if now - self.last_decrease >= self.latency:
+                self.limit = max(self.min_limit, int(self.limit * self.backoff_factor))
+                self.decreases += 1
+                self.last_decrease = now
+            self.window_completed = 0
+            self.window_not_modified = 0
+            return
+
+        # increasing limit after a full window of successful requests
+        self.window_completed += 1
+        if status == 304:
+            self.window_not_modified += 1
+        if self.window_completed >= self.limit:
+            if self.window_not_modified / self.window_completed >= ADAPTIVE_NOT_MODIFIED_RATIO:
+                increase = 2
+            else:
+                increase = 1
+            if self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + increase)
+                self.increases += 1
+            self.window_completed = 0
+            self.window_not_modified = 0
+
+    def get_counters(self):
+        """
+        Gets current counters of adaptive concurrency control.
+        """
+        elapsed = time.monotonic() - self.started if self.started is not None else 0
+        return {
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'completed': self.completed,
+            'requests_per_sec': round(self.completed / elapsed, 1) if elapsed else 0,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'not_modified_ratio': round(self.not_modified / self.completed, 3) if self.completed else 0,
+            'error_ratio': round(self.errors / self.completed, 3) if self.completed else 0,
+            'increases': self.increases,
+            'decreases': self.decreases,
+        }
+
+    def format_counters(self):
+        """
+        Formats current counters of adaptive concurrency control for output.
+        """
+        counters = self.get_counters()
+        return (
+            "limit %(limit)d, in flight %(in_flight)d, %(completed)d completed (%(requests_per_sec).1f/s), "
+            "latency %(latency_ms)s ms, %(not_modified_ratio).1f%% not modified, %(error_ratio).1f%% errors" % {
+                **counters,
+                'not_modified_ratio': counters['not_modified_ratio'] * 100,
+                'error_ratio': counters['error_ratio'] * 100})
+
+
+def report_status(symbol, quiet=False):
+    """
+    Writes single-character status indicator for a finished download to
+    standard output.
+    """
+    if quiet:
+        return
+    sys.stdout.write(symbol)
+    sys.stdout.flush()
+
+
+async def fetch(session, rate_limiter, url, req_header, limiter=None):
+    """
+    Retrieves data from specified url using the specified request header.
+    Returns status code, decoded JSON data (if available), and timestamp of
+    last modification as provided by the server. Optionally registers the
+    request with an adaptive limiter of requests in flight.
+    """
+    if limiter is not None:
+        await limiter.acquire()
+    if rate_limiter is not None:
+        await rate_limiter.acquire()
+    status = None
+    start = time.monotonic()
+    try:
+        async with session.get(url, headers=req_header) as r:
+            status = r.status
+            data = None
+            if r.status == 200:
+                data = json.loads(await r.text())
+            return r.status, data, r.headers.get('Last-Modified')
+    finally:
+        if limiter is not None:
+            await limiter.release(status, time.monotonic() - start)
+
+
+async def download_task(
+        session, rate_limiter, task, last_modified_dict, transform=None, quiet=False, limiter=None):
+    """
+    Represents single task to download data from the target url of the
+    specified task to its target path using information from dictionary of
+    last modification timestamps. Optionally falls back to the task's
+    alternative url if the data isn't available at the target url and
+    transforms downloaded data before saving it.
+    """
+    # setting up customized header if target file already exists and a
+    # timestamp of last modification has been saved previously
+    req_header = dict()
+    if task.tgt_url in last_modified_dict and os.path.isfile(task.tgt_path):
+        req_header['If-Modified-Since'] = last_modified_dict[task.tgt_url]
+
+    # retrieving target data using customized header
+    try:
+        src_url = task.tgt_url
+        status, data, last_modified = await fetch(session, rate_limiter, src_url, req_header, limiter)
+        # data not available, i.e. playoff stats for non-playoff teams, trying
+        # alternative url if one has been specified
+        if status == 404 and task.alt_url:
+            src_url = task.alt_url
+            status, data, last_modified = await fetch(session, rate_limiter, src_url, req_header, limiter)
+            if status == 404:
+                report_status('O', quiet)
+                return DownloadResult(task.tgt_url, src_url, task.tgt_path, task.category, status, None)
+    except json.decoder.JSONDecodeError:
+        print("Unable to retrieve JSON data from %s" % src_url)
+        return
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print("Unable to retrieve data from %s: %s" % (src_url, e))
+        return
+
+    # data has not been modified since last visit
+    if status == 304:
+        report_status('.', quiet)
+        return DownloadResult(task.tgt_url, src_url, task.tgt_path, task.category, status, None)
+    # data not available at all
+    elif status != 200:
+        report_status('X', quiet)
+        return DownloadResult(task.tgt_url, src_url, task.tgt_path, task.category, status, None)
+
+    report_status('+', quiet)
+    if transform is not None:
+        data = transform(task, data)
+    open(task.tgt_path, 'w').write(json.dumps(data, indent=2))
+
+    return DownloadResult(task.tgt_url, src_url, task.tgt_path, task.category, status, last_modified)
+
+
+async def download_worker(
+        session, rate_limiter, queue, last_modified_dict, results, callback, transform, quiet, limiter):
+    """
+    Processes download tasks from the specified queue until it is empty.
+    Optionally hands each result to the specified callback as soon as the
+    corresponding task is completed.
+    """
+    while True:
+        try:
+            task = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        result = await download_task(session, rate_limiter, task, last_modified_dict, transform, quiet, limiter)
+        if result is not None:
+            results.append(result)
+            if callback is not None:
+                callback(result)
+
+
+async def download_all(
+        download_tasks, last_modified_dict, max_connections, max_per_host, rate_limit, callback, transform, quiet,
+        limiter):
+    """
+    Downloads all specified tasks using a single pool of keep-alive
+    connections limited globally as well as per host.
+    """
+    rate_limiter = TokenBucket(rate_limit) if rate_limit else None
+
+    queue = asyncio.Queue()
+    for task in download_tasks:
+        queue.put_nowait(task)
+
+    results = list()
+    connector = aiohttp.TCPConnector(limit=max_connections, limit_per_host=max_per_host)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        workers = [
+            download_worker(
+                session, rate_limiter, queue, last_modified_dict, results, callback, transform, quiet, limiter)
+            for _ in range(max(1, min(max_connections, len(download_tasks))))
+        ]
+        await asyncio.gather(*workers)
+
+    return results
+
+
+def run_downloads(
+        download_tasks, last_modified_dict, max_connections=MAX_CONNECTIONS,
+        max_per_host=MAX_PER_HOST, rate_limit=RATE_LIMIT, callback=None, transform=None, quiet=False,
+        limiter=None):
+    """
+    Runs specified download tasks concurrently and registers timestamps of
+    last modification for all successfully downloaded data in the specified
+    dictionary. Optionally calls the specified callback with every single
+    completed task and transforms downloaded data using the specified
+    function before saving it. If an adaptive limiter is specified, the
+    number of requests in flight is adjusted dynamically with the maximum
+    number of connections as upper bound. Returns results of all completed
+    download tasks.
+    """
+    if not download_tasks:
+        return list()
+
+    results = asyncio.run(download_all(
+        download_tasks, last_modified_dict, max_connections, max_per_host, rate_limit, callback, transform, quiet,
+        limiter))
+
+    for result in results:
+        if result.last_modified:
+            last_modified_dict[result.tgt_url] = result.last_modified
+
+    return results
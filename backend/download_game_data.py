@@ -2,16 +2,29 @@
 # -*- coding: utf-8 -*-
 
 import os
-import sys
 import json
-import time
 import yaml
-import requests
 import argparse
 
 from datetime import datetime
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from download_engine import DownloadTask, AdaptiveLimiter, run_downloads
+from download_engine import MAX_CONNECTIONS, MAX_PER_HOST, RATE_LIMIT
+from download_journal import DownloadJournal
+from download_manifest import write_manifest
+from schedule_index import load_schedule_index, get_games
+
+CATEGORIES = [
+    'game_info', 'game_events', 'game_roster', 'game_team_stats',
+    'game_goalies', 'shifts', 'game_player_stats', 'shots', 'faceoffs'
+]
+
+DOWNLOAD_REPORT_TGT = 'download_report.json'
+
+# number of completed downloads after which counters of adaptive concurrency
+# control are reported
+ADAPTIVE_REPORT_EVERY = 500
 
 
 def get_download_targets(args, config):
@@ -38,102 +51,134 @@ def get_download_targets(args, config):
     return seasons, game_types
 
 
-def get_game_ids_dates_and_teams(schedule_dir, season='', game_type='', team=''):
+def get_game_ids_dates_and_teams(schedule_dir, season='', game_type='', team='', schedule_index=None):
     '''
     Retrieves ids for games to be downloaded from specified schedule directory,
     season, game type, and team. If either one of the latter parameters is not
     set game data for all seasons, game types, and/or teams is marked to be
     downloaded. Additionally retrieves ids of teams involved in each game.
+    Optionally uses a previously loaded schedule index.
     '''
     game_ids_team_ids = defaultdict(set)
     game_dates = dict()
 
-    for dirpath, _, filenames in os.walk(schedule_dir):
-        # checking for specified season
-        if season and str(season) not in dirpath:
-            continue
-        # checking for specified game type
-        if game_type and not dirpath.endswith(str(game_type)):
-            continue
-
-        if filenames:
-            for schedule_file in filenames:
-                # checking for specified team
-                if team and os.path.splitext(schedule_file)[0] != str(team):
-                    continue
-                src_path = os.path.join(dirpath, schedule_file)
-                schedule = json.loads(open(src_path).read())['matches']
-                for game in schedule:
-                    if game['status'] == 'AFTER_MATCH':
-                        game_ids_team_ids[game['id']].add(game['home']['id'])
-                        game_ids_team_ids[game['id']].add(game['guest']['id'])
-                        game_dates[game['id']] = game['start_date']
+    # loading (and updating) persisted schedule index
+    if schedule_index is None:
+        schedule_index = load_schedule_index(schedule_dir)
+
+    for game in get_games(schedule_index, season, game_type, team, 'AFTER_MATCH'):
+        game_ids_team_ids[game['game_id']].add(game['home_id'])
+        game_ids_team_ids[game['game_id']].add(game['road_id'])
+        game_dates[game['game_id']] = game['start_date']
 
     return game_ids_team_ids, game_dates
 
 
-def download_task(tgt_url, alt_url, tgt_path, last_modified_dict):
-    '''
-    Represents single task to download data from speficied target url to
-    specified target path using information from dictionary of last
-    modification timestamps.
-    '''
-    # setting up customized header if target file already exists and a
-    # timestamp of last modification has been saved previously
-    req_header = dict()
-    if tgt_url in last_modified_dict and os.path.isfile(tgt_path):
-        req_header['If-Modified-Since'] = last_modified_dict[tgt_url]
-
-    # retrieving target data using customized header
-    try:
-        r = requests.get(tgt_url, headers=req_header)
-        if r.status_code == 200:
-            data = r.json()
-            sys.stdout.write('+')
-            sys.stdout.flush()
-        # data has not been modified since last visit
-        elif r.status_code == 304:
-            sys.stdout.write('.')
-            sys.stdout.flush()
-            return tgt_url, None
-        # data not available, i.e. playoff stats for
-        # non-playoff teams
-        elif r.status_code == 404:
-            if alt_url:
-                time.sleep(0.2)
-                rr = requests.get(alt_url, headers=req_header)
-                if rr.status_code == 200:
-                    data = rr.json()
-                    sys.stdout.write('+')
-                    sys.stdout.flush()
-                # data has not been modified since last visit
-                elif rr.status_code == 304:
-                    sys.stdout.write('.')
-                    sys.stdout.flush()
-                    return alt_url, None
-                elif rr.status_code == 404:
-                    sys.stdout.write('O')
-                    sys.stdout.flush()
-                    return alt_url, None
+def get_download_tasks(category, season, game_type, games_and_teams, game_dates, config):
+    """
+    Sets up download tasks for specified information category for all
+    specified games of the given season and game type.
+    """
+    base_url = config['base_url']
+    del_base_url = config['del_base_url']
+    target_url_component = config['url_components'][category]
+
+    # setting up target directory
+    tgt_dir = os.path.join(config['tgt_base_dir'], category, str(season), str(game_type))
+
+    download_tasks = list()
+
+    for game_id in games_and_teams:
+        # game player stats are divided in two files for each of the
+        # involved teams
+        if category in ['game_player_stats', 'game_team_stats']:
+            current_team = 'home'
+            for team_id in games_and_teams[game_id]:
+                # setting up target url
+                if category == 'game_player_stats':
+                    target_url = R"/".join((
+                        base_url, 'matches', str(game_id),
+                        target_url_component, "%s.json" % team_id))
+                    alt_url = ''
+                elif category == 'game_team_stats':
+                    target_url = R"/".join((
+                        base_url, 'match-detail', target_url_component,
+                        str(game_id), "%s.json" % team_id))
+                    alt_url = R"/".join((
+                        del_base_url, 'live-ticker', 'matches',
+                        str(game_id), "team-stats-%s.json" % current_team))
+                current_team = 'guest'
+
+                tgt_path = os.path.join(tgt_dir, "%d_%d.json" % (game_id, team_id))
+                download_tasks.append(DownloadTask(target_url, alt_url, tgt_path, category))
+        # regular game stats are stored in a single file for each game
+        else:
+            if category in ['shifts']:
+                # shift data files after a certain cutoff date need special treatment
+                game_date = datetime.strptime(game_dates[game_id], '%Y-%m-%d %H:%M:%S').date()
+                suffix_valid_from_date = datetime.strptime(config['url_suffix_valid_from'], '%Y-%m-%d').date()
+                if game_date >= suffix_valid_from_date:
+                    target_url = R"/".join((
+                        base_url, 'matches', str(game_id),
+                        "%s%s.json" % (target_url_component, config['url_suffix'])))
+                else:
+                    target_url = R"/".join((
+                        base_url, 'matches', str(game_id), "%s.json" % target_url_component))
+                alt_url = ''
+            elif category in ['shots']:
+                # setting up target url
+                target_url = R"/".join((base_url, 'visualization', 'shots', "%d.json" % game_id))
+                alt_url = R"/".join((del_base_url, target_url_component, "%d.json" % game_id))
             else:
-                sys.stdout.write('X')
-                sys.stdout.flush()
-                return tgt_url, None
-    except json.decoder.JSONDecodeError:
-        print("Unable to retrieve JSON data from %s" % tgt_url)
-        return
-
-    open(tgt_path, 'w').write(json.dumps(data, indent=2))
-
-    # retrieving date of last modification
-    if r.status_code == 200:
-        last_modified = r.headers.get('Last-Modified')
-    else:
-        last_modified = rr.headers.get('Last-Modified')
+                # setting up target url
+                target_url = R"/".join((
+                    base_url, 'matches', str(game_id),
+                    "%s.json" % target_url_component))
+                if category in ['game_goalies', 'faceoffs']:
+                    alt_url = ''
+                else:
+                    alt_url = R"/".join((
+                        del_base_url, 'live-ticker', 'matches', str(game_id), "%s.json" % target_url_component))
+
+            tgt_path = os.path.join(tgt_dir, "%d.json" % game_id)
+            download_tasks.append(DownloadTask(target_url, alt_url, tgt_path, category))
+
+    # creating target directory (if necessary)
+    if download_tasks:
+        if not os.path.isdir(tgt_dir):
+            os.makedirs(tgt_dir)
+
+    return download_tasks
+
+
+def create_download_report(download_tasks, results):
+    """
+    Summarizes results of download tasks per information category.
+    """
+    report = dict()
+    report['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    report['categories'] = dict()
+
+    for task in download_tasks:
+        if task.category not in report['categories']:
+            report['categories'][task.category] = {
+                'tasks': 0, 'downloaded': 0, 'not_modified': 0, 'not_available': 0, 'failed': 0}
+        report['categories'][task.category]['tasks'] += 1
 
-    time.sleep(0.2)
+    for result in results:
+        if result.status == 200:
+            report['categories'][result.category]['downloaded'] += 1
+        elif result.status == 304:
+            report['categories'][result.category]['not_modified'] += 1
+        else:
+            report['categories'][result.category]['not_available'] += 1
 
-    return tgt_url, last_modified
+    # tasks without result have failed altogether
+    for category_report in report['categories'].values():
+        category_report['failed'] = category_report['tasks'] - (
+            category_report['downloaded'] + category_report['not_modified'] + category_report['not_available'])
+
+    return report
 
 
 if __name__ == '__main__':
@@ -151,32 +196,73 @@ if __name__ == '__main__':
         metavar='game type to download data for', choices=['RS', 'PO', 'MSC', 'ALL'],
         help="The game type for which information will be downloaded for")
     parser.add_argument(
-        'category', metavar='information category',
+        '--max_connections', dest='max_connections', required=False, type=int,
+        metavar='maximum number of concurrent connections',
+        help="The maximum number of concurrent connections overall")
+    parser.add_argument(
+        '--max_per_host', dest='max_per_host', required=False, type=int,
+        metavar='maximum number of concurrent connections per host',
+        help="The maximum number of concurrent connections to a single host")
+    parser.add_argument(
+        '--rate_limit', dest='rate_limit', required=False, type=float,
+        metavar='maximum number of requests per second',
+        help="The maximum number of requests per second (0 for no limit)")
+    parser.add_argument(
+        '--adaptive', dest='adaptive', required=False, action='store_true',
+        help="Adjust number of concurrent requests dynamically (with maximum number of connections as upper bound)")
+    parser.add_argument(
+        '--resume', dest='resume', required=False, action='store_true',
+        help="Resume previously interrupted download run by skipping downloads already completed")
+    parser.add_argument(
+        '--categories', dest='categories', required=False, nargs='+',
+        metavar='information categories', choices=CATEGORIES + ['all'],
+        help="Multiple information categories (or 'all') to be downloaded in a single pass")
+    parser.add_argument(
+        'category', metavar='information category', nargs='?',
         help='information category to be downloaded',
-        choices=[
-            'game_info', 'game_events', 'game_roster', 'game_team_stats',
-            'game_goalies', 'shifts', 'game_player_stats', 'shots', 'faceoffs'
-        ])
+        choices=CATEGORIES)
 
     # loading external configuration
     config = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
 
     args = parser.parse_args()
     seasons, game_types = get_download_targets(args, config)
-    print("+ Downloading %s data" % args.category)
 
-    base_url = config['base_url']
-    del_base_url = config['del_base_url']
+    # setting up information categories to download data for
+    if args.categories:
+        if 'all' in args.categories:
+            categories = CATEGORIES
+        else:
+            categories = [category for category in CATEGORIES if category in args.categories]
+    elif args.category:
+        categories = [args.category]
+    else:
+        parser.error("Either an information category or --categories has to be specified")
+    print("+ Downloading %s data" % ", ".join(categories))
+
+    # setting up limits for concurrent downloads
+    max_connections = args.max_connections or config.get('download_max_connections', MAX_CONNECTIONS)
+    max_per_host = args.max_per_host or config.get('download_max_per_host', MAX_PER_HOST)
+    if args.rate_limit is not None:
+        rate_limit = args.rate_limit
+    else:
+        rate_limit = config.get('download_rate_limit', RATE_LIMIT)
+    # setting up adaptive concurrency control
+    if args.adaptive or config.get('download_adaptive', False):
+        limiter = AdaptiveLimiter(max_connections)
+    else:
+        limiter = None
+
     tgt_base_dir = config['tgt_base_dir']
-    tgt_sub_dir = args.category
-    target_url_component = config['url_components'][args.category]
 
-    if args.category == 'shots':
-        print("+ Using DEL base url %s" % del_base_url)
-    else:
-        print("+ Using base url %s" % base_url)
+    if 'shots' in categories:
+        print("+ Using DEL base url %s" % config['del_base_url'])
+    if categories != ['shots']:
+        print("+ Using base url %s" % config['base_url'])
 
+    # loading (and updating) index of all games from team schedules
     schedule_src_dir = os.path.join(tgt_base_dir, 'schedules')
+    schedule_index = load_schedule_index(schedule_src_dir)
 
     # retrieving or setting up dictionary with dates of last modification
     last_modified_path = os.path.join(tgt_base_dir, 'last_modified.json')
@@ -185,95 +271,62 @@ if __name__ == '__main__':
     else:
         last_modified_dict = dict()
 
+    # opening journal to register each completed download immediately
+    journal = DownloadJournal(tgt_base_dir, last_modified_dict, 'game_data').open(args.resume)
+
+    download_tasks = list()
+
     for season in seasons:
         for game_type in game_types:
-
-            # setting up target directory and path
-            tgt_dir = os.path.join(tgt_base_dir, tgt_sub_dir, str(season), str(game_type))
-
-            print(
-                "+ Downloading %s data for %s games in %d-%d" % (
-                    args.category, config['game_types'][game_type], season, season + 1))
-
-            download_tasks = list()
-
-            # retrieving games, game dates and teams involved for current season and game type
-            games_and_teams, game_dates = get_game_ids_dates_and_teams(schedule_src_dir, season, game_type)
-
-            for game_id in games_and_teams:
-                # game player stats are divided in two files for each of the
-                # involved teams
-                if args.category in ['game_player_stats', 'game_team_stats']:
-                    current_team = 'home'
-                    for team_id in games_and_teams[game_id]:
-                        # setting up target url
-                        if args.category == 'game_player_stats':
-                            target_url = R"/".join((
-                                base_url, 'matches', str(game_id),
-                                target_url_component, "%s.json" % team_id))
-                            alt_url = ''
-                        elif args.category == 'game_team_stats':
-                            target_url = R"/".join((
-                                base_url, 'match-detail', target_url_component,
-                                str(game_id), "%s.json" % team_id))
-                            alt_url = R"/".join((
-                                del_base_url, 'live-ticker', 'matches',
-                                str(game_id), "team-stats-%s.json" % current_team))
-                        current_team = 'guest'
-
-                        tgt_path = os.path.join(tgt_dir, "%d_%d.json" % (game_id, team_id))
-                        download_tasks.append((target_url, alt_url, tgt_path))
-                # regular game stats are stored in a single file for each game
-                else:
-                    if args.category in ['shifts']:
-                        # shift data files after a certain cutoff date need special treatment
-                        game_date = datetime.strptime(game_dates[game_id], '%Y-%m-%d %H:%M:%S').date()
-                        suffix_valid_from_date = datetime.strptime(config['url_suffix_valid_from'], '%Y-%m-%d').date()
-                        if game_date >= suffix_valid_from_date:
-                            target_url = R"/".join((
-                                base_url, 'matches', str(game_id),
-                                "%s%s.json" % (target_url_component, config['url_suffix'])))
-                        else:
-                            target_url = R"/".join((
-                                base_url, 'matches', str(game_id), "%s.json" % target_url_component))
-                        alt_url = ''
-                    elif args.category in ['shots']:
-                        # setting up target url
-                        target_url = R"/".join((base_url, 'visualization', 'shots', "%d.json" % game_id))
-                        alt_url = R"/".join((del_base_url, target_url_component, "%d.json" % game_id))
-                    else:
-                        # setting up target url
-                        target_url = R"/".join((
-                            base_url, 'matches', str(game_id),
-                            "%s.json" % target_url_component))
-                        if args.category in ['game_goalies', 'faceoffs']:
-                            alt_url = ''
-                        else:
-                            alt_url = R"/".join((
-                                del_base_url, 'live-ticker', 'matches', str(game_id), "%s.json" % target_url_component))
-
-                    tgt_path = os.path.join(tgt_dir, "%d.json" % game_id)
-                    download_tasks.append((target_url, alt_url, tgt_path))
-
-            # creating target directory (if necessary)
-            if download_tasks:
-                if not os.path.isdir(tgt_dir):
-                    os.makedirs(tgt_dir)
-
-            # downloading data concurrently
-            with ThreadPoolExecutor(max_workers=4) as threads:
-                tasks = {
-                    threads.submit(
-                        download_task, tgt_url, alt_url, tgt_path, last_modified_dict
-                    ): (
-                        tgt_url, alt_url, tgt_path
-                    ) for tgt_url, alt_url, tgt_path in download_tasks[:]
-                }
-                for completed_task in as_completed(tasks):
-                    if completed_task.result():
-                        tgt_url, last_modified = completed_task.result()
-                        if last_modified:
-                            last_modified_dict[tgt_url] = last_modified
-            print()
-
-    open(last_modified_path, 'w').write(json.dumps(last_modified_dict, indent=2))
+            # retrieving games, game dates and teams involved for current season and game type only once for all
+            # information categories
+            games_and_teams, game_dates = get_game_ids_dates_and_teams(
+                schedule_src_dir, season, game_type, schedule_index=schedule_index)
+
+            for category in categories:
+                category_tasks = get_download_tasks(
+                    category, season, game_type, games_and_teams, game_dates, config)
+                # skipping downloads already completed in an interrupted previous run
+                if args.resume:
+                    category_tasks = [task for task in category_tasks if not journal.is_completed(task)]
+                print(
+                    "+ Preparing %d downloads of %s data for %s games in %d-%d" % (
+                        len(category_tasks), category, config['game_types'][game_type], season, season + 1))
+                download_tasks.extend(category_tasks)
+
+    def register_result(result):
+        """
+        Registers result of a single completed download in journal and
+        periodically reports counters of adaptive concurrency control.
+        """
+        journal.record(result)
+        if limiter is not None and not limiter.completed % ADAPTIVE_REPORT_EVERY:
+            print("\n+ %s" % limiter.format_counters())
+
+    # downloading data for all seasons, game types and categories concurrently using a single worker pool
+    results = run_downloads(
+        download_tasks, last_modified_dict, max_connections, max_per_host, rate_limit, register_result,
+        limiter=limiter)
+    print()
+    if limiter is not None:
+        print("+ %s" % limiter.format_counters())
+
+
+    # summarizing and saving results of all download tasks
+    report = create_download_report(download_tasks, results)
+    if limiter is not None:
+        report['concurrency'] = limiter.get_counters()
+    for category, category_report in report['categories'].items():
+        print(
+            "+ %s: %d downloaded, %d not modified, %d not available, %d failed" % (
+                category, category_report['downloaded'], category_report['not_modified'],
+                category_report['not_available'], category_report['failed']))
+    open(os.path.join(tgt_base_dir, DOWNLOAD_REPORT_TGT), 'w').write(json.dumps(report, indent=2))
+
+    # registering games with changed data for subsequent processing, including
+    # those downloaded in interrupted previous runs
+    manifest_path = write_manifest(tgt_base_dir, journal.get_changed_results())
+    print("+ Games with changed data registered in %s" % manifest_path)
+
+    # finishing journal, i.e. persisting all timestamps of last modification
+    journal.close()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+
+from download_engine import DownloadResult
+
+JOURNAL_TGT = 'download_journal_%s.jsonl'
+LAST_MODIFIED_TGT = 'last_modified.json'
+
+# statuses of downloads that don't need to be repeated when resuming a run,
+# i.e. successful, unmodified and (definitely) unavailable downloads
+COMPLETED_STATUSES = (200, 304, 404)
+
+# number of journal entries after which the journal is compacted
+COMPACT_EVERY = 250
+
+
+def write_atomically(tgt_path, content):
+    """
+    Writes specified content to target path without ever leaving a partially
+    written file behind.
+    """
+    tmp_path = "%s.tmp" % tgt_path
+    with open(tmp_path, 'w') as tmp_file:
+        tmp_file.write(content)
+    os.replace(tmp_path, tgt_path)
+
+
+class DownloadJournal():
+    """
+    Append-only journal of finished downloads. Each finished download is
+    registered along with its status and timestamp of last modification as
+    soon as it finishes, only downloads with a completed status are skipped
+    when resuming a run. Downloads that have actually changed data are
+    retained until the journal is closed, even across interrupted runs, to
+    register all changed data in a manifest. The journal is periodically
+    compacted into the dictionary of last modification timestamps persisted
+    in last_modified.json. Each download script keeps a journal of its own,
+    identified by the specified name.
+    """
+    def __init__(self, tgt_base_dir, last_modified_dict, name, compact_every=COMPACT_EVERY):
+        self.journal_path = os.path.join(tgt_base_dir, JOURNAL_TGT % name)
+        self.last_modified_path = os.path.join(tgt_base_dir, LAST_MODIFIED_TGT)
+        self.last_modified_dict = last_modified_dict
+        self.compact_every = compact_every
+        # urls of all downloads completed in the current (or resumed) run
+        self.completed_urls = set()
+        # results of all downloads with changed data in the current (or an
+        # interrupted previous) run by url
+        self.changed_results = dict()
+        # timestamps of last modification registered by this journal
+        self.modified = dict()
+        self.entries_since_compaction = 0
+        self.journal_file = None
+
+    def open(self, resume=False):
+        """
+        Opens journal for the current run. Entries left behind by a previous
+        (interrupted) run are always merged into the dictionary of last
+        modification timestamps, its downloads with changed data are always
+        retained, too. If the previous run is resumed, its completed downloads
+        are retained as well.
+        """
+        if os.path.isfile(self.journal_path):
+            for line in open(self.journal_path):
+                try:
+                    entry = json.loads(line)
+                except json.decoder.JSONDecodeError:
+                    # skipping last line of a journal that has been written
+                    # partially when a run was killed
+                    continue
+                if 'checkpoint' in entry:
+                    self.completed_urls.update(entry['checkpoint'])
+                    for changed in entry.get('changed', list()):
+                        self.register_changed(DownloadResult(*changed))
+                    continue
+                if entry['status'] in COMPLETED_STATUSES:
+                    self.completed_urls.add(entry['url'])
+                if entry['status'] == 200 and 'tgt_path' in entry:
+                    self.register_changed(DownloadResult(
+                        entry['url'], None, entry['tgt_path'], entry['category'], 200, entry['last_modified']))
+                if entry['last_modified']:
+                    self.last_modified_dict[entry['url']] = entry['last_modified']
+                    self.modified[entry['url']] = entry['last_modified']
+            if resume:
+                print("+ Resuming previous download run with %d completed downloads" % len(self.completed_urls))
+            else:
+                self.completed_urls = set()
+        self.compact()
+
+        return self
+
+    def record(self, result):
+        """
+        Registers specified download result in journal. Failed downloads are
+        journaled as well, but not regarded as completed.
+        """
+        entry = {
+            'url': result.tgt_url, 'status': result.status, 'last_modified': result.last_modified,
+            'tgt_path': result.tgt_path, 'category': result.category}
+        self.journal_file.write("%s\n" % json.dumps(entry))
+        self.journal_file.flush()
+
+        if result.status in COMPLETED_STATUSES:
+            self.completed_urls.add(result.tgt_url)
+        if result.status == 200:
+            self.register_changed(result)
+        if result.last_modified:
+            self.last_modified_dict[result.tgt_url] = result.last_modified
+            self.modified[result.tgt_url] = result.last_modified
+
+        self.entries_since_compaction += 1
+        if self.entries_since_compaction >= self.compact_every:
+            self.compact()
+
+    def register_changed(self, result):
+        self.changed_results[result.tgt_url] = result
+
+    def get_changed_results(self):
+        """
+        Gets results of all downloads with changed data in the current run and
+        interrupted previous runs.
+        """
+        return list(self.changed_results.values())
+
+    def is_completed(self, download_task):
+        """
+        Checks whether specified download task has already been completed.
+        """
+        return download_task.tgt_url in self.completed_urls
+
+    def compact(self):
+        """
+        Compacts journal by persisting all timestamps of last modification and
+        reducing the journal to a single checkpoint of completed downloads and
+        downloads with changed data.
+        Timestamps are merged into the current contents of last_modified.json
+        to retain those persisted by other download scripts in the meantime.
+        """
+        if self.journal_file is not None:
+            self.journal_file.close()
+
+        last_modified_dict = dict(self.last_modified_dict)
+        if os.path.isfile(self.last_modified_path):
+            try:
+                last_modified_dict.update(json.loads(open(self.last_modified_path).read()))
+            except json.decoder.JSONDecodeError:
+                pass
+        last_modified_dict.update(self.modified)
+        write_atomically(self.last_modified_path, json.dumps(last_modified_dict, indent=2))
+        write_atomically(self.journal_path, "%s\n" % json.dumps({
+            'checkpoint': sorted(self.completed_urls),
+            'changed': [list(result) for result in self.changed_results.values()]}))
+
+        self.journal_file = open(self.journal_path, 'a')
+        self.entries_since_compaction = 0
+
+    def close(self):
+        """
+        Finishes journal after a completed run by a final compaction and
+        removal of the journal.
+        """
+        self.compact()
+        self.journal_file.close()
+        self.journal_file = None
+        os.remove(self.journal_path)
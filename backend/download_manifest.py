@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import yaml
+import argparse
+
+from datetime import datetime
+
+from dateutil.parser import parse
+
+MANIFEST_DIR = 'manifests'
+MANIFEST_TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S_%f'
+
+
+def get_changed_games(results):
+    """
+    Collects games with data that has actually been changed, i.e. downloaded
+    with status 200, from specified download results. Target paths of game
+    data are expected to follow the regular raw data layout, i.e.
+    <category>/<season>/<game_type>/<game_id>[_<team_id>].json.
+    """
+    changed_games = dict()
+
+    for result in results:
+        if result.status != 200:
+            continue
+        tgt_dir, file_name = os.path.split(result.tgt_path)
+        tgt_dir, game_type = os.path.split(tgt_dir)
+        season = os.path.basename(tgt_dir)
+        game_id = int(os.path.splitext(file_name)[0].split('_')[0])
+        if game_id not in changed_games:
+            changed_games[game_id] = {
+                'season': int(season), 'game_type': int(game_type), 'categories': list()}
+        if result.category not in changed_games[game_id]['categories']:
+            changed_games[game_id]['categories'].append(result.category)
+
+    return changed_games
+
+
+def write_manifest(tgt_base_dir, results):
+    """
+    Writes manifest of all games changed in a download run with the
+    specified results. Returns path to written manifest.
+    """
+    manifest_dir = os.path.join(tgt_base_dir, MANIFEST_DIR)
+    if not os.path.isdir(manifest_dir):
+        os.makedirs(manifest_dir)
+
+    timestamp = datetime.now()
+    manifest_path = os.path.join(manifest_dir, "%s.json" % timestamp.strftime(MANIFEST_TIMESTAMP_FORMAT))
+    save_manifest(manifest_path, get_changed_games(results), timestamp)
+
+    return manifest_path
+
+
+def save_manifest(manifest_path, changed_games, timestamp=None):
+    """
+    Saves manifest listing specified changed games (and categories) by game
+    id to the specified path.
+    """
+    if timestamp is None:
+        timestamp = datetime.now()
+    manifest = {
+        'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+        'games': {str(game_id): changed_games[game_id] for game_id in sorted(changed_games)},
+    }
+    open(manifest_path, 'w').write(json.dumps(manifest, indent=2))
+
+
+def load_changed_games(tgt_base_dir, manifest_paths=None, changed_since=None, season=None):
+    """
+    Loads games changed according to the specified manifests and/or all
+    manifests written since the specified date. Optionally only retains games
+    of the specified season. Returns changed games (and categories) by game id.
+    """
+    manifest_paths = list(manifest_paths) if manifest_paths else list()
+
+    # collecting all manifests written since specified date
+    if changed_since:
+        changed_since = parse(changed_since)
+        manifest_dir = os.path.join(tgt_base_dir, MANIFEST_DIR)
+        if os.path.isdir(manifest_dir):
+            for manifest_file in sorted(os.listdir(manifest_dir)):
+                try:
+                    written = datetime.strptime(os.path.splitext(manifest_file)[0], MANIFEST_TIMESTAMP_FORMAT)
+                except ValueError:
+                    continue
+                if written >= changed_since:
+                    manifest_paths.append(os.path.join(manifest_dir, manifest_file))
+
+    changed_games = dict()
+
+    for manifest_path in manifest_paths:
+        manifest = json.loads(open(manifest_path).read())
+        for game_id, changed_game in manifest['games'].items():
+            if season and changed_game['season'] != int(season):
+                continue
+            game_id = int(game_id)
+            if game_id not in changed_games:
+                changed_games[game_id] = {**changed_game, 'categories': list()}
+            for category in changed_game['categories']:
+                if category not in changed_games[game_id]['categories']:
+                    changed_games[game_id]['categories'].append(category)
+
+    return changed_games
+
+
+def add_manifest_arguments(parser):
+    """
+    Adds command line arguments to select changed games for reprocessing to
+    the specified argument parser.
+    """
+    parser.add_argument(
+        '--manifest', dest='manifest', required=False, nargs='+', metavar='manifest of changed games',
+        help="Reprocess games changed according to the specified download manifest(s)")
+    parser.add_argument(
+        '--changed_since', dest='changed_since', required=False, metavar='date of earliest download run',
+        help="Reprocess games changed in all download runs since the specified date (and time)")
+
+
+def replace_game_entries(entries, new_entries_by_game):
+    """
+    Replaces all entries for games in the specified list of entries by the
+    new ones for these games (by game id), retaining the position of the
+    first replaced entry of each game. New entries for games without entries
+    yet are appended. All games are replaced in a single pass.
+    """
+    if not new_entries_by_game:
+        return entries
+
+    replaced_games = set()
+    updated_entries = list()
+    for entry in entries:
+        game_id = entry['game_id']
+        if game_id not in new_entries_by_game:
+            updated_entries.append(entry)
+        elif game_id not in replaced_games:
+            updated_entries.extend(new_entries_by_game[game_id])
+            replaced_games.add(game_id)
+    for game_id, new_entries in new_entries_by_game.items():
+        if game_id not in replaced_games:
+            updated_entries.extend(new_entries)
+
+    entries[:] = updated_entries
+
+    return entries
+
+
+if __name__ == '__main__':
+
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(description='List DEL games changed in previous download runs.')
+    parser.add_argument(
+        '-s', '--season', dest='season', required=False, type=int, metavar='season to list changed games for',
+        help="The season for which changed games will be listed")
+    add_manifest_arguments(parser)
+
+    # loading external configuration
+    config = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
+
+    args = parser.parse_args()
+
+    changed_games = load_changed_games(config['tgt_base_dir'], args.manifest, args.changed_since, args.season)
+    for game_id in sorted(changed_games):
+        print("+ %d (%d-%d, game type %d): %s" % (
+            game_id, changed_games[game_id]['season'], changed_games[game_id]['season'] + 1,
+            changed_games[game_id]['game_type'], ", ".join(changed_games[game_id]['categories'])))
@@ -4,14 +4,23 @@
 import os
 import sys
 import json
-import time
 import yaml
-import requests
 import argparse
 
+from collections import defaultdict
+
+from download_engine import DownloadTask, AdaptiveLimiter, run_downloads
+from download_engine import MAX_CONNECTIONS, MAX_PER_HOST, RATE_LIMIT
+from download_journal import DownloadJournal
+
 # loading external configuration
 CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
 
+CATEGORIES = ['schedules', 'team_stats', 'roster_stats']
+
+STATUS_SYMBOLS = {200: '+', 304: '.'}
+
+
 def get_download_targets(args, config):
     """
     Retrieves seasons, game types and teams to download data for.
@@ -38,6 +47,41 @@ def get_download_targets(args, config):
     return seasons, game_types, teams
 
 
+def get_download_tasks(category, season, game_types, teams, config):
+    """
+    Sets up download tasks for specified information category, season, game
+    types and teams.
+    """
+    base_url = config['base_url']
+    tgt_url_component = config['url_components'][category]
+
+    download_tasks = list()
+
+    for team_id in teams:
+        for game_type in game_types:
+            # setting up target url
+            tgt_url = R"/".join((base_url, tgt_url_component, str(season), str(game_type), "%d.json" % team_id))
+
+            # setting up target directory and path
+            tgt_dir = os.path.join(config['tgt_base_dir'], category, str(season), str(game_type))
+            if not os.path.isdir(tgt_dir):
+                os.makedirs(tgt_dir)
+            tgt_path = os.path.join(tgt_dir, "%d.json" % team_id)
+
+            download_tasks.append(DownloadTask(tgt_url, '', tgt_path, category))
+
+    return download_tasks
+
+
+def sort_roster_stats(task, data):
+    """
+    Sorts roster stats by player id in order to allow for data versioning.
+    """
+    if task.category == 'roster_stats':
+        data = sorted(data, key=lambda k: k['id'])
+    return data
+
+
 if __name__ == '__main__':
 
     # retrieving arguments specified on command line
@@ -50,25 +94,64 @@ if __name__ == '__main__':
         '-s', '--season', dest='season', required=False, type=int, metavar='season to download data for',
         default=CONFIG['default_season'], choices=CONFIG['seasons'],
         help="The season for which information will be downloaded for")
+    parser.add_argument(
+        '--all_seasons', dest='all_seasons', required=False, action='store_true',
+        help="Download information for all configured seasons")
     parser.add_argument(
         '-g', '--game_type', dest='game_type', required=False, metavar='game type to download data for',
         choices=list(CONFIG['game_types'].values()) + ['ALL'],
         help="The game type for which information will be downloaded for")
     parser.add_argument(
-        'category', metavar='information category',
-        choices=['schedules', 'team_stats', 'roster_stats'],
-        help='information category to be downloaded')
+        'category', metavar='information category', nargs='+',
+        choices=CATEGORIES + ['all'],
+        help="information categories (or 'all') to be downloaded")
+    parser.add_argument(
+        '--resume', dest='resume', required=False, action='store_true',
+        help="Resume previously interrupted download run by skipping downloads already completed")
+    parser.add_argument(
+        '--adaptive', dest='adaptive', required=False, action='store_true',
+        help="Adjust number of concurrent requests dynamically (with maximum number of connections as upper bound)")
+    parser.add_argument(
+        '--max_connections', dest='max_connections', required=False, type=int,
+        metavar='maximum number of concurrent connections',
+        help="The maximum number of concurrent connections overall")
+    parser.add_argument(
+        '--max_per_host', dest='max_per_host', required=False, type=int,
+        metavar='maximum number of concurrent connections per host',
+        help="The maximum number of concurrent connections to a single host")
+    parser.add_argument(
+        '--rate_limit', dest='rate_limit', required=False, type=float,
+        metavar='maximum number of requests per second',
+        help="The maximum number of requests per second (0 for no limit)")
 
     args = parser.parse_args()
+    if args.all_seasons:
+        args.season = None
     seasons, game_types, teams = get_download_targets(args, CONFIG)
-    print("+ Downloading %s data" % args.category)
+
+    # setting up information categories to download data for
+    if 'all' in args.category:
+        categories = CATEGORIES
+    else:
+        categories = [category for category in CATEGORIES if category in args.category]
+    print("+ Downloading %s data" % ", ".join(categories))
     print("+ Using base url %s" % CONFIG['base_url'])
 
+    # setting up limits for concurrent downloads
+    max_connections = args.max_connections or CONFIG.get('download_max_connections', MAX_CONNECTIONS)
+    max_per_host = args.max_per_host or CONFIG.get('download_max_per_host', MAX_PER_HOST)
+    if args.rate_limit is not None:
+        rate_limit = args.rate_limit
+    else:
+        rate_limit = CONFIG.get('download_rate_limit', RATE_LIMIT)
+    # setting up adaptive concurrency control
+    if args.adaptive or CONFIG.get('download_adaptive', False):
+        limiter = AdaptiveLimiter(max_connections)
+    else:
+        limiter = None
+
     # retrieving configuration
-    base_url = CONFIG['base_url']
     tgt_base_dir = CONFIG['tgt_base_dir']
-    tgt_sub_dir = args.category
-    tgt_url_component = CONFIG['url_components'][args.category]
 
     # retrieving or setting up dictionary with dates of last modification
     last_modified_path = os.path.join(tgt_base_dir, 'last_modified.json')
@@ -77,61 +160,54 @@ if __name__ == '__main__':
     else:
         last_modified_dict = dict()
 
-    for season in seasons:
-        print("+ Downloading %s for %d-%d" % (args.category, season, season + 1))
-        for team_id in teams:
-            sys.stdout.write("%s:" % teams[team_id])
-            sys.stdout.flush()
-            for game_type in game_types:
-                # setting up target url
-                tgt_url = R"/".join((base_url, tgt_url_component, str(season), str(game_type), "%d.json" % team_id))
-
-                # setting up target directory and path
-                tgt_dir = os.path.join(tgt_base_dir, tgt_sub_dir, str(season), str(game_type))
-                if not os.path.isdir(tgt_dir):
-                    os.makedirs(tgt_dir)
-                tgt_path = os.path.join(tgt_dir, "%d.json" % team_id)
-
-                # setting up customized header
-                req_header = dict()
-                if os.path.isfile(tgt_path) and tgt_url in last_modified_dict:
-                    req_header['If-Modified-Since'] = last_modified_dict[tgt_url]
-
-                # retrieving target data using customized header
-                try:
-                    r = requests.get(tgt_url, headers=req_header)
-                    # downloading new or modified data
-                    if r.status_code == 200:
-                        data = r.json()
-                        sys.stdout.write('+')
-                        sys.stdout.flush()
-                    # data has not been modified since last visit
-                    elif r.status_code == 304:
-                        sys.stdout.write('.')
-                        sys.stdout.flush()
-                        continue
-                    # data not available, i.e. playoff stats for non-playoff teams
-                    elif r.status_code == 404:
-                        sys.stdout.write('X')
-                        sys.stdout.flush()
-                        continue
-                except json.decoder.JSONDecodeError:
-                    print("Unable to retrieve JSON data from %s" % tgt_url)
+    # opening journal to register each completed download immediately
+    journal = DownloadJournal(tgt_base_dir, last_modified_dict, 'team_data').open(args.resume)
+
+    download_tasks = list()
+    # setting up lookup for category, season and team of each download task
+    task_teams = dict()
+    # setting up containers for progress of downloads per category, season and team
+    open_tasks_per_team = defaultdict(int)
+    status_per_team = defaultdict(str)
+
+    for category in categories:
+        for season in seasons:
+            for task in get_download_tasks(category, season, game_types, teams, CONFIG):
+                # skipping downloads already completed in an interrupted previous run
+                if args.resume and journal.is_completed(task):
                     continue
-
-                # sorting roster stats by player id in order to allow for data versioning
-                if args.category == 'roster_stats':
-                    data = sorted(data, key=lambda k: k['id'])
-
-                # writing downloaded data
-                open(tgt_path, 'w').write(json.dumps(data, indent=2))
-
-                # retrieving date of last modification
-                last_modified = r.headers['Last-Modified']
-                last_modified_dict[tgt_url] = last_modified
-                time.sleep(0.1)
-            sys.stdout.write(' ')
-        print()
-
-    # re-writing dictionary with timestamp of last modification of source files
-    open(last_modified_path, 'w').write(json.dumps(last_modified_dict, indent=2))
+                team_id = int(os.path.splitext(os.path.basename(task.tgt_path))[0])
+                task_teams[task.tgt_url] = (category, season, teams[team_id])
+                open_tasks_per_team[task_teams[task.tgt_url]] += 1
+                download_tasks.append(task)
+
+    def register_result(result):
+        """
+        Registers result of a single completed download in journal and reports
+        progress once all downloads for a team have been completed.
+        """
+        journal.record(result)
+        category, season, team = task_teams[result.tgt_url]
+        status_per_team[(category, season, team)] += STATUS_SYMBOLS.get(result.status, 'X')
+        open_tasks_per_team[(category, season, team)] -= 1
+        if not open_tasks_per_team[(category, season, team)]:
+            print("+ %s %d-%d %s:%s" % (
+                category, season, season + 1, team, status_per_team[(category, season, team)]))
+
+    # downloading data for all categories, seasons and teams concurrently
+    run_downloads(
+        download_tasks, last_modified_dict, max_connections, max_per_host, rate_limit,
+        register_result, sort_roster_stats, quiet=True, limiter=limiter)
+    if limiter is not None:
+        print("+ %s" % limiter.format_counters())
+
+    # reporting teams with downloads that have failed altogether
+    for category, season, team in open_tasks_per_team:
+        if open_tasks_per_team[(category, season, team)]:
+            print("+ %s %d-%d %s:%s (%d failed)" % (
+                category, season, season + 1, team, status_per_team[(category, season, team)],
+                open_tasks_per_team[(category, season, team)]))
+    sys.stdout.flush()
+
+    # finishing journal, i.e. re-writing dictionary with timestamp of last modification of source files
+    journal.close()
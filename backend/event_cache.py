@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import yaml
+import pickle
+
+from functools import lru_cache
+
+from utils import get_game_type_from_season_type
+from data_archive import load_raw_data, get_raw_data_mtime
+
+# loading external configuration
+CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
+
+# maximum number of games with parsed events kept in memory
+EVENT_CACHE_SIZE = 32
+
+
+def get_game_events_src_path(season, game_type, game_id, base_data_dir=CONFIG['base_data_dir']):
+    """
+    Gets path to raw event data for game with specified season, game type and
+    id.
+    """
+    return os.path.join(base_data_dir, 'game_events', str(season), str(game_type), "%d.json" % game_id)
+
+
+def get_parsed_events_path(src_path, parsed_events_dir, base_data_dir=CONFIG['base_data_dir']):
+    """
+    Gets path to pre-parsed form of raw event data originally stored at
+    specified path.
+    """
+    rel_path = os.path.relpath(src_path, base_data_dir)
+
+    return os.path.join(parsed_events_dir, "%s.pickle" % os.path.splitext(rel_path)[0])
+
+
+def load_parsed_events(src_path, parsed_events_dir):
+    """
+    Loads event data originally stored at specified path from its pre-parsed
+    form, (re-)creating the latter if necessary.
+    """
+    parsed_path = get_parsed_events_path(src_path, parsed_events_dir)
+    src_mtime = get_raw_data_mtime(src_path)
+
+    if src_mtime is not None and os.path.isfile(parsed_path) and os.path.getmtime(parsed_path) >= src_mtime:
+        with open(parsed_path, 'rb') as parsed_file:
+            return pickle.load(parsed_file)
+
+    events_data = load_raw_data(src_path)
+
+    if not os.path.isdir(os.path.dirname(parsed_path)):
+        os.makedirs(os.path.dirname(parsed_path))
+    tmp_path = "%s.tmp" % parsed_path
+    with open(tmp_path, 'wb') as tmp_file:
+        pickle.dump(events_data, tmp_file, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, parsed_path)
+
+    return events_data
+
+
+@lru_cache(maxsize=CONFIG.get('event_cache_size', EVENT_CACHE_SIZE))
+def load_events(src_path):
+    """
+    Loads event data originally stored at specified path, decoding it only
+    once for the most recently used games. Optionally uses a pre-parsed form
+    of the event data stored in the configured directory. Returned event
+    data is shared between all callers and must not be modified.
+    """
+    parsed_events_dir = CONFIG.get('parsed_events_dir')
+    if parsed_events_dir:
+        return load_parsed_events(src_path, parsed_events_dir)
+
+    return load_raw_data(src_path)
+
+
+def load_game_events(game):
+    """
+    Loads event data for specified game (as registered in the list of all
+    games). Returned event data is shared between all callers and must not be
+    modified.
+    """
+    game_type = get_game_type_from_season_type(game)
+
+    return load_events(get_game_events_src_path(game['season'], game_type, game['game_id']))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import yaml
+import argparse
+
+from pipeline_data import is_held, get_held_data
+from sqlite_store import TABLES, is_store_enabled, is_stored, open_store
+
+# loading external configuration
+CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
+
+
+def export_table(tgt_dir, table_name):
+    """
+    Exports processed data from specified store table (or held back in memory
+    by a previous pipeline stage) to the JSON file used by the frontend, with
+    the indentation it has originally been written with. Returns whether the
+    data has been exported.
+    """
+    tgt_path = os.path.join(tgt_dir, TABLES[table_name].src)
+    # retaining indentation the data has originally been written with
+    if is_held(tgt_path):
+        data, indent = get_held_data(tgt_path)
+    elif is_stored(tgt_path):
+        data, indent = open_store(tgt_dir).get(table_name)
+    else:
+        return False
+
+    open(tgt_path, 'w').write(json.dumps(data, indent=indent))
+
+    return True
+
+
+if __name__ == '__main__':
+
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(description='Export processed DEL data from SQLite store.')
+    parser.add_argument(
+        'tables', metavar='table', nargs='*',
+        help="The tables to be exported (default: all). Available: %s" % ", ".join(TABLES))
+    parser.add_argument(
+        '-s', '--season', dest='season', required=False, type=int, default=CONFIG['default_season'],
+        choices=CONFIG['seasons'], metavar='season to export data for',
+        help="The season for which data will be exported")
+
+    args = parser.parse_args()
+
+    for table_name in args.tables:
+        if table_name not in TABLES:
+            parser.error("unknown table '%s'" % table_name)
+
+    if not is_store_enabled():
+        print("+ SQLite store not enabled, nothing to export")
+    else:
+        tgt_dir = os.path.join(CONFIG['tgt_processing_dir'], str(args.season))
+        for table_name in args.tables or TABLES:
+            if export_table(tgt_dir, table_name):
+                print("+ Exported %s to %s" % (table_name, TABLES[table_name].src))
+            else:
+                print("+ No data available for %s" % table_name)
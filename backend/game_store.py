@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import yaml
+import bisect
+import argparse
+
+from pipeline_data import exists, is_held, read_json, write_json
+
+GAME_STORE_TGT = 'del_games.jsonl'
+GAME_EXPORT_TGT = 'del_games.json'
+
+# ratio of superseded to current records in the store that triggers a
+# compaction of the store
+COMPACT_RATIO = 0.5
+
+
+class GameStore():
+    """
+    Append-only store of game records, persisted as one JSON line per
+    inserted or updated game. Games are indexed by id and by date, the order
+    of first insertion is retained. Later records of a game supersede
+    earlier ones, superseded records are removed by compaction.
+    """
+    def __init__(self, store_path=None):
+        self.store_path = store_path
+        # games by id in order of first insertion
+        self.games = dict()
+        # sorted list of dates and ids of all games
+        self.date_index = list()
+        self.superseded = 0
+        self.store_file = None
+
+        if store_path is not None and os.path.isfile(store_path):
+            for line in open(store_path):
+                try:
+                    game = json.loads(line)
+                except json.decoder.JSONDecodeError:
+                    # skipping last line of a store that has been written
+                    # partially when a run was killed
+                    continue
+                self.register(game)
+
+    def __len__(self):
+        return len(self.games)
+
+    def __contains__(self, game_id):
+        return game_id in self.games
+
+    def __iter__(self):
+        return iter(self.games.values())
+
+    def register(self, game):
+        """
+        Registers specified game in the in-memory indexes.
+        """
+        game_id = game['game_id']
+        if game_id in self.games:
+            # removing superseded game from date index
+            old_key = (str(self.games[game_id]['date']), game_id)
+            del self.date_index[bisect.bisect_left(self.date_index, old_key)]
+            self.superseded += 1
+        self.games[game_id] = game
+        bisect.insort(self.date_index, (str(game['date']), game_id))
+
+    def put(self, game):
+        """
+        Inserts specified game into the store or updates it if a game with the
+        same id already exists.
+        """
+        self.register(game)
+        if self.store_path is not None:
+            if self.store_file is None:
+                self.store_file = open(self.store_path, 'a')
+            self.store_file.write("%s\n" % json.dumps(game, default=str))
+            self.store_file.flush()
+
+    def get(self, game_id):
+        """
+        Gets game with specified id (or None if it isn't available).
+        """
+        return self.games.get(game_id)
+
+    def get_games_for_date(self, date):
+        """
+        Gets all games played on the specified date.
+        """
+        return self.get_games_between(date, date)
+
+    def get_games_between(self, from_date, to_date):
+        """
+        Gets all games played between the specified dates (inclusively),
+        sorted by date and game id.
+        """
+        start = bisect.bisect_left(self.date_index, (str(from_date), ))
+        end = bisect.bisect_left(self.date_index, (str(to_date), float('inf')))
+
+        return [self.games[game_id] for _, game_id in self.date_index[start:end]]
+
+    def compact(self, force=False):
+        """
+        Rewrites the persisted store with current game records only, if
+        necessary or requested.
+        """
+        if self.store_path is None:
+            return
+        if not force and self.superseded <= len(self.games) * COMPACT_RATIO:
+            return
+
+        self.close()
+        tmp_path = "%s.tmp" % self.store_path
+        with open(tmp_path, 'w') as tmp_file:
+            for game in self.games.values():
+                tmp_file.write("%s\n" % json.dumps(game, default=str))
+        os.replace(tmp_path, self.store_path)
+        self.superseded = 0
+
+    def export(self, tgt_path):
+        """
+        Exports all games (in order of first insertion) to a single JSON file
+        as used by the frontend.
+        """
+        write_json(tgt_path, list(self.games.values()), default=str)
+
+    def close(self):
+        if self.store_file is not None:
+            self.store_file.close()
+            self.store_file = None
+
+
+def open_game_store(tgt_dir, initial=False):
+    """
+    Opens game store in specified directory. The store is set up from
+    previously exported games if it doesn't exist yet and optionally
+    re-created from scratch.
+    """
+    store_path = os.path.join(tgt_dir, GAME_STORE_TGT)
+    export_path = os.path.join(tgt_dir, GAME_EXPORT_TGT)
+
+    if initial and os.path.isfile(store_path):
+        os.remove(store_path)
+
+    if not initial and not os.path.isfile(store_path) and exists(export_path):
+        print("+ Setting up game store from %s" % export_path)
+        game_store = GameStore(store_path)
+        for game in read_json(export_path):
+            game_store.put(game)
+        return game_store
+
+    return GameStore(store_path)
+
+
+def load_games(tgt_dir):
+    """
+    Loads all games from the game store in specified directory, or from the
+    exported games if no store is available. Games just exported within a
+    pipeline run are retrieved from memory.
+    """
+    export_path = os.path.join(tgt_dir, GAME_EXPORT_TGT)
+    if is_held(export_path):
+        return read_json(export_path)
+
+    store_path = os.path.join(tgt_dir, GAME_STORE_TGT)
+    if os.path.isfile(store_path):
+        return list(GameStore(store_path))
+
+    return read_json(export_path)
+
+
+if __name__ == '__main__':
+
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(description='Export DEL games from game store.')
+    parser.add_argument(
+        '-s', '--season', dest='season', required=False, type=int, metavar='season to export games for',
+        help="The season for which games will be exported")
+    parser.add_argument(
+        '--compact', dest='compact', required=False, action='store_true',
+        help="Compact game store before exporting games")
+
+    # loading external configuration
+    config = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
+
+    args = parser.parse_args()
+    season = args.season if args.season else config['default_season']
+
+    tgt_dir = os.path.join(config['tgt_processing_dir'], str(season))
+    tgt_path = os.path.join(tgt_dir, GAME_EXPORT_TGT)
+
+    game_store = open_game_store(tgt_dir)
+    if args.compact:
+        game_store.compact(force=True)
+    game_store.export(tgt_path)
+    game_store.close()
+    print("+ %d games exported to %s" % (len(game_store), tgt_path))
@@ -7,6 +7,7 @@ import yaml
 import json
 
 from utils import calculate_age, player_name_corrections, correct_player_name, iso_country_codes
+from pipeline_data import write_json
 
 # loading external configuration
 CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
@@ -61,4 +62,4 @@ if __name__ == '__main__':
 
     all_players = dict(sorted(all_players.items()))
 
-    open(tgt_path, 'w').write(json.dumps(all_players, indent=2))
+    write_json(tgt_path, all_players)
@@ -2,18 +2,24 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
 import yaml
 import datetime
 import argparse
+import traceback
 
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 from dateutil.parser import parse
 from dateutil.rrule import rrule, DAILY
 from dateutil.relativedelta import relativedelta
 
 from utils import get_season, get_team_from_game
+from data_archive import load_raw_data, raw_data_exists
+from event_cache import load_events, get_game_events_src_path
+from schedule_index import load_schedule_index, get_games_by_date, get_game
+from download_manifest import add_manifest_arguments, load_changed_games
+from game_store import GameStore, open_game_store
 
 # loading external configuration
 CONFIG = yaml.safe_load(open(os.path.join(
@@ -30,111 +36,198 @@ PLAYOFF_DATES = {
 
 POS_KEYS = {'1': 'G', '2': 'D', '3': 'F'}
 
+# statuses of games that have been completed
+COMPLETED_STATUSES = ['AFTER_MATCH', 'CONTUMACY']
+
 TGT_DIR = CONFIG['tgt_processing_dir']
 TGT_FILE = "del_games.json"
 
 
-def get_games_for_date(date, existing_games=None):
+def get_game_date_index(schedule_index):
+    '''
+    Sets up index of all completed games by date of play in a single pass
+    over the schedule index, each game represented by its id and round.
+    Games played on the same date retain their order in the full league
+    schedule.
+    '''
+    date_index = dict()
+
+    for start_date, games in get_games_by_date(schedule_index, COMPLETED_STATUSES).items():
+        date_index[start_date] = [(game['game_id'], int(game['round'].split('_')[-1])) for game in games]
+
+    return date_index
+
+
+def get_games_for_date(
+        date, game_store=None, schedule_index=None, changed_game_ids=None, date_index=None, executor=None):
     '''
     Gets detail, event, and roster information for all games played on the
-    specified date. Optionally adds found game information to specified list
-    of existing games.
+    specified date. Optionally adds found game information to specified store
+    of existing games. Optionally uses a previously loaded schedule index or
+    index of games by date. Already registered games are re-processed if
+    their ids are contained in the optionally specified collection of changed
+    game ids. Optionally assembles games in parallel using the specified
+    process pool.
     '''
     print("+ Retrieving games played on %s" % date)
 
-    # loading games that may have been registered earlier
-    if not existing_games:
-        games = list()
-    else:
-        games = existing_games
-    # collecting already registered game ids
-    registered_game_ids = [g['game_id'] for g in games]
+    # setting up index of games by date (if necessary)
+    if date_index is None:
+        if schedule_index is None:
+            schedule_index = load_schedule_index(os.path.join(CONFIG['base_data_dir'], 'schedules'))
+        date_index = get_game_date_index(schedule_index)
 
-    # retrieving full league schedule for current season
-    schedules_src_path = os.path.join(
-        CONFIG['tgt_processing_dir'],
-        str(get_season(date)), 'full_schedule.json')
-    schedules = json.loads(open(schedules_src_path).read())
+    # determining ids and rounds of games played on current date
+    target_games = [(date, game_id, round) for game_id, round in date_index.get(date, list())]
 
-    game_ids_rounds = list()
+    return assemble_games(target_games, game_store, changed_game_ids, executor)
 
-    # determining ids and rounds of games played on current date
-    for schedule in schedules:
-        try:
-            start_date = parse(schedule['start_date']).date()
-        except ValueError:
-            # TODO: think of something more clever than iterating over all
-            # fixtures each day
-            # print("+ Unable to parse game start date %s" % schedule[
-            #     'start_date'])
-            continue
-        # comparing start date of game with current date
-        if start_date == game_date and schedule['status'] in ['AFTER_MATCH', 'CONTUMACY']:
-            game_ids_rounds.append(
-                (schedule['game_id'], int(schedule['round'].split('_')[-1])))
 
-    for game_id, round in game_ids_rounds:
-        if game_id in registered_game_ids:
+def get_games_for_dates(dates, game_store=None, schedule_index=None, changed_game_ids=None, executor=None):
+    '''
+    Gets detail, event, and roster information for all games played on the
+    specified dates by selecting them in a single pass over the schedule
+    before processing them. Optionally adds found game information to
+    specified store of existing games. Optionally uses a previously loaded
+    schedule index. Already registered games are re-processed if their ids
+    are contained in the optionally specified collection of changed game ids.
+    Optionally assembles games in parallel using the specified process pool.
+    '''
+    if schedule_index is None:
+        schedule_index = load_schedule_index(os.path.join(CONFIG['base_data_dir'], 'schedules'))
+
+    # setting up index of games by date only once for all dates
+    date_index = get_game_date_index(schedule_index)
+
+    # determining ids and rounds of games played on all dates
+    target_games = list()
+    for date in sorted(set(dates)):
+        for game_id, round in date_index.get(date, list()):
+            target_games.append((date, game_id, round))
+
+    if dates:
+        print("+ Retrieving %d games played between %s and %s" % (len(target_games), min(dates), max(dates)))
+
+    return assemble_games(target_games, game_store, changed_game_ids, executor)
+
+
+def assemble_games(target_games, game_store=None, changed_game_ids=None, executor=None):
+    '''
+    Assembles game information for all specified games, each represented by
+    date, id and round. Optionally adds assembled game information to
+    specified store of existing games. Already registered games are skipped
+    unless their ids are contained in the optionally specified collection of
+    changed game ids. Optionally assembles games in parallel using the
+    specified process pool while retaining their order. Games that fail to be
+    assembled are reported and skipped.
+    '''
+    # setting up in-memory store if no store of existing games is specified
+    if game_store is None:
+        game_store = GameStore()
+
+    if changed_game_ids is None:
+        changed_game_ids = set()
+
+    # selecting games to be assembled
+    games_to_assemble = list()
+    for date, game_id, round in target_games:
+        if game_id in game_store and game_id not in changed_game_ids:
             print("\t+ Game with id %d already registered" % game_id)
             continue
-        # setting up data container
-        single_game_data = dict()
-        # setting game date and round information
-        single_game_data['date'] = date
-        single_game_data['weekday'] = date.weekday()
-        season = get_season(date)
-        single_game_data['season'] = season
-        # TODO: put date for 2020/21 regular season start somewhere else
-        if season == 2020 and date < datetime.date(2020, 12, 16):
-            single_game_data['season_type'] = 'MSC'
-            game_type = 4
-        elif date < PLAYOFF_DATES[season]:
-            single_game_data['season_type'] = 'RS'
-            game_type = 1
-        elif date >= PLAYOFF_DATES[season]:
-            single_game_data['season_type'] = 'PO'
-            game_type = 3
-        single_game_data['round'] = round
-
-        # setting game ids
-        # TODO: determine schedule game id
-        # single_game_data['schedule_game_id'] = schedule_game_id
-        single_game_data['game_id'] = game_id
-
-        # retrieving game details
-        if 'game_id' in single_game_data:
-            try:
-                single_game_details = get_single_game_details(
-                    game_id, season, game_type)
-            except Exception:
-                import traceback
-                traceback.print_exc()
-                print(game_id)
-                continue
-
-        # retrieving game rosters
-        single_game_rosters = get_game_rosters(game_id, season, game_type)
-        # retrieving game events
-        single_game_events = get_game_events(game_id, season, game_type)
-
-        single_game_data = {
-            **single_game_data, **single_game_details,
-            **single_game_rosters, **single_game_events
-        }
-
-        single_game_data['first_goal'] = get_team_from_game(
-            single_game_data, single_game_data['first_goal'])
-        single_game_data['gw_goal'] = get_team_from_game(
-            single_game_data, single_game_data['gw_goal'])
+        games_to_assemble.append((date, game_id, round))
+
+    # assembling games either in parallel or one after another, in both cases
+    # retrieving results in the original order
+    if executor is not None:
+        assembled_games = executor.map(try_assemble_single_game, games_to_assemble)
+    else:
+        assembled_games = map(try_assemble_single_game, games_to_assemble)
+
+    failed_games = list()
+
+    for (date, game_id, round), (single_game_data, error) in zip(games_to_assemble, assembled_games):
+        if single_game_data is None:
+            print("\t+ Unable to assemble game with id %d:" % game_id)
+            print(error)
+            failed_games.append(game_id)
+            continue
 
         print("\t+ %s (%d) vs. %s (%d)" % (
             single_game_data['home_team'], single_game_data['home_score'],
             single_game_data['road_team'], single_game_data['road_score']
         ))
 
-        games.append(single_game_data)
+        # replacing previously registered data for changed games
+        if game_id in game_store:
+            print("\t+ Updated previously registered game with id %d" % game_id)
+        game_store.put(single_game_data)
 
-    return games
+    if failed_games:
+        print("+ Unable to assemble %d game(s): %s" % (len(failed_games), ", ".join(map(str, failed_games))))
+
+    return game_store
+
+
+def try_assemble_single_game(target_game):
+    '''
+    Assembles information for a single game represented by date, id and
+    round. Returns assembled game information and None or None and an error
+    description if the game couldn't be assembled.
+    '''
+    try:
+        return assemble_single_game(*target_game), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def assemble_single_game(date, game_id, round):
+    '''
+    Assembles detail, event, and roster information for a single game with
+    the specified id played on the specified date in the specified round.
+    '''
+    # setting up data container
+    single_game_data = dict()
+    # setting game date and round information
+    single_game_data['date'] = date
+    single_game_data['weekday'] = date.weekday()
+    season = get_season(date)
+    single_game_data['season'] = season
+    # TODO: put date for 2020/21 regular season start somewhere else
+    if season == 2020 and date < datetime.date(2020, 12, 16):
+        single_game_data['season_type'] = 'MSC'
+        game_type = 4
+    elif date < PLAYOFF_DATES[season]:
+        single_game_data['season_type'] = 'RS'
+        game_type = 1
+    elif date >= PLAYOFF_DATES[season]:
+        single_game_data['season_type'] = 'PO'
+        game_type = 3
+    single_game_data['round'] = round
+
+    # setting game ids
+    # TODO: determine schedule game id
+    # single_game_data['schedule_game_id'] = schedule_game_id
+    single_game_data['game_id'] = game_id
+
+    # retrieving game details
+    single_game_details = get_single_game_details(game_id, season, game_type)
+
+    # retrieving game rosters
+    single_game_rosters = get_game_rosters(game_id, season, game_type)
+    # retrieving game events
+    single_game_events = get_game_events(game_id, season, game_type)
+
+    single_game_data = {
+        **single_game_data, **single_game_details,
+        **single_game_rosters, **single_game_events
+    }
+
+    single_game_data['first_goal'] = get_team_from_game(
+        single_game_data, single_game_data['first_goal'])
+    single_game_data['gw_goal'] = get_team_from_game(
+        single_game_data, single_game_data['gw_goal'])
+
+    return single_game_data
 
 
 def get_single_game_details(game_id, season, game_type):
@@ -144,7 +237,7 @@ def get_single_game_details(game_id, season, game_type):
     game_detail_src_path = os.path.join(
         CONFIG['base_data_dir'], 'game_info',
         str(season), str(game_type), "%d.json" % game_id)
-    game_details = json.loads(open(game_detail_src_path).read())
+    game_details = load_raw_data(game_detail_src_path)
 
     single_game_data = dict()
 
@@ -273,10 +366,10 @@ def get_game_rosters(game_id, season, game_type):
     game_roster_src_path = os.path.join(
         CONFIG['base_data_dir'], 'game_roster',
         str(season), str(game_type), "%d.json" % game_id)
-    if not os.path.isfile(game_roster_src_path):
+    if not raw_data_exists(game_roster_src_path):
         return roster_data
 
-    game_rosters = json.loads(open(game_roster_src_path).read())
+    game_rosters = load_raw_data(game_roster_src_path)
 
     collected_tgt_keys = set()
 
@@ -328,10 +421,7 @@ def get_game_events(game_id, season, game_type):
     """
     Register game events for current game from separate data source.
     """
-    game_events_src_path = os.path.join(
-        CONFIG['base_data_dir'], 'game_events',
-        str(season), str(game_type), "%d.json" % game_id)
-    game_events = json.loads(open(game_events_src_path).read())
+    game_events = load_events(get_game_events_src_path(season, game_type, game_id))
 
     single_game_events = dict()
 
@@ -453,6 +543,14 @@ if __name__ == '__main__':
     parser.add_argument(
         '--initial', dest='initial', required=False,
         action='store_true', help='Re-create list of games')
+    parser.add_argument(
+        '--bulk', dest='bulk', required=False, action='store_true',
+        help='Select all games of the specified date range at once before processing them')
+    parser.add_argument(
+        '--workers', dest='workers', required=False, type=int, default=1,
+        metavar='number of worker processes',
+        help='The number of processes used to assemble games in parallel')
+    add_manifest_arguments(parser)
 
     args = parser.parse_args()
 
@@ -488,18 +586,41 @@ if __name__ == '__main__':
     # setting up target path
     tgt_path = os.path.join(TGT_DIR, str(tgt_season), TGT_FILE)
 
-    if initial:
-        games = list()
-    else:
-        if not os.path.isfile(tgt_path):
-            print("+ Unable to load existing games from %s" % tgt_path)
-            games = list()
-        else:
-            games = json.loads(open(tgt_path).read())
+    # opening store of games registered earlier (if not re-creating list of games)
+    game_store = open_game_store(os.path.join(TGT_DIR, str(tgt_season)), initial)
+
+    # loading (and updating) index of all games from team schedules
+    schedule_index = load_schedule_index(os.path.join(CONFIG['base_data_dir'], 'schedules'))
 
-    # retrieving games for each game date
-    for game_date in game_dates:
-        games = get_games_for_date(game_date, games)
+    # retrieving games changed in previous download runs and adding their
+    # dates to the dates to process games for
+    changed_games = load_changed_games(CONFIG['tgt_base_dir'], args.manifest, args.changed_since, tgt_season)
+    for game_id in changed_games:
+        changed_game = get_game(schedule_index, game_id)
+        if changed_game is None:
+            continue
+        changed_game_date = parse(changed_game['start_date']).date()
+        if changed_game_date not in game_dates:
+            game_dates.append(changed_game_date)
+    game_dates = sorted(game_dates)
+
+    # setting up process pool to assemble games in parallel
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
 
-    open(tgt_path, 'w').write(
-        json.dumps(games, indent=2, default=str))
+    if args.bulk:
+        # retrieving games for all game dates at once
+        get_games_for_dates(game_dates, game_store, schedule_index, set(changed_games), executor)
+    else:
+        # setting up index of games by date only once for all game dates
+        date_index = get_game_date_index(schedule_index)
+        # retrieving games for each game date
+        for game_date in game_dates:
+            get_games_for_date(game_date, game_store, schedule_index, set(changed_games), date_index, executor)
+
+    if executor is not None:
+        executor.shutdown()
+
+    # exporting all games to a single file for the frontend
+    game_store.compact()
+    game_store.close()
+    game_store.export(tgt_path)
@@ -2,18 +2,22 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
 import yaml
 import argparse
 
+import numpy as np
+
 from collections import defaultdict
 
-from utils import get_game_info, get_game_type_from_season_type
-from reconstruct_skater_situation import build_interval_tree
-from reconstruct_skater_situation import GoalieShift
+from utils import get_game_info
+from event_cache import load_game_events
+from download_manifest import add_manifest_arguments, load_changed_games, replace_game_entries
+from reconstruct_skater_situation import rasterize_goalie_shifts
+from situation_cache import load_situation
+from game_store import load_games
+from pipeline_data import exists, read_json, write_json
+from shot_table import get_shot_lookup
 
-GAME_SRC = 'del_games.json'
-SHOT_SRC = 'del_shots.json'
 PLR_SRC = 'del_players.json'
 LEAGUE_SRC = 'del_league_stats.json'
 PLAYER_GAME_STATS_SRC = 'del_player_game_stats.json'
@@ -28,22 +32,28 @@ SHOT_ZONES = ['blue_line', 'left', 'right', 'slot', 'neutral_zone']
 
 
 def retrieve_goalies_in_game(game):
+    """
+    Retrieves time on ice for all goaltenders in specified game as well as
+    goaltenders on ice at the time of the game-winning goal.
+    """
+    situation = load_situation(game)
+    # retrieving goaltender on ice for each second of the game
+    goalies_on_ice = rasterize_goalie_shifts(situation.goalie_shifts, situation.game_end)
 
-    interval_tree, _ = build_interval_tree(game)
-
-    goalie_seconds = defaultdict(int)
-
-    for interval in interval_tree:
-        if type(interval[-1]) is GoalieShift:
-            gs = interval[-1]
-            goalie_seconds[(gs.team, gs.player_id)] += (
-                abs(interval[0] - interval[1]))
+    goalie_seconds = dict()
+    goalies_at_gw_goal_time = set()
 
-    # retrieving on-going goalie shifts at time of the game-winning goal
-    # later used to determine the goalie of record
-    intervals_at_gw_goal_time = interval_tree[-game['gw_goal_time']]
+    for home_road in goalies_on_ice:
+        team = game["%s_abbr" % home_road]
+        goalie_ids, seconds = np.unique(goalies_on_ice[home_road][goalies_on_ice[home_road] > 0], return_counts=True)
+        for goalie_id, goalie_secs in zip(goalie_ids.tolist(), seconds.tolist()):
+            goalie_seconds[(team, goalie_id)] = goalie_secs
+        # retrieving goaltender on ice at time of the game-winning goal later
+        # used to determine the goalie of record
+        if game['gw_goal_time'] < len(goalies_on_ice[home_road]) and goalies_on_ice[home_road][game['gw_goal_time']]:
+            goalies_at_gw_goal_time.add((team, int(goalies_on_ice[home_road][game['gw_goal_time']])))
 
-    return dict(goalie_seconds), intervals_at_gw_goal_time
+    return goalie_seconds, goalies_at_gw_goal_time
 
 
 def calculate_goals_saved_above_average(goalie_dict, league_data):
@@ -142,10 +152,7 @@ def get_shootout_stats(goalie_dict, game):
     """
     Retrieves shootout stats for specified game goaltender statistics item.
     """
-    game_type = get_game_type_from_season_type(game)
-    game_events_src_path = os.path.join(
-        CONFIG['base_data_dir'], 'game_events', str(game['season']), str(game_type), "%d.json" % game['game_id'])
-    game_events = json.loads(open(game_events_src_path).read())
+    game_events = load_game_events(game)
 
     if 'shootout' in game_events:
         shootout = game_events['shootout']
@@ -199,6 +206,7 @@ if __name__ == '__main__':
         type=int, choices=[2016, 2017, 2018, 2019, 2020],
         metavar='season to process games for',
         help="The season information will be processed for")
+    add_manifest_arguments(parser)
 
     args = parser.parse_args()
     initial = args.initial
@@ -210,28 +218,31 @@ if __name__ == '__main__':
         os.makedirs(tgt_dir)
 
     # setting up source and target paths
-    src_path = os.path.join(tgt_dir, GAME_SRC)
-    shot_src_path = os.path.join(tgt_dir, SHOT_SRC)
     plr_src_path = os.path.join(CONFIG['tgt_processing_dir'], PLR_SRC)
     league_src_path = os.path.join(tgt_dir, LEAGUE_SRC)
     plr_game_stats_src_path = os.path.join(CONFIG['tgt_processing_dir'], str(season), PLAYER_GAME_STATS_SRC)
     tgt_path = os.path.join(tgt_dir, GOALIE_GAME_STATS_TGT)
 
     # loading games and shots
-    games = json.loads(open(src_path).read())
-    shots = json.loads(open(shot_src_path).read())
-    players = json.loads(open(plr_src_path).read())
-    player_game_stats = json.loads(open(plr_game_stats_src_path).read())[-1]
-    league_data = json.loads(open(league_src_path).read())
+    games = load_games(tgt_dir)
+    shots = get_shot_lookup(tgt_dir)
+    players = read_json(plr_src_path)
+    player_game_stats = read_json(plr_game_stats_src_path)[-1]
+    league_data = read_json(league_src_path)
 
     # loading existing player game stats
-    if not initial and os.path.isfile(tgt_path):
-        goalies_per_game = json.loads(open(tgt_path).read())
+    if not initial and exists(tgt_path):
+        goalies_per_game = read_json(tgt_path)
     else:
         goalies_per_game = list()
 
     # retrieving set of games we already have retrieved player stats for
     registered_games = set([gpg['game_id'] for gpg in goalies_per_game])
+    # setting up container for goalie stats of all processed games by game id
+    new_goalies_per_game = dict()
+    # retrieving games changed in previous download runs, these are processed again
+    changed_games = load_changed_games(CONFIG['tgt_base_dir'], args.manifest, args.changed_since, season)
+    registered_games.difference_update(changed_games)
     # retrieving player statuses from regular player game stats
     plr_status_dict = dict()
     for plr_game in player_game_stats:
@@ -239,15 +250,12 @@ if __name__ == '__main__':
 
     for game in games[:]:
 
-        game_shots = list(filter(
-            lambda d: d['game_id'] == game['game_id'] and
-            d['target_type'] == 'on_goal', shots
-        ))
-
         # skipping already processed games
         if game['game_id'] in registered_games:
             continue
 
+        game_shots = shots.find(game_id=game['game_id'], target_type='on_goal')
+
         print("+ Retrieving goalie stats for game %s" % get_game_info(game))
 
         # retrieving goalies dressed from game item
@@ -259,7 +267,9 @@ if __name__ == '__main__':
             (game['road_abbr'], game['road_g2'][0] if 'road_g2' in game else None),
             (game['road_abbr'], game['road_g3'][0] if 'road_g3' in game else None),
         ]
-        goalies_in_game, gw_goal_intervals = retrieve_goalies_in_game(game)
+        goalies_in_game, gw_goalies = retrieve_goalies_in_game(game)
+        # preparing container for stats of all goalies dressed in current game
+        game_goalie_stats = list()
 
         for goalie_team, goalie_id in goalies_dressed:
 
@@ -331,13 +341,10 @@ if __name__ == '__main__':
             else:
                 goalie_dict['toi'] = 0
 
-            goalie_dict['of_record'] = 0
-
-            for interval in gw_goal_intervals:
-                gs = interval[-1]
-                if gs.team == goalie_team and gs.player_id == goalie_id:
-                    goalie_dict['of_record'] += 1
-                    break
+            if (goalie_team, goalie_id) in gw_goalies:
+                goalie_dict['of_record'] = 1
+            else:
+                goalie_dict['of_record'] = 0
 
             for outcome in ['w', 'rw', 'ow', 'sw', 'l', 'rl', 'ol', 'sl']:
                 goalie_dict[outcome] = 0
@@ -422,8 +429,14 @@ if __name__ == '__main__':
             if game['shootout_game']:
                 goalie_dict = get_shootout_stats(goalie_dict, game)
 
-            goalies_per_game.append(goalie_dict)
+            game_goalie_stats.append(goalie_dict)
+
+        # collecting stats of current game to replace previously registered ones
+        new_goalies_per_game[game['game_id']] = game_goalie_stats
+
+    # adding stats of all processed games, replacing previously registered ones
+    replace_game_entries(goalies_per_game, new_goalies_per_game)
 
     # dumping collected and calculated data to target file
     tgt_path = os.path.join(tgt_dir, GOALIE_GAME_STATS_TGT)
-    open(tgt_path, 'w').write(json.dumps(goalies_per_game, indent=2))
+    write_json(tgt_path, goalies_per_game)
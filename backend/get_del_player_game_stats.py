@@ -15,14 +15,18 @@ from dateutil.parser import parse
 
 from utils import get_game_info, get_game_type_from_season_type
 from utils import player_name_corrections, correct_player_name
+from data_archive import load_raw_data, raw_data_exists
+from event_cache import load_game_events
+from download_manifest import add_manifest_arguments, load_changed_games, replace_game_entries
+from game_store import load_games
+from pipeline_data import exists, read_json, write_json
+from shot_table import get_shot_lookup
 
 # loading external configuration
 CONFIG = yaml.safe_load(open(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
 
 PER_PLAYER_TGT_DIR = 'per_player'
-GAME_SRC = 'del_games.json'
-SHOT_SRC = 'del_shots.json'
 PLAYER_GAME_STATS_TGT = 'del_player_game_stats.json'
 # TODO: reduced csv output
 
@@ -265,16 +269,14 @@ def get_single_game_player_data(game, shots):
     road_stats_src_path = os.path.join(
         CONFIG['base_data_dir'], 'game_player_stats',
         str(game['season']), str(game_type), "%d_%d.json" % (game_id, road_id))
-    game_events_src_path = os.path.join(
-        CONFIG['base_data_dir'], 'game_events', str(game['season']), str(game_type), "%d.json" % game['game_id'])
     faceoffs_src_path = os.path.join(
         CONFIG['base_data_dir'], 'faceoffs', str(game['season']), str(game_type), "%d.json" % game['game_id'])
 
-    home_stats = json.loads(open(home_stats_src_path).read())
-    road_stats = json.loads(open(road_stats_src_path).read())
-    period_events = json.loads(open(game_events_src_path).read())
-    if os.path.isfile(faceoffs_src_path):
-        faceoffs = json.loads(open(faceoffs_src_path).read())
+    home_stats = load_raw_data(home_stats_src_path)
+    road_stats = load_raw_data(road_stats_src_path)
+    period_events = load_game_events(game)
+    if raw_data_exists(faceoffs_src_path):
+        faceoffs = load_raw_data(faceoffs_src_path)
     else:
         faceoffs = list()
 
@@ -830,15 +832,17 @@ def retrieve_assistants_from_event_data(period_events):
                 continue
             # fixing bug where penalty shot goals are designated with a balance attribute *PP0*
             # e.g. game id 1053 and game id 1866
-            if event['data']['balance'] == 'PP0':
+            # (event data is shared with other modules and therefore left unchanged)
+            balance = event['data']['balance']
+            if balance == 'PP0':
                 print(
                     "\t+ Adjusting balance type from 'PP0' to 'PS' for goal " +
                     "scored by %s %s" % (event['data']['scorer']['name'], event['data']['scorer']['surname']))
-                event['data']['balance'] = 'PS'
+                balance = 'PS'
             assist_cnt = 0
             # retrieving goals in 5v5
             scorer_plr_id = event['data']['scorer']['playerId']
-            if event['data']['balance'] == 'EQ':
+            if balance == 'EQ':
                 if (
                     not event['data']['ea'] and
                     len(event['data']['attendants']['positive']) == 6 and
@@ -859,13 +863,13 @@ def retrieve_assistants_from_event_data(period_events):
                 if assist_plr_id not in assists_dict:
                     assists_dict[assist_plr_id] = defaultdict(int)
                 assists_dict[assist_plr_id]["A%d" % assist_cnt] += 1
-                if 'PP' in event['data']['balance']:
+                if 'PP' in balance:
                     assists_dict[assist_plr_id]["PPA"] += 1
                     assists_dict[assist_plr_id]["PPA%d" % assist_cnt] += 1
-                if 'SH' in event['data']['balance']:
+                if 'SH' in balance:
                     assists_dict[assist_plr_id]["SHA"] += 1
                     # assists_dict[assist_plr_id]["SHA%d" % assist_cnt] += 1
-                if event['data']['balance'] == 'EQ':
+                if balance == 'EQ':
                     if (
                         len(event['data']['attendants']['positive']) == 6 and
                         len(event['data']['attendants']['negative']) == 6
@@ -979,6 +983,7 @@ if __name__ == '__main__':
         type=int, choices=[2016, 2017, 2018, 2019, 2020],
         metavar='season to process games for',
         help="The season information will be processed for")
+    add_manifest_arguments(parser)
 
     args = parser.parse_args()
 
@@ -994,17 +999,15 @@ if __name__ == '__main__':
         os.makedirs(os.path.join(tgt_dir, PER_PLAYER_TGT_DIR))
 
     # setting up source and target paths
-    src_path = os.path.join(tgt_dir, GAME_SRC)
-    src_shots_path = os.path.join(tgt_dir, SHOT_SRC)
     tgt_path = os.path.join(tgt_dir, PLAYER_GAME_STATS_TGT)
 
     # loading games
-    games = json.loads(open(src_path).read())
-    shots = json.loads(open(src_shots_path).read())
+    games = load_games(tgt_dir)
+    shots = get_shot_lookup(tgt_dir)
 
     # loading existing player game stats
-    if not initial and os.path.isfile(tgt_path):
-        player_game_stats = json.loads(open(tgt_path).read())[-1]
+    if not initial and exists(tgt_path):
+        player_game_stats = read_json(tgt_path)[-1]
     else:
         player_game_stats = list()
 
@@ -1012,6 +1015,11 @@ if __name__ == '__main__':
     per_player_game_stats = defaultdict(list)
     # retrieving set of games we already have retrieved player stats for
     registered_games = set([pg['game_id'] for pg in player_game_stats])
+    # setting up container for player stats of all processed games by game id
+    new_player_game_stats = dict()
+    # retrieving games changed in previous download runs, these are processed again
+    changed_games = load_changed_games(CONFIG['tgt_base_dir'], args.manifest, args.changed_since, season)
+    registered_games.difference_update(changed_games)
 
     cnt = 0
 
@@ -1022,11 +1030,12 @@ if __name__ == '__main__':
             continue
 
         # retrieving shots for current game
-        game_shots = list(filter(lambda d: d['game_id'] == game['game_id'], shots))
+        game_shots = shots.find(game_id=game['game_id'])
 
         print("+ Retrieving player stats for game %s" % get_game_info(game))
         single_player_game_stats = get_single_game_player_data(game, game_shots)
-        player_game_stats.extend(single_player_game_stats)
+        # collecting stats of current game to replace previously registered ones
+        new_player_game_stats[game['game_id']] = single_player_game_stats
 
         # collecting stat lines on a per-player basis
         for stat_line in single_player_game_stats:
@@ -1035,12 +1044,15 @@ if __name__ == '__main__':
         if limit and cnt >= limit:
             break
 
+    # adding stats of all processed games, replacing previously registered ones
+    replace_game_entries(player_game_stats, new_player_game_stats)
+
     # retrieving current timestamp to indicate last modification of dataset
     current_datetime = datetime.now().timestamp() * 1000
     output = [current_datetime, player_game_stats]
 
     # dumping combined game stats for all players
-    open(tgt_path, 'w').write(json.dumps(output, indent=2))
+    write_json(tgt_path, output)
 
     tgt_csv_path = tgt_path.replace(".json", ".csv")
     with open(tgt_csv_path, 'w', encoding='utf-8') as output_file:
@@ -1057,7 +1069,9 @@ if __name__ == '__main__':
         # optionally adding output to already existing data
         if not initial and os.path.isfile(tgt_path):
             existing_data = json.loads(open(tgt_path).read())
-            existing_data.extend(output)
-            output = existing_data
+            new_stat_lines = defaultdict(list)
+            for stat_line in output:
+                new_stat_lines[stat_line['game_id']].append(stat_line)
+            output = replace_game_entries(existing_data, new_stat_lines)
 
         open(tgt_path, 'w').write(json.dumps(output, indent=2))
@@ -6,18 +6,25 @@ import json
 import yaml
 import argparse
 
+import numpy as np
+
+from bisect import bisect_left
 from collections import defaultdict
 from datetime import datetime
 from dateutil.parser import parse
 
 from utils import get_game_info, get_game_type_from_season_type
 from utils import name_corrections, coaches, capacities, divisions, game_score_corrections
+from data_archive import load_raw_data, raw_data_exists
+from event_cache import load_game_events
+from download_manifest import add_manifest_arguments, load_changed_games, replace_game_entries
+from game_store import load_games
+from pipeline_data import read_json, write_json
+from shot_table import load_shot_table
 
 # loading external configuration
 CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
 
-GAME_SRC = 'del_games.json'
-SHOT_SRC = 'del_shots.json'
 PP_SIT_SRC = 'del_pp_sits_goals.json'
 TEAM_GAME_STATS_TGT = 'del_team_game_stats.json'
 
@@ -71,12 +78,12 @@ def get_single_game_team_data(game, grouped_shot_data, pp_sit_data):
 
     # loading raw team game stats (if available)
     raw_stats = dict()
-    if os.path.isfile(home_stats_src_path):
-        raw_stats['home'] = json.loads(open(home_stats_src_path).read())
+    if raw_data_exists(home_stats_src_path):
+        raw_stats['home'] = load_raw_data(home_stats_src_path)
     else:
         raw_stats['home'] = dict()
-    if os.path.isfile(road_stats_src_path):
-        raw_stats['road'] = json.loads(open(road_stats_src_path).read())
+    if raw_data_exists(road_stats_src_path):
+        raw_stats['road'] = load_raw_data(road_stats_src_path)
     else:
         raw_stats['road'] = dict()
 
@@ -450,10 +457,7 @@ def check_pp_goals(game, key, opp_key, gsl):
     Checks power play goals retrieved from team stats by looking at power play goals in event data.
     """
     # loading events data
-    game_type = get_game_type_from_season_type(game)
-    game_events_src_path = os.path.join(
-        CONFIG['base_data_dir'], 'game_events', str(game['season']), str(game_type), "%d.json" % game['game_id'])
-    events_data = json.loads(open(game_events_src_path).read())
+    events_data = load_game_events(game)
 
     pp_goals_from_events = {'home': 0, 'visitor': 0}
 
@@ -462,9 +466,11 @@ def check_pp_goals(game, key, opp_key, gsl):
             if event['type'] != 'goal':
                 continue
             # fixing penalty shots erroneously identified as power play goals
-            if event['data']['balance'] == 'PP0':
-                event['data']['balance'] = 'PS'
-            if event['data']['balance'].startswith('PP'):
+            # (event data is shared with other modules and therefore left unchanged)
+            balance = event['data']['balance']
+            if balance == 'PP0':
+                balance = 'PS'
+            if balance.startswith('PP'):
                 pp_goals_from_events[event['data']['team']] += 1
 
     pp_goals_discrepancy = False
@@ -494,33 +500,48 @@ def group_shot_data_by_game_team(shots):
     # definining zones
     zones = ['slot', 'left', 'right', 'blue_line', 'neutral_zone', 'behind_goal']
 
-    for shot in shots[:]:
-        game_team_key = (shot['game_id'], shot['team'])
-        if game_team_key not in grouped_shot_data:
-            grouped_shot_data[game_team_key] = dict()
-            for shot_zone_cat in SHOT_ZONE_CATEGORIES:
-                grouped_shot_data[game_team_key][shot_zone_cat] = 0
-                if 'distance' in shot_zone_cat:
-                    grouped_shot_data[game_team_key][shot_zone_cat] = list()
+    # retrieving index of game and team for each shot
+    game_teams, group_index = shots.group_by('game_id', 'team')
+
+    def count_per_game_team(mask):
+        """
+        Counts shots selected by specified mask for each game and team.
+        """
+        return np.bincount(group_index[mask], minlength=len(game_teams)).tolist()
+
+    for game_team_key in game_teams:
+        grouped_shot_data[game_team_key] = dict()
+        for shot_zone_cat in SHOT_ZONE_CATEGORIES:
+            grouped_shot_data[game_team_key][shot_zone_cat] = 0
+
+    target_types = set(shots.column('target_type').tolist())
+    scored = shots.equals('scored', True)
+
+    for shot_zone in set(shots.column('shot_zone').tolist()):
         # retrieving shot zone, e.g. *slot*, *left*
-        zone = shot['shot_zone'].lower()
-        # retrieving combined shot zone and outcome used as key below, e.g.
-        # *slot_missed*, *left_blocked*, *blue_line_on_goal*
-        zone_tgt_type = "%s_%s" % (zone, shot['target_type'])
-        # retrieving combined shot zone and distance used as key below, e.g.
-        # *right_distance*
-        zone_distance = "%s_distance" % zone
-        # adding shot incident to counter for shot zone
-        grouped_shot_data[game_team_key]["%s_shots" % zone] += 1
-        # adding shot incident to counter for shot zone/outcome
-        grouped_shot_data[game_team_key][zone_tgt_type] += 1
-        # adding distance of shot incident
-        grouped_shot_data[game_team_key][zone_distance].append(
-            shot['distance'])
-        # in case of a goal, adding shot incident to couter for goals
-        # from shot zone
-        if shot['scored']:
-            grouped_shot_data[game_team_key]["%s_goals" % zone] += 1
+        zone = shot_zone.lower()
+        zone_mask = shots.equals('shot_zone', shot_zone)
+        # adding up shot incidents, goals and distances for shot zone
+        zone_shots = count_per_game_team(zone_mask)
+        zone_goals = count_per_game_team(zone_mask & scored)
+        zone_distances = np.bincount(
+            group_index[zone_mask], weights=shots.column('distance')[zone_mask], minlength=len(game_teams)).tolist()
+        # adding up shot incidents for shot zone/outcome, e.g. *slot_missed*,
+        # *left_blocked*, *blue_line_on_goal*
+        zone_tgt_type_shots = dict()
+        for target_type in target_types:
+            zone_tgt_type_shots["%s_%s" % (zone, target_type)] = count_per_game_team(
+                zone_mask & shots.equals('target_type', target_type))
+
+        for i, game_team_key in enumerate(game_teams):
+            if not zone_shots[i]:
+                continue
+            grouped_shot_data[game_team_key]["%s_shots" % zone] += zone_shots[i]
+            for zone_tgt_type in zone_tgt_type_shots:
+                if zone_tgt_type_shots[zone_tgt_type][i]:
+                    grouped_shot_data[game_team_key][zone_tgt_type] += zone_tgt_type_shots[zone_tgt_type][i]
+            grouped_shot_data[game_team_key]["%s_distance" % zone] += zone_distances[i]
+            grouped_shot_data[game_team_key]["%s_goals" % zone] += zone_goals[i]
 
     # finally calculating percentages and mean distances for shot incidents
     # from each zone
@@ -537,7 +558,7 @@ def group_shot_data_by_game_team(shots):
             # applicable)
             if grouped_shot_data[key]["%s_shots" % zone]:
                 grouped_shot_data[key]["%s_distance" % zone] = round(
-                    sum(grouped_shot_data[key]["%s_distance" % zone]) /
+                    grouped_shot_data[key]["%s_distance" % zone] /
                     grouped_shot_data[key]["%s_shots" % zone], 2
                 )
             else:
@@ -552,73 +573,39 @@ def group_shot_data_by_game_team(shots):
                 grouped_shot_data[key]["%s_on_goal" % zone] / all_on_goal
             ) * 100., 2)
 
-    for key in grouped_shot_data:
-        game_id, team = key
-        per_team_game_shots = list(filter(
-            lambda d:
-            d['game_id'] == game_id and
-            d['team'] == team, shots))
-        grouped_shot_data[key]['shots'] = len(per_team_game_shots)
-        per_team_post_crossbar_shots = list(filter(lambda d: 'hit_post' in d and d['hit_post'], per_team_game_shots))
-        grouped_shot_data[key]['hit_post'] = len(per_team_post_crossbar_shots)
-        per_team_game_ev_shots = list(filter(
-            lambda d: d['situation'] == 'EV', per_team_game_shots))
-        grouped_shot_data[key]['shots_ev'] = len(per_team_game_ev_shots)
-        per_team_game_5v5_shots = list(filter(
-            lambda d: d['plr_situation'] == '5v5', per_team_game_shots))
-        grouped_shot_data[key]['shots_5v5'] = len(per_team_game_5v5_shots)
-        per_team_game_pp_shots = list(filter(
-            lambda d: d['situation'] == 'PP', per_team_game_shots))
-        grouped_shot_data[key]['shots_pp'] = len(per_team_game_pp_shots)
-        per_team_game_sh_shots = list(filter(
-            lambda d: d['situation'] == 'SH', per_team_game_shots))
-        grouped_shot_data[key]['shots_sh'] = len(per_team_game_sh_shots)
-        per_team_game_unblocked_shots = list(filter(
-            lambda d: d['target_type'] in ['on_goal', 'missed'],
-            per_team_game_shots))
-        grouped_shot_data[key]['shots_unblocked'] = len(
-            per_team_game_unblocked_shots)
-        per_team_game_unblocked_ev_shots = list(filter(
-            lambda d: d['situation'] == 'EV', per_team_game_unblocked_shots))
-        grouped_shot_data[key]['shots_unblocked_ev'] = len(
-            per_team_game_unblocked_ev_shots)
-        per_team_game_unblocked_5v5_shots = list(filter(
-            lambda d: d['plr_situation'] == '5v5',
-            per_team_game_unblocked_shots))
-        grouped_shot_data[key]['shots_unblocked_5v5'] = len(
-            per_team_game_unblocked_5v5_shots)
-        per_team_game_unblocked_pp_shots = list(filter(
-            lambda d: d['situation'] == 'PP', per_team_game_unblocked_shots))
-        grouped_shot_data[key]['shots_unblocked_pp'] = len(
-            per_team_game_unblocked_pp_shots)
-        per_team_game_unblocked_sh_shots = list(filter(
-            lambda d: d['situation'] == 'SH', per_team_game_unblocked_shots))
-        grouped_shot_data[key]['shots_unblocked_sh'] = len(
-            per_team_game_unblocked_sh_shots)
-        per_team_game_shots_on_goal = list(filter(
-            lambda d: d['target_type'] == 'on_goal', per_team_game_shots))
-        grouped_shot_data[key]['shots_on_goal'] = len(
-            per_team_game_shots_on_goal)
-        per_team_game_ev_shots_on_goal = list(filter(
-            lambda d: d['situation'] == 'EV', per_team_game_shots_on_goal))
-        grouped_shot_data[key]['shots_on_goal_ev'] = len(
-            per_team_game_ev_shots_on_goal)
-        per_team_game_5v5_shots_on_goal = list(filter(
-            lambda d: d['plr_situation'] == '5v5',
-            per_team_game_shots_on_goal))
-        grouped_shot_data[key]['shots_on_goal_5v5'] = len(
-            per_team_game_5v5_shots_on_goal)
-        per_team_game_pp_shots_on_goal = list(filter(
-            lambda d: d['situation'] == 'PP', per_team_game_shots_on_goal))
-        grouped_shot_data[key]['shots_on_goal_pp'] = len(
-            per_team_game_pp_shots_on_goal)
-        per_team_game_sh_shots_on_goal = list(filter(
-            lambda d: d['situation'] == 'SH', per_team_game_shots_on_goal))
-        grouped_shot_data[key]['shots_on_goal_sh'] = len(
-            per_team_game_sh_shots_on_goal)
-        per_team_game_5v5_goals = list(filter(
-            lambda d: d['scored'], per_team_game_5v5_shots_on_goal))
-        grouped_shot_data[key]['goals_5v5'] = len(per_team_game_5v5_goals)
+    # counting shots by situation and outcome for each game and team
+    all_shots = np.ones(len(shots), dtype=bool)
+    ev = shots.equals('situation', 'EV')
+    five_on_five = shots.equals('plr_situation', '5v5')
+    pp = shots.equals('situation', 'PP')
+    sh = shots.equals('situation', 'SH')
+    unblocked = shots.isin('target_type', ['on_goal', 'missed'])
+    on_goal = shots.equals('target_type', 'on_goal')
+
+    shot_counts = [
+        ('shots', all_shots),
+        ('hit_post', shots.equals('hit_post', True)),
+        ('shots_ev', ev),
+        ('shots_5v5', five_on_five),
+        ('shots_pp', pp),
+        ('shots_sh', sh),
+        ('shots_unblocked', unblocked),
+        ('shots_unblocked_ev', unblocked & ev),
+        ('shots_unblocked_5v5', unblocked & five_on_five),
+        ('shots_unblocked_pp', unblocked & pp),
+        ('shots_unblocked_sh', unblocked & sh),
+        ('shots_on_goal', on_goal),
+        ('shots_on_goal_ev', on_goal & ev),
+        ('shots_on_goal_5v5', on_goal & five_on_five),
+        ('shots_on_goal_pp', on_goal & pp),
+        ('shots_on_goal_sh', on_goal & sh),
+        ('goals_5v5', on_goal & five_on_five & scored),
+    ]
+    for attr, mask in shot_counts:
+        counts = count_per_game_team(mask)
+        for i, game_team_key in enumerate(game_teams):
+            grouped_shot_data[game_team_key][attr] = counts[i]
+
     return grouped_shot_data
 
 
@@ -696,16 +683,11 @@ def get_penalty_counts(game):
     five-, ten-, and twenty-minute penalties have been accumulated by its
     players.
     """
-    game_type = get_game_type_from_season_type(game)
-
     pen_counts = dict()
     pen_counts['home'] = defaultdict(int)
     pen_counts['road'] = defaultdict(int)
 
-    game_events_src_path = os.path.join(
-        CONFIG['base_data_dir'], 'game_events',
-        str(game['season']), str(game_type), "%d.json" % game['game_id'])
-    events_data = json.loads(open(game_events_src_path).read())
+    events_data = load_game_events(game)
 
     for period in events_data:
         for event in events_data[period]:
@@ -724,10 +706,7 @@ def get_shootout_stats(game, key, opp_key):
     Gets shootout statistics for specified game and teams.
     """
     # loading events data
-    game_type = get_game_type_from_season_type(game)
-    game_events_src_path = os.path.join(
-        CONFIG['base_data_dir'], 'game_events', str(game['season']), str(game_type), "%d.json" % game['game_id'])
-    events_data = json.loads(open(game_events_src_path).read())
+    events_data = load_game_events(game)
 
     team_shootout_stats = dict()
 
@@ -805,6 +784,7 @@ if __name__ == '__main__':
         type=int, choices=[2016, 2017, 2018, 2019, 2020],
         metavar='season to process games for',
         help="The season information will be processed for")
+    add_manifest_arguments(parser)
 
     args = parser.parse_args()
 
@@ -818,20 +798,18 @@ if __name__ == '__main__':
         os.makedirs(tgt_dir)
 
     # setting up source and target paths
-    src_path = os.path.join(tgt_dir, GAME_SRC)
-    shots_src_path = os.path.join(tgt_dir, SHOT_SRC)
     pp_sit_src_path = os.path.join(tgt_dir, PP_SIT_SRC)
     tgt_path = os.path.join(tgt_dir, TEAM_GAME_STATS_TGT)
 
     # loading games and shots
-    games = json.loads(open(src_path).read())
+    games = load_games(tgt_dir)
     # making sure that games are sorted by game date
     games = sorted(games, key=lambda g: g['date'])
-    shots = json.loads(open(shots_src_path).read())
+    shots = load_shot_table(tgt_dir)
     # grouping shot data by game and team
     grouped_shot_data = group_shot_data_by_game_team(shots)
     # loading power play situations/goals per game data
-    pp_sit_data = json.loads(open(pp_sit_src_path).read())
+    pp_sit_data = read_json(pp_sit_src_path)
 
     # loading existing player game stats
     if not initial and os.path.isfile(tgt_path):
@@ -841,6 +819,22 @@ if __name__ == '__main__':
 
     # retrieving set of games we already have retrieved player stats for
     registered_games = set([pg['game_id'] for pg in team_game_stats])
+    # retrieving games changed in previous download runs, these are processed again
+    changed_games = load_changed_games(CONFIG['tgt_base_dir'], args.manifest, args.changed_since, season)
+    registered_games.difference_update(changed_games)
+
+    # setting up positions of registered games and each team's games in the list of team game stats to find the
+    # previous game of a team without scanning the whole list, games processed for the first time are appended
+    game_positions = dict()
+    team_positions = defaultdict(list)
+    team_games = defaultdict(list)
+    for position, tgs in enumerate(team_game_stats):
+        game_positions.setdefault(tgs['game_id'], position)
+        team_positions[tgs['team']].append(game_positions[tgs['game_id']])
+        team_games[tgs['team']].append(tgs)
+    next_position = len(team_game_stats)
+    # setting up container for team stats of all processed games by game id
+    new_team_game_stats = dict()
 
     cnt = 0
     for game in games[:]:
@@ -852,16 +846,44 @@ if __name__ == '__main__':
         single_team_game_stats = get_single_game_team_data(
             game, grouped_shot_data, pp_sit_data.get(str(game['game_id']), dict()))
 
-        # calculating days of rest between current and previous game for each team involved
-        identify_days_rest_b2b_games(team_game_stats, single_team_game_stats)
+        if game['game_id'] not in game_positions:
+            game_positions[game['game_id']] = next_position
+            next_position += 1
+        position = game_positions[game['game_id']]
+
+        # calculating days of rest between current and previous game for each team involved, only taking into
+        # account games registered before the current one (if it has been registered previously)
+        previous_team_game_stats = list()
+        for sg in single_team_game_stats:
+            idx = bisect_left(team_positions[sg['team']], position)
+            if idx:
+                previous_team_game_stats.append(team_games[sg['team']][idx - 1])
+        identify_days_rest_b2b_games(previous_team_game_stats, single_team_game_stats)
+
+        for sg in single_team_game_stats:
+            positions = team_positions[sg['team']]
+            idx = bisect_left(positions, position)
+            if idx < len(positions) and positions[idx] == position:
+                # retaining back-to-back status of a previously registered game set when processing the subsequent
+                # game
+                if team_games[sg['team']][idx]['b2b']:
+                    sg['b2b'] = True
+                team_games[sg['team']][idx] = sg
+            else:
+                positions.insert(idx, position)
+                team_games[sg['team']].insert(idx, sg)
 
-        team_game_stats.extend(single_team_game_stats)
+        # collecting stats of current game to replace previously registered ones
+        new_team_game_stats[game['game_id']] = single_team_game_stats
 
         if limit and cnt >= limit:
             break
 
+    # adding stats of all processed games, replacing previously registered ones
+    replace_game_entries(team_game_stats, new_team_game_stats)
+
     # retrieving current timestamp to indicate last modification of dataset
     current_datetime = datetime.now().timestamp() * 1000
     output = [current_datetime, team_game_stats]
 
-    open(tgt_path, 'w').write(json.dumps(output, indent=2, default=str))
+    write_json(tgt_path, output, default=str)
@@ -2,17 +2,17 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
 import yaml
 import argparse
 
+from pipeline_data import write_json
+from shot_table import load_shot_table
+
 
 # loading external configuration
 CONFIG = yaml.safe_load(open(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
 
-SHOT_SRC = 'del_shots.json'
-
 LEAGUE_WIDE_STATS_TGT = 'del_league_stats.json'
 
 
@@ -37,21 +37,18 @@ if __name__ == '__main__':
 
     tgt_dir = os.path.join(CONFIG['tgt_processing_dir'], str(season))
 
-    shot_src_path = os.path.join(tgt_dir, SHOT_SRC)
-
-    shots = json.loads(open(shot_src_path).read())
+    shots = load_shot_table(tgt_dir)
 
     # retaining only shots from regular season or playoff games
-    shots = list(filter(lambda d: d['season_type'] in ['RS', 'PO'], shots))
-    all_shots_on_goal = list(filter(lambda d: d['target_type'] == 'on_goal', shots))
-    all_goals = list(filter(lambda d: d['scored'] is True, all_shots_on_goal))
-    shots_on_goal_5v5 = list(filter(lambda d: d['plr_situation'] == '5v5', all_shots_on_goal))
-    goals_5v5 = list(filter(lambda d: d['plr_situation'] == '5v5', all_goals))
+    all_shots_on_goal = shots.isin('season_type', ['RS', 'PO']) & shots.equals('target_type', 'on_goal')
+    all_goals = all_shots_on_goal & shots.equals('scored', True)
+    shots_on_goal_5v5 = all_shots_on_goal & shots.equals('plr_situation', '5v5')
+    goals_5v5 = all_goals & shots.equals('plr_situation', '5v5')
 
-    all_shots_on_goal = len(all_shots_on_goal)
-    all_goals = len(all_goals)
-    shots_on_goal_5v5 = len(shots_on_goal_5v5)
-    goals_5v5 = len(goals_5v5)
+    all_shots_on_goal = int(all_shots_on_goal.sum())
+    all_goals = int(all_goals.sum())
+    shots_on_goal_5v5 = int(shots_on_goal_5v5.sum())
+    goals_5v5 = int(goals_5v5.sum())
 
     print("\t+ All shots on goal: %d" % all_shots_on_goal)
     print("\t+ 5v5 shots on goal: %d" % shots_on_goal_5v5)
@@ -78,4 +75,4 @@ if __name__ == '__main__':
 
     tgt_path = os.path.join(tgt_dir, LEAGUE_WIDE_STATS_TGT)
     # dumping combined game stats for all players
-    open(tgt_path, 'w').write(json.dumps(league_data, indent=2))
+    write_json(tgt_path, league_data)
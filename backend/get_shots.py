@@ -3,7 +3,6 @@
 
 import os
 import csv
-import json
 import yaml
 import argparse
 from collections import defaultdict
@@ -13,13 +12,18 @@ from intervaltree import IntervalTree
 
 import rink_dimensions as rd
 from utils import get_game_info, get_game_type_from_season_type
-from reconstruct_skater_situation import reconstruct_skater_situation
+from data_archive import load_raw_data, raw_data_exists
+from event_cache import load_events, get_game_events_src_path
+from download_manifest import add_manifest_arguments, load_changed_games, replace_game_entries
+from situation_cache import load_skater_situation
+from game_store import load_games
+from pipeline_data import exists, read_json, write_json
+from shot_table import save_shot_table
 
 # loading external configuration
 CONFIG = yaml.safe_load(open(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
 
-GAME_SRC = 'del_games.json'
 SHOTS_DATA_TGT = 'del_shots.json'
 PP_SITS_DATA_TGT = 'del_pp_sits_goals.json'
 
@@ -93,10 +97,10 @@ def retrieve_shifts(shifts_src_path):
     Retrieves shifts as interval tree from original data.
     """
     shifts = IntervalTree()
-    if not os.path.isfile(shifts_src_path):
+    if not raw_data_exists(shifts_src_path):
         return shifts
 
-    shifts_orig = json.loads(open(shifts_src_path).read())
+    shifts_orig = load_raw_data(shifts_src_path)
 
     for shift in shifts_orig:
         payload = dict()
@@ -118,10 +122,10 @@ def retrieve_goals(events_src_path):
     events data.
     """
     goals = dict()
-    if not os.path.isfile(events_src_path):
+    if not raw_data_exists(events_src_path):
         return goals
 
-    events_orig = json.loads(open(events_src_path).read())
+    events_orig = load_events(events_src_path)
 
     for period in events_orig:
         for event in events_orig[period]:
@@ -147,6 +151,7 @@ if __name__ == '__main__':
         type=int, metavar='season to process games for',
         choices=[2016, 2017, 2018, 2019, 2020],
         help="The season information will be processed for")
+    add_manifest_arguments(parser)
 
     args = parser.parse_args()
 
@@ -157,26 +162,37 @@ if __name__ == '__main__':
     tgt_dir = os.path.join(CONFIG['tgt_processing_dir'], str(season))
 
     # setting up source and target paths
-    src_path = os.path.join(tgt_dir, GAME_SRC)
     tgt_path = os.path.join(tgt_dir, SHOTS_DATA_TGT)
     pp_tgt_path = os.path.join(tgt_dir, PP_SITS_DATA_TGT)
 
     # loading games
-    games = json.loads(open(src_path).read())
+    games = load_games(tgt_dir)
     # loading players
-    all_players = json.loads(open(ALL_PLAYERS).read())
+    all_players = read_json(ALL_PLAYERS)
 
     # loading existing shots
-    if not initial and os.path.isfile(tgt_path):
-        all_shots = json.loads(open(tgt_path).read())
+    if not initial and exists(tgt_path):
+        all_shots = read_json(tgt_path)
     # or preparing empty container for all shots
     else:
         all_shots = list()
 
-    all_pp_situations_goals = dict()
+    # loading power play situations and goals of games processed earlier
+    if not initial and exists(pp_tgt_path):
+        all_pp_situations_goals = dict(read_json(pp_tgt_path))
+    # or preparing empty container for power play situations and goals
+    else:
+        all_pp_situations_goals = dict()
 
     # retrieving set of games we already have retrieved player stats for
     registered_games = set([shot['game_id'] for shot in all_shots])
+    # (only games with registered power play situations and goals as well)
+    registered_games.intersection_update([int(game_id) for game_id in all_pp_situations_goals])
+    # setting up container for shots of all processed games by game id
+    new_shots = dict()
+    # retrieving games changed in previous download runs, these are processed again
+    changed_games = load_changed_games(CONFIG['tgt_base_dir'], args.manifest, args.changed_since, season)
+    registered_games.difference_update(changed_games)
 
     cnt = 0
     for game in games[:]:
@@ -189,14 +205,14 @@ if __name__ == '__main__':
 
         # collecting skater situation for each second of the game and a list
         # of times when goals has been scored
-        times, goal_times = reconstruct_skater_situation(game)
+        times, goal_times = load_skater_situation(game)
         game_type = get_game_type_from_season_type(game)
 
         # retrieving raw shot data
         shots_src_path = os.path.join(
             CONFIG['base_data_dir'], 'shots',
             str(game['season']), str(game_type), "%d.json" % game['game_id'])
-        if not os.path.isfile(shots_src_path):
+        if not raw_data_exists(shots_src_path):
             print("+ Skipping game since shot data is unavailable")
             continue
 
@@ -204,13 +220,11 @@ if __name__ == '__main__':
             CONFIG['base_data_dir'], 'shifts', str(game['season']),
             str(game_type), "%d.json" % game['game_id'])
 
-        events_src_path = os.path.join(
-            CONFIG['base_data_dir'], 'game_events', str(game['season']),
-            str(game_type), "%d.json" % game['game_id'])
+        events_src_path = get_game_events_src_path(game['season'], game_type, game['game_id'])
 
         shifts = retrieve_shifts(shifts_src_path)
         goals = retrieve_goals(events_src_path)
-        match_data = json.loads(open(shots_src_path).read())
+        match_data = load_raw_data(shots_src_path)
 
         home_score_diff, road_score_diff = 0, 0
 
@@ -219,6 +233,8 @@ if __name__ == '__main__':
         orig_shots = sorted(orig_shots, key=lambda s: s['time'])
         # preparing set of shots to avoid registering duplicate ones later on
         shots_set = set()
+        # preparing container for all shots of the current game
+        game_shots = list()
 
         for shot in orig_shots[:]:
             shot['game_id'] = game['game_id']
@@ -313,11 +329,11 @@ if __name__ == '__main__':
                 try:
                     skr_situation = times[shot['time']]
                 except KeyError:
-                    if shot['time'] > max(times.keys()):
+                    if shot['time'] > times.end:
                         print(
                             "\t+ Shot at %02d:%02d after the actual " % (shot['time'] // 60, shot['time'] % 60) +
-                            "end of game (%02d:%02d) registered" % (max(times.keys()) // 60, max(times.keys()) % 60))
-                        shot['time'] = max(times.keys())
+                            "end of game (%02d:%02d) registered" % (times.end // 60, times.end % 60))
+                        shot['time'] = times.end
 
                 if skr_situation[shot['team']] == skr_situation[shot['team_against']]:
                     shot['situation'] = 'EV'
@@ -369,7 +385,10 @@ if __name__ == '__main__':
                 # deleting unnecessary shot properties
                 shot = delete_shot_properties(shot)
 
-                all_shots.append(shot)
+                game_shots.append(shot)
+
+        # collecting shots of current game to replace previously registered ones
+        new_shots[game['game_id']] = game_shots
 
         if limit and cnt >= limit:
             break
@@ -382,15 +401,15 @@ if __name__ == '__main__':
         pp_goals = defaultdict(int)
         prev_situation = (5, 5)
 
-        for time in times:
-            curr_situation = (
-                times[time]['home'], times[time]['road'])
+        for si in times.to_intervals():
+            curr_situation = (si.home, si.road)
             if curr_situation != prev_situation:
                 pp_situations[curr_situation] += 1
                 prev_situation = curr_situation
-            if time in goal_times and goal_times[time].startswith("PP"):
-                pp_goals[curr_situation] += 1
-                # print("Goal at", time, "in", curr_situation)
+        for time in sorted(goal_times):
+            if time in times and goal_times[time].startswith("PP"):
+                pp_goals[(times[time]['home'], times[time]['road'])] += 1
+                # print("Goal at", time, "in", times[time])
 
         pp_situations_goals = dict()
         pp_situations_goals['game_id'] = game['game_id']
@@ -417,9 +436,14 @@ if __name__ == '__main__':
             pp_situations_goals['road']['pp_goals'][sit_key[::-1]] = (
                 pp_goals[situation])
 
-        all_pp_situations_goals[game['game_id']] = pp_situations_goals
+        # (re-)registering power play situations and goals by (string) game id as
+        # loaded from file
+        all_pp_situations_goals[str(game['game_id'])] = pp_situations_goals
+
+    write_json(pp_tgt_path, all_pp_situations_goals)
 
-    open(pp_tgt_path, 'w').write(json.dumps(all_pp_situations_goals, indent=2))
+    # adding shots of all processed games, replacing previously registered ones
+    replace_game_entries(all_shots, new_shots)
 
     CSV_OUT_FIELDS = [
         'player_id', 'jersey', 'first_name', 'last_name', 'team_id', 'time',
@@ -431,7 +455,9 @@ if __name__ == '__main__':
 
     tgt_csv_path = os.path.join(tgt_dir, SHOTS_DATA_TGT.replace("json", "csv"))
 
-    open(tgt_path, 'w').write(json.dumps(all_shots, indent=2, default=str))
+    write_json(tgt_path, all_shots, default=str)
+    # saving shots in columnar form for further processing
+    save_shot_table(tgt_dir, all_shots)
 
     with open(tgt_csv_path, 'w', encoding='utf-8') as output_file:
         output_file.write('\ufeff')
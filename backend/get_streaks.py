@@ -2,7 +2,6 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
 import yaml
 import argparse
 import operator
@@ -10,6 +9,9 @@ import operator
 from collections import namedtuple, defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from game_store import load_games
+from pipeline_data import read_json, write_json
+
 TeamGame = namedtuple('TeamGame', [
     'team', 'game_id', 'game_date', 'game_type', 'home_road', 'roster'])
 Streak = namedtuple('Streak', [
@@ -20,7 +22,6 @@ Slump = namedtuple('Slump', [
 # loading external configuration
 CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
 
-GAME_SRC = 'del_games.json'
 PLAYER_STATS_SRC = 'del_player_game_stats.json'
 PLAYER_SRC = 'del_players.json'
 
@@ -300,14 +301,13 @@ if __name__ == '__main__':
     season = args.season
 
     tgt_dir = os.path.join(CONFIG['tgt_processing_dir'], str(season))
-    src_path = os.path.join(tgt_dir, GAME_SRC)
     player_src_path = os.path.join(CONFIG['tgt_processing_dir'], PLAYER_SRC)
     player_stats_src_path = os.path.join(tgt_dir, PLAYER_STATS_SRC)
 
     # loading games
-    games = json.loads(open(src_path).read())
-    player_stats = json.loads(open(player_stats_src_path).read())[-1]
-    players = json.loads(open(player_src_path).read())
+    games = load_games(tgt_dir)
+    player_stats = read_json(player_stats_src_path)[-1]
+    players = read_json(player_src_path)
     players = {int(k): v for (k, v) in players.items()}
 
     # filtering games and player stats to only contain data from regular season or playoff games
@@ -357,11 +357,11 @@ if __name__ == '__main__':
 
     # dumping results to JSON
     tgt_streak_path = os.path.join(tgt_dir, STREAK_DATA_STRICT_TGT)
-    open(tgt_streak_path, 'w').write(json.dumps(all_streaks_strict, indent=2))
+    write_json(tgt_streak_path, all_streaks_strict)
     tgt_streak_path = os.path.join(tgt_dir, STREAK_DATA_LOOSE_TGT)
-    open(tgt_streak_path, 'w').write(json.dumps(all_streaks_loose, indent=2))
+    write_json(tgt_streak_path, all_streaks_loose)
 
     tgt_slump_path = os.path.join(tgt_dir, SLUMP_DATA_STRICT_TGT)
-    open(tgt_slump_path, 'w').write(json.dumps(all_slumps_strict, indent=2))
+    write_json(tgt_slump_path, all_slumps_strict)
     tgt_slump_path = os.path.join(tgt_dir, SLUMP_DATA_LOOSE_TGT)
-    open(tgt_slump_path, 'w').write(json.dumps(all_slumps_loose, indent=2))
+    write_json(tgt_slump_path, all_slumps_loose)
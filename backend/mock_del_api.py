@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import yaml
+import random
+import hashlib
+import argparse
+import threading
+
+from datetime import datetime, timedelta
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+# loading external configuration
+CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
+
+# path prefixes replacing the configured base urls for the JSON API and the
+# official DEL website
+API_PREFIX = '/api'
+DEL_PREFIX = '/del'
+
+# timestamp of last modification for all payloads that are not considered
+# modified continuously
+BASE_LAST_MODIFIED = datetime(2020, 1, 1, 12, 0, 0)
+
+# number of games of each team against each other team for synthetic schedules
+GAMES_PER_OPPONENT = 2
+
+
+def get_path_fraction(path):
+    """
+    Maps specified path to a reproducible number between 0 and 1 in order
+    to deterministically select paths for special behavior.
+    """
+    return int(hashlib.md5(path.encode('utf-8')).hexdigest()[:8], 16) / 0xffffffff
+
+
+def get_synthetic_game_id(season, game_type, team_ids, home_id, road_id, game_no):
+    """
+    Gets reproducible id for synthetic game between specified teams, i.e.
+    the same game id is retrieved from the schedules of both teams involved.
+    """
+    team_ids = sorted(team_ids)
+    pair_no = team_ids.index(home_id) * len(team_ids) + team_ids.index(road_id)
+    return (season % 100) * 100000 + game_type * 10000 + pair_no * GAMES_PER_OPPONENT + game_no
+
+
+def create_synthetic_schedule(season, game_type, team_id, config):
+    """
+    Creates synthetic schedule for specified team, season and game type with
+    each team facing each other team a fixed number of times at home and on
+    the road.
+    """
+    team_ids = list(config['teams'].keys())
+    if team_id not in team_ids:
+        return {'matches': list()}
+
+    matches = list()
+    start_date = datetime(season, 9, 15, 19, 30, 0)
+    for opp_id in sorted(team_ids):
+        if opp_id == team_id:
+            continue
+        for home_id, road_id in [(team_id, opp_id), (opp_id, team_id)]:
+            for game_no in range(GAMES_PER_OPPONENT):
+                game_id = get_synthetic_game_id(season, game_type, team_ids, home_id, road_id, game_no)
+                matches.append({
+                    'id': game_id,
+                    'round': str(game_no + 1),
+                    'start_date': (start_date + timedelta(days=game_id % 180)).strftime('%Y-%m-%d %H:%M:%S'),
+                    'status': 'AFTER_MATCH',
+                    'home': {'id': home_id, 'shortcut': config['teams'][home_id]},
+                    'guest': {'id': road_id, 'shortcut': config['teams'][road_id]},
+                    'results': {'score': {'final': {'score_home': 0, 'score_guest': 0}}},
+                })
+
+    return {'matches': sorted(matches, key=lambda m: m['id'])}
+
+
+def create_synthetic_payload(path, config):
+    """
+    Creates synthetic payload for specified request path. Schedules and
+    roster stats are structured like the original data, all other routes
+    receive a generic payload.
+    """
+    tokens = path.strip('/').split('/')
+    url_components = config['url_components']
+
+    # team-level data: <api>/<component>/<season>/<game_type>/<team_id>.json
+    if len(tokens) == 5 and tokens[0] == API_PREFIX.strip('/'):
+        component, season, game_type, team_file = tokens[1:]
+        if season.isdigit() and game_type.isdigit():
+            team_id = int(os.path.splitext(team_file)[0])
+            if component == url_components['schedules']:
+                return create_synthetic_schedule(int(season), int(game_type), team_id, config)
+            elif component == url_components['roster_stats']:
+                return [{'id': team_id * 1000 + plr_no, 'team_id': team_id} for plr_no in range(25, 0, -1)]
+
+    return {'path': path, 'synthetic': True}
+
+
+class MockDELRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles requests to the mock DEL API by serving recorded or synthetic
+    payloads while simulating latency, conditional requests, missing data and
+    server errors.
+    """
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload=None, last_modified=None):
+        """
+        Sends response with specified status, JSON payload and timestamp of
+        last modification.
+        """
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        if last_modified is not None:
+            self.send_header('Last-Modified', formatdate(last_modified.timestamp(), usegmt=True))
+        if payload is not None:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def get_payload(self, path):
+        """
+        Gets recorded payload for specified path from the payload directory
+        (if available) or creates a synthetic one.
+        """
+        if self.server.payload_dir:
+            payload_path = os.path.join(self.server.payload_dir, *path.strip('/').split('/'))
+            if os.path.isfile(payload_path):
+                return json.loads(open(payload_path).read())
+            if self.server.recorded_only:
+                return
+        return create_synthetic_payload(path, self.server.config)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        self.server.register_request()
+
+        # simulating network and server latency
+        if self.server.latency or self.server.jitter:
+            time.sleep(max(0, self.server.latency + random.uniform(-self.server.jitter, self.server.jitter)))
+
+        # simulating temporary server errors
+        if self.server.error_ratio and random.random() < self.server.error_ratio:
+            self.send_json(503)
+            return
+
+        if not path.startswith((API_PREFIX, DEL_PREFIX)):
+            self.send_json(404)
+            return
+
+        # simulating data missing from the JSON API, to be retrieved from the
+        # DEL website instead
+        if path.startswith(API_PREFIX) and get_path_fraction(path) < self.server.not_found_ratio:
+            self.send_json(404)
+            return
+
+        # data is considered modified with every request for a reproducible
+        # fraction of all paths
+        if get_path_fraction("modified:%s" % path) < self.server.modified_ratio:
+            last_modified = datetime.now().replace(microsecond=0)
+            if_modified_since = None
+        else:
+            last_modified = BASE_LAST_MODIFIED
+            if_modified_since = self.headers.get('If-Modified-Since')
+
+        if if_modified_since:
+            try:
+                if last_modified.timestamp() <= parsedate_to_datetime(if_modified_since).timestamp():
+                    self.send_json(304)
+                    return
+            except (TypeError, ValueError):
+                pass
+
+        payload = self.get_payload(path)
+        if payload is None:
+            self.send_json(404)
+            return
+
+        self.send_json(200, payload, last_modified)
+
+
+class MockDELServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server standing in for the DEL JSON API and website.
+    """
+    daemon_threads = True
+    # allowing for many concurrent connection attempts, the default backlog
+    # leads to dropped connections (and retransmission delays) under load
+    request_queue_size = 128
+
+    def __init__(
+            self, server_address, config=CONFIG, payload_dir=None, recorded_only=False, latency=0.0, jitter=0.0,
+            modified_ratio=0.0, not_found_ratio=0.0, error_ratio=0.0, verbose=False):
+        super().__init__(server_address, MockDELRequestHandler)
+        self.config = config
+        self.payload_dir = payload_dir
+        self.recorded_only = recorded_only
+        self.latency = latency
+        self.jitter = jitter
+        self.modified_ratio = modified_ratio
+        self.not_found_ratio = not_found_ratio
+        self.error_ratio = error_ratio
+        self.verbose = verbose
+        self.request_cnt = 0
+        self.request_cnt_lock = threading.Lock()
+
+    def register_request(self):
+        with self.request_cnt_lock:
+            self.request_cnt += 1
+
+    def get_base_urls(self):
+        """
+        Gets urls replacing the configured base urls for the JSON API and the
+        DEL website.
+        """
+        host, port = self.server_address[:2]
+        return "http://%s:%d%s" % (host, port, API_PREFIX), "http://%s:%d%s" % (host, port, DEL_PREFIX)
+
+
+def start_mock_server(host='127.0.0.1', port=0, **kwargs):
+    """
+    Starts mock DEL server in a background thread. Returns the server, use
+    its shutdown method to stop it again.
+    """
+    server = MockDELServer((host, port), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server
+
+
+if __name__ == '__main__':
+
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(description='Run local mock server standing in for the DEL API.')
+    parser.add_argument(
+        '--host', dest='host', required=False, default='127.0.0.1', metavar='host to bind to',
+        help="The host the server is bound to")
+    parser.add_argument(
+        '-p', '--port', dest='port', required=False, type=int, default=8765, metavar='port to listen on',
+        help="The port the server listens on")
+    parser.add_argument(
+        '--payload_dir', dest='payload_dir', required=False, metavar='directory with recorded payloads',
+        help="Directory with recorded payloads, stored at their request paths, e.g. api/matches/<id>/roster.json")
+    parser.add_argument(
+        '--recorded_only', dest='recorded_only', required=False, action='store_true',
+        help="Answer requests without recorded payload with 404 instead of synthetic payloads")
+    parser.add_argument(
+        '--latency', dest='latency', required=False, type=float, default=0.0, metavar='latency in seconds',
+        help="Latency added to each response")
+    parser.add_argument(
+        '--jitter', dest='jitter', required=False, type=float, default=0.0, metavar='jitter in seconds',
+        help="Maximum random deviation from the specified latency")
+    parser.add_argument(
+        '--modified_ratio', dest='modified_ratio', required=False, type=float, default=0.0,
+        metavar='ratio of modified data',
+        help="Ratio of paths with data modified with every request, all others are answered with 304 if possible")
+    parser.add_argument(
+        '--not_found_ratio', dest='not_found_ratio', required=False, type=float, default=0.0,
+        metavar='ratio of missing data',
+        help="Ratio of paths in the JSON API answered with 404 (to exercise alternative urls)")
+    parser.add_argument(
+        '--error_ratio', dest='error_ratio', required=False, type=float, default=0.0,
+        metavar='ratio of server errors',
+        help="Ratio of requests randomly answered with 503")
+    parser.add_argument(
+        '--verbose', dest='verbose', required=False, action='store_true',
+        help="Log each request")
+
+    args = parser.parse_args()
+
+    server = MockDELServer(
+        (args.host, args.port), CONFIG, args.payload_dir, args.recorded_only, args.latency, args.jitter,
+        args.modified_ratio, args.not_found_ratio, args.error_ratio, args.verbose)
+    api_url, del_url = server.get_base_urls()
+    print("+ Serving mock DEL API at %s" % api_url)
+    print("+ Serving mock DEL website at %s" % del_url)
+    print("+ Use these as base_url and del_base_url in config.yml")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+
+from sqlite_store import store_json, load_stored_json, is_stored
+
+# processed data held back in memory while a pipeline run is active, by
+# target path, along with options for the final dump
+HELD_DATA = dict()
+# functions writing further (non-JSON) files held back while a pipeline run is
+# active, by target path
+HELD_FILES = dict()
+HOLD_DATA = False
+
+
+def hold_data(hold=True):
+    """
+    Activates (or deactivates) holding back processed data in memory instead
+    of writing it to disk right away.
+    """
+    global HOLD_DATA
+    HOLD_DATA = hold
+
+
+def is_held(path):
+    return path in HELD_DATA
+
+
+def get_held_data(path):
+    """
+    Gets processed data held back in memory for specified path along with
+    the indentation it is to be dumped with.
+    """
+    return HELD_DATA[path]
+
+
+def exists(path):
+    """
+    Checks whether processed data is available from specified path, either
+    held back in memory, kept in the store or as an actual file.
+    """
+    return is_held(path) or is_stored(path) or os.path.isfile(path)
+
+
+def read_json(src_path):
+    """
+    Loads processed data from specified path, using data held back in memory
+    by a previous pipeline stage or kept in the store if available. Data held
+    in memory is shared between all subsequent stages and must not be
+    modified.
+    """
+    if src_path in HELD_DATA:
+        return HELD_DATA[src_path][0]
+
+    data = load_stored_json(src_path)
+    if data is not None:
+        return data
+
+    return json.loads(open(src_path).read())
+
+
+def dump_json(tgt_path, data, indent=2, default=None):
+    """
+    Dumps processed data to specified path or puts it into the store
+    instead, if the data is kept there.
+    """
+    if store_json(tgt_path, data, indent, default):
+        return
+
+    open(tgt_path, 'w').write(json.dumps(data, indent=indent, default=default))
+
+
+def write_json(tgt_path, data, indent=2, default=None):
+    """
+    Writes processed data to specified path (or the store). While data is
+    held back, it is only kept in memory in exactly the form later stages
+    would have loaded from disk, i.e. with string keys and non-JSON values
+    converted.
+    """
+    if not HOLD_DATA:
+        dump_json(tgt_path, data, indent, default)
+        return
+
+    HELD_DATA[tgt_path] = (json.loads(json.dumps(data, default=default)), indent)
+
+
+def write_file(tgt_path, write_func):
+    """
+    Writes a file to specified path using the specified function (called
+    with the target path) right away or, while data is held back, after all
+    processed data has been written.
+    """
+    if not HOLD_DATA:
+        write_func(tgt_path)
+        return
+
+    HELD_FILES[tgt_path] = write_func
+
+
+def checkpoint_held_data():
+    """
+    Gets checkpoint of all processed data currently held back in memory.
+    """
+    return dict(HELD_DATA), dict(HELD_FILES)
+
+
+def discard_held_data(checkpoint):
+    """
+    Discards all processed data held back in memory since the specified
+    checkpoint has been taken, e.g. by a pipeline stage that has failed.
+    """
+    held_data, held_files = checkpoint
+    HELD_DATA.clear()
+    HELD_DATA.update(held_data)
+    HELD_FILES.clear()
+    HELD_FILES.update(held_files)
+
+
+def write_held_data():
+    """
+    Writes all processed data held back in memory to disk (or the store).
+    Returns paths of written files.
+    """
+    tgt_paths = list()
+
+    for tgt_path, (data, indent) in HELD_DATA.items():
+        if not os.path.isdir(os.path.dirname(tgt_path)):
+            os.makedirs(os.path.dirname(tgt_path))
+        dump_json(tgt_path, data, indent)
+        tgt_paths.append(tgt_path)
+    for tgt_path, write_func in HELD_FILES.items():
+        write_func(tgt_path)
+        tgt_paths.append(tgt_path)
+
+    HELD_DATA.clear()
+    HELD_FILES.clear()
+
+    return tgt_paths
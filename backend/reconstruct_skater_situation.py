@@ -2,21 +2,23 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
 import yaml
 import argparse
 
 from collections import namedtuple, defaultdict
 
 import intervaltree
+import numpy as np
 
-from utils import get_game_info, get_game_type_from_season_type, get_home_road
+from utils import get_game_info, get_home_road
+from event_cache import load_game_events
+from game_store import load_games
+from situation_timeline import SituationInterval, SituationTimeline
 
 # loading external configuration
 CONFIG = yaml.safe_load(open(os.path.join(
     os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
 
-GAME_SRC = 'del_games.json'
 
 # named tuples to define various items
 GoalieChange = namedtuple('GoalieChange', ['time', 'team', 'home_road', 'type', 'player_id'])
@@ -24,17 +26,19 @@ GoalieShift = namedtuple('GoalieShift', ['player_id', 'team', 'home_road', 'from
 Penalty = namedtuple('Penalty', [
     'id', 'player_id', 'surname', 'team', 'home_road', 'infraction',
     'duration', 'from_time', 'to_time', 'create_time', 'actual_duration'])
+PenaltyGroup = namedtuple('PenaltyGroup', [
+    'penalties', 'teams', 'home_min_penalties', 'home_maj_penalties', 'road_min_penalties', 'road_maj_penalties'])
+
+# empty group of penalties for times no penalties have been created or
+# started at
+NO_PENALTIES = PenaltyGroup(list(), set(), list(), list(), list(), list())
 
 
 def build_interval_tree(game):
     """
     Builds interval tree containing all goalie shifts and penalties from current game.
     """
-    game_type = get_game_type_from_season_type(game)
-
-    game_events_src_path = os.path.join(
-        CONFIG['base_data_dir'], 'game_events', str(game['season']), str(game_type), "%d.json" % game['game_id'])
-    events_data = json.loads(open(game_events_src_path).read())
+    events_data = load_game_events(game)
 
     # setting up interval tree
     it = intervaltree.IntervalTree()
@@ -188,30 +192,116 @@ def create_penalty_interval(event, game, interval_tree):
             print(e)
 
 
+def index_penalties(penalties, time_attr):
+    """
+    Indexes minor and major penalties by the specified time attribute, e.g.
+    create or start time. Penalties at each time are sorted by actual
+    duration and start time, and additionally grouped by team and minor or
+    major penalties.
+    """
+    penalties_by_time = defaultdict(list)
+    for penalty in penalties:
+        if penalty.duration in (120, 300):
+            penalties_by_time[getattr(penalty, time_attr)].append(penalty)
+
+    penalty_index = dict()
+    for time, time_penalties in penalties_by_time.items():
+        time_penalties = sorted(time_penalties, key=lambda penalty: (penalty.actual_duration, penalty.from_time))
+        penalty_index[time] = PenaltyGroup(
+            time_penalties, set([penalty.home_road for penalty in time_penalties]),
+            [p for p in time_penalties if p.home_road == 'home' and p.duration == 120],
+            [p for p in time_penalties if p.home_road == 'home' and p.duration == 300],
+            [p for p in time_penalties if p.home_road == 'road' and p.duration == 120],
+            [p for p in time_penalties if p.home_road == 'road' and p.duration == 300])
+
+    return penalty_index
+
+
+def get_change_times(interval_tree, game_end, goal_times):
+    """
+    Gets all times of the game the skater situation may change at, i.e. when
+    goalie shifts and penalties start or end and when regulation ends. Times
+    goals have been scored at are included for verbose output.
+    """
+    change_times = set([1, 3601])
+    for interval in interval_tree:
+        # intervals are valid after their start up to (and including) their end
+        change_times.add(-interval.end + 1)
+        change_times.add(-interval.begin + 1)
+    change_times.update(goal_times)
+
+    return sorted([t for t in change_times if 1 <= t <= game_end])
+
+
+def get_situation_intervals(situations, game_end):
+    """
+    Converts skater situations at the specified times into intervals of
+    constant skater counts and goaltenders on ice, limiting skater counts to
+    the valid range.
+    """
+    situation_intervals = list()
+
+    for i, (from_time, (home, road, home_goalie, road_goalie)) in enumerate(situations):
+        to_time = situations[i + 1][0] - 1 if i + 1 < len(situations) else game_end
+        home = min(max(home, 3), 6)
+        road = min(max(road, 3), 6)
+        # extending previous interval if situation hasn't changed
+        if situation_intervals and situation_intervals[-1][2:] == (home, road, home_goalie, road_goalie):
+            situation_intervals[-1] = situation_intervals[-1]._replace(to_time=to_time)
+            continue
+        situation_intervals.append(SituationInterval(from_time, to_time, home, road, home_goalie, road_goalie))
+
+    return situation_intervals
+
+
 def reconstruct_skater_situation(game, verbose=False):
     """
-    Reconstruct skater on-ice situation for specified game.
+    Reconstruct skater on-ice situation for specified game, i.e. skater counts
+    and goaltenders on ice for each second of the game.
     """
-    print("+ Reconstructing on-ice skater situation for game %s" % get_game_info(game))
+    situation_intervals, goal_times = reconstruct_situation_intervals(game, verbose)
+
+    return SituationTimeline.from_intervals(situation_intervals, game), goal_times
+
 
+def reconstruct_situation_intervals(game, verbose=False):
+    """
+    Reconstruct skater on-ice situation for specified game as intervals of
+    constant skater counts and goaltenders on ice.
+    """
     # building interval tree to query goalies and player situations
     # receiving a list of times when goals has been scored
     it, goal_times = build_interval_tree(game)
 
+    return sweep_situation_intervals(game, it, goal_times, verbose), goal_times
+
+
+def sweep_situation_intervals(game, it, goal_times, verbose=False, anomalies=None):
+    """
+    Reconstruct skater on-ice situation for specified game from interval
+    tree of goalie shifts and penalties. The situation is only evaluated at
+    times it may actually change at. Implausible skater counts are collected
+    along with the time they occurred at in the specified list (if any).
+    """
+    print("+ Reconstructing on-ice skater situation for game %s" % get_game_info(game))
+
     # retrieving all penalties
     all_penalties = list()
     for interval in it:
         if isinstance(interval.data, Penalty):
             penalty = interval.data
             all_penalties.append(penalty)
+    # indexing penalties by time of creation and start time
+    created_penalties = index_penalties(all_penalties, 'create_time')
+    started_penalties_by_time = index_penalties(all_penalties, 'from_time')
 
     # retrieving game end (in seconds) from interval tree
     game_end = - it.range().begin
     # retrieving goalies on ice and extra attackers for current game
     goalies_on_ice, extra_attackers = reconstruct_goalie_situation(it)
 
-    # setting up dictionary to hold skater situations for each second of the game
-    time_dict = dict()
+    # setting up list to hold skater situations at all times they may change at
+    situations = list()
 
     # setting up container to hold goalie/penalty intervals that have been
     # valid previously
@@ -226,9 +316,11 @@ def reconstruct_skater_situation(game, verbose=False):
     skr_count = {'home': 5, 'road': 5}
 
     # setting up skater situation at the beginning of the game
-    time_dict[0] = {**skr_count, **goalies_on_ice[0]}
+    start_goalies = get_goalies_on_ice(goalies_on_ice, 0)
+    situations.append((0, (
+        skr_count['home'], skr_count['road'], start_goalies['home_goalie'], start_goalies['road_goalie'])))
 
-    for t in range(1, game_end + 1):
+    for t in get_change_times(it, game_end, goal_times):
         # setting up containers holding the difference in skater/goalie numbers
         # in comparison to previous numbers produced by the currently
         # ongoing intervals
@@ -269,30 +361,17 @@ def reconstruct_skater_situation(game, verbose=False):
                     current_penalties[penalty.home_road].append(penalty)
 
             # collecting penalties that have been created at the current time
-            penalties = list(filter(
-                lambda penalty: penalty.create_time == (t - 1) and penalty.duration in (120, 300), all_penalties))
-            # if no penalties have been created at the current time, collect
-            # all penalties that have started at the current time
-            if not penalties:
-                penalties = list(filter(
-                    lambda penalty: penalty.from_time == (t - 1) and penalty.duration in (120, 300), all_penalties))
-
-            # sorting collected penalties by actual duration and start time
-            penalties = sorted(penalties, key=lambda penalty: (penalty.actual_duration, penalty.from_time))
-            # retrieving and sorting penalties taken by home team
-            home_penalties = list(filter(lambda penalty: penalty.home_road == 'home', penalties))
-            home_penalties = sorted(home_penalties, key=lambda penalty: (penalty.actual_duration, penalty.from_time))
-            # retrieving and sorting penalties taken by road team
-            road_penalties = list(filter(lambda penalty: penalty.home_road == 'road', penalties))
-            road_penalties = sorted(road_penalties, key=lambda penalty: (penalty.actual_duration, penalty.from_time))
-            # grouping minor and major penalties taken by home team
-            home_min_penalties = list(filter(lambda penalty: penalty.duration == 120, home_penalties))
-            home_maj_penalties = list(filter(lambda penalty: penalty.duration == 300, home_penalties))
-            # grouping minor and major penalties taken by road team
-            road_min_penalties = list(filter(lambda penalty: penalty.duration == 120, road_penalties))
-            road_maj_penalties = list(filter(lambda penalty: penalty.duration == 300, road_penalties))
+            # or, if there are none, all penalties that have started at the
+            # current time, both sorted by actual duration and start time and
+            # grouped by team and minor or major penalties
+            penalty_group = created_penalties.get(t - 1, started_penalties_by_time.get(t - 1, NO_PENALTIES))
+            penalties = penalty_group.penalties
+            home_min_penalties = penalty_group.home_min_penalties
+            home_maj_penalties = penalty_group.home_maj_penalties
+            road_min_penalties = penalty_group.road_min_penalties
+            road_maj_penalties = penalty_group.road_maj_penalties
             # retrieving all teams taking penalties at current time
-            penalty_teams = set([p.home_road for p in penalties])
+            penalty_teams = penalty_group.teams
 
             # continuing if no penalties have been created or started at
             # the current time of the game
@@ -474,11 +553,13 @@ def reconstruct_skater_situation(game, verbose=False):
         adjust_skater_count_in_overtime(game, t, skr_count)
 
         # testing modified skater counts
-        test_skater_counts(skr_count)
+        for message in test_skater_counts(skr_count):
+            if anomalies is not None:
+                anomalies.append((t, message))
 
         if verbose:
             addendum = ''
-            if any(extra_attackers[t].values()):
+            if extra_attackers['home'][t] or extra_attackers['road'][t]:
                 addendum = '(with extra attacker)'
             if current_intervals != last_intervals:
                 print("%dv%d %s" % (skr_count['home'], skr_count['road'], addendum))
@@ -486,67 +567,72 @@ def reconstruct_skater_situation(game, verbose=False):
                 print("--> %d:%02d (%d)" % (t // 60, t % 60, t))
                 print("%dv%d %s" % (skr_count['home'], skr_count['road'], addendum))
 
-        time_dict[t] = {**skr_count, **current_goalies}
+        situations.append((t, (
+            skr_count['home'], skr_count['road'], current_goalies['home_goalie'], current_goalies['road_goalie'])))
         # saving currently valid intervals for comparison at next
-        # second in the game
+        # time of change in the game
         last_intervals = current_intervals
 
-    for t in time_dict:
-        for key in ['home', 'road']:
-            if time_dict[t][key] < 3:
-                time_dict[t][key] = 3
-            if time_dict[t][key] > 6:
-                time_dict[t][key] = 6
-            time_dict[t][game["%s_abbr" % key]] = time_dict[t][key]
+    return get_situation_intervals(situations, game_end)
+
+
+def get_goalie_shifts(interval_tree):
+    """
+    Gets all goalie shifts from specified interval tree, sorted by start
+    time.
+    """
+    return sorted(
+        [interval.data for interval in interval_tree if isinstance(interval.data, GoalieShift)],
+        key=lambda goalie_shift: (goalie_shift.from_time, goalie_shift.home_road))
+
+
+def rasterize_goalie_shifts(goalie_shifts, game_end):
+    """
+    Rasterizes specified goalie shifts into arrays holding the id of the
+    goaltender on ice (or zero if there is none) for each second of the game
+    for both home and road team. As in the interval tree, goalie shifts are
+    valid after their start up to (and including) their end.
+    """
+    goalies = {
+        'home': np.zeros(game_end + 1, dtype=np.int32),
+        'road': np.zeros(game_end + 1, dtype=np.int32)}
 
-    return time_dict, goal_times
+    for goalie_shift in goalie_shifts:
+        goalies[goalie_shift.home_road][max(goalie_shift.from_time + 1, 0):goalie_shift.to_time + 1] = (
+            goalie_shift.player_id)
+
+    return goalies
 
 
 def reconstruct_goalie_situation(interval_tree):
     """
     Reconstructs goaltender situation, i.e. which goaltender was on ice for
-    each second of the current game.
+    each second of the current game. Returns arrays of goaltender ids and
+    flags indicating an extra attacker, i.e. an empty net, for home and road
+    team.
     """
-    game_end = - interval_tree.range().begin
-    goalies_on_ice = dict()
+    goalies_on_ice = rasterize_goalie_shifts(get_goalie_shifts(interval_tree), - interval_tree.range().begin)
     extra_attackers = dict()
 
-    for t in range(0, game_end + 1):
-        # retrieving currently ongoing goalie shifts
-        goalie_shift_intervals = query_interval_tree_by_type(interval_tree, -t, GoalieShift)
+    for home_road in goalies_on_ice:
         # adjusting for start of the game
-        if t == 0:
-            goalie_shift_intervals = query_interval_tree_by_type(interval_tree, -t - 1, GoalieShift)
-        # container for current goalies
-        current_goalies = {'home_goalie': None, 'road_goalie': None}
-        # container for extra attacker info
-        current_extra_attacker = {'home': False, 'road': False}
-        # setting current goalies according to ongoing goalie shifts
-        for goalie_shift in goalie_shift_intervals:
-            current_goalies["%s_goalie" % goalie_shift.home_road] = goalie_shift.player_id
-        if current_goalies['home_goalie'] is None:
-            current_extra_attacker['home'] = True
-        if current_goalies['road_goalie'] is None:
-            current_extra_attacker['road'] = True
-
-        goalies_on_ice[t] = current_goalies
-        extra_attackers[t] = current_extra_attacker
+        goalies_on_ice[home_road][0] = goalies_on_ice[home_road][1]
+        extra_attackers[home_road] = goalies_on_ice[home_road] == 0
 
     return goalies_on_ice, extra_attackers
 
 
-def query_interval_tree_by_type(interval_tree, time, type):
+def get_goalies_on_ice(goalies_on_ice, time):
     """
-    Returns only items of specified type from interval tree at given time.
+    Gets ids of goaltenders on ice (or None for an empty net) at specified
+    time from reconstructed goaltender situation.
     """
-    all_intervals = interval_tree[time]
-
-    selected_intervals = set()
-    for interval in all_intervals:
-        if isinstance(interval[-1], type):
-            selected_intervals.add(interval.data)
+    current_goalies = dict()
+    for home_road in ['home', 'road']:
+        goalie_id = int(goalies_on_ice[home_road][time])
+        current_goalies["%s_goalie" % home_road] = goalie_id if goalie_id else None
 
-    return selected_intervals
+    return current_goalies
 
 
 def adjust_skater_count_in_overtime(game, time, skr_count):
@@ -585,37 +671,41 @@ def adjust_skater_counts_for_goalies(time, goalies_on_ice, curr_goalie_delta):
     """
     Adjusts skater counts in accordance to goalies currently on ice.
     """
-    # determining goalies currently on ice
-    current_goalies = goalies_on_ice[time]
-    # determining goalies on ice in the previous second
-    previous_goalies = goalies_on_ice[time - 1]
-    for home_road in current_goalies:
+    for home_road in goalies_on_ice:
+        # determining goalies currently on ice and in the previous second
+        current_goalie = goalies_on_ice[home_road][time]
+        previous_goalie = goalies_on_ice[home_road][time - 1]
         # adding skater if goalie has left the ice between now and the
         # previous second
-        if current_goalies[home_road] is None and previous_goalies[home_road]:
-            curr_goalie_delta[home_road.replace("_goalie", "")] += 1
+        if not current_goalie and previous_goalie:
+            curr_goalie_delta[home_road] += 1
         # subtracting skater if goalie has come back on ice after being off
         # the previous second
-        if current_goalies[home_road] and previous_goalies[home_road] is None:
-            curr_goalie_delta[home_road.replace("_goalie", "")] -= 1
+        if current_goalie and not previous_goalie:
+            curr_goalie_delta[home_road] -= 1
 
-    return current_goalies
+    return get_goalies_on_ice(goalies_on_ice, time)
 
 
 def test_skater_counts(skater_count):
     """
     Testing modified skater counts and notifying user if lower and upper limits
-    have been exceeded.
+    have been exceeded. Returns all notifications issued.
     """
+    messages = list()
     for key in ['home', 'road']:
         try:
             assert skater_count[key] >= 3
         except AssertionError:
-            print("Skater number for %s team under limit of 3: %d" % (key, skater_count[key]))
+            messages.append("Skater number for %s team under limit of 3: %d" % (key, skater_count[key]))
         try:
             assert skater_count[key] <= 6
         except AssertionError:
-            print("Skater number for %s team over limit of 6: %d" % (key, skater_count[key]))
+            messages.append("Skater number for %s team over limit of 6: %d" % (key, skater_count[key]))
+    for message in messages:
+        print(message)
+
+    return messages
 
 
 def switch_team(team):
@@ -650,10 +740,9 @@ if __name__ == '__main__':
 
     # setting up path to source data file
     src_dir = os.path.join(CONFIG['tgt_processing_dir'], str(season))
-    src_path = os.path.join(src_dir, GAME_SRC)
 
     # loading games
-    games = json.loads(open(src_path).read())
+    games = load_games(src_dir)
 
     for game in games:
         if game_id and game['game_id'] != game_id:
@@ -2,12 +2,12 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
 import yaml
 import argparse
 import statistics
 
 from operator import itemgetter
+from pipeline_data import read_json, write_json
 
 
 # loading external configuration
@@ -122,13 +122,13 @@ if __name__ == '__main__':
     tgt_bottom_gs_path = os.path.join(tgt_dir, GAME_SCORE_TGT % 'bottom')
 
     # loading player and goalie stats
-    player_stats = json.loads(open(src_player_stats_path).read())[-1]
+    player_stats = read_json(src_player_stats_path)[-1]
     print("+ %d player stats items loaded" % len(player_stats))
     skater_stats = list(filter(lambda ps: ps['position'] != 'GK', player_stats))
     print("+ Retained %d skater stats items" % len(skater_stats))
-    goalie_stats = json.loads(open(src_goalie_stats_path).read())
+    goalie_stats = read_json(src_goalie_stats_path)
     print("+ %d goalie stats items loaded" % len(goalie_stats))
-    orig_personal_data = json.loads(open(src_personal_data_path).read())[-1]
+    orig_personal_data = read_json(src_personal_data_path)[-1]
 
     personal_data = dict()
     for pd_item in orig_personal_data:
@@ -139,5 +139,5 @@ if __name__ == '__main__':
     # collecting top and bottom game scores
     top_game_scores, bottom_game_scores = retrieve_top_bottom_game_scores(all_stats, personal_data)
 
-    open(tgt_top_gs_path, 'w').write(json.dumps(top_game_scores, indent=2))
-    open(tgt_bottom_gs_path, 'w').write(json.dumps(bottom_game_scores, indent=2))
+    write_json(tgt_top_gs_path, top_game_scores)
+    write_json(tgt_bottom_gs_path, bottom_game_scores)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+import yaml
+import runpy
+import argparse
+
+from collections import namedtuple
+
+from pipeline_data import hold_data, checkpoint_held_data, discard_held_data, write_held_data
+from download_manifest import add_manifest_arguments, save_manifest
+from build_cache import BuildCache, BUILD_CACHE_TGT, BUILD_CHANGES_DIR
+from schedule_index import load_schedule_index
+
+# loading external configuration
+CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
+
+Stage = namedtuple(
+    'Stage', ['script', 'dependencies', 'options', 'raw_inputs', 'season_wide'], defaults=[[], False])
+
+# processing stages with the stages they depend upon, the (common) command
+# line options they accept, the raw data they use besides per-game data and
+# whether their data is derived from all games (or players) at once, e.g.
+# league-wide averages, and therefore affects data of dependent stages for
+# all games whenever it is re-created
+STAGES = {
+    'games': Stage('get_del_games.py', [], ['season', 'dates', 'initial', 'manifest']),
+    'players': Stage('get_all_players.py', [], [], ['roster_stats'], season_wide=True),
+    'shots': Stage('get_shots.py', ['games', 'players'], ['season', 'initial', 'manifest']),
+    'league_stats': Stage('get_league_wide_stats.py', ['shots'], ['season', 'initial'], season_wide=True),
+    'player_game_stats': Stage('get_del_player_game_stats.py', ['games', 'shots'], ['season', 'initial', 'manifest']),
+    'team_game_stats': Stage('get_del_team_game_stats.py', ['games', 'shots'], ['season', 'initial', 'manifest']),
+    'goalie_game_stats': Stage(
+        'get_del_goalie_stats.py', ['games', 'shots', 'players', 'player_game_stats', 'league_stats'],
+        ['season', 'initial', 'manifest']),
+    'aggregated_stats': Stage(
+        'aggregate_del_player_game_stats.py', ['player_game_stats', 'goalie_game_stats', 'shots'], ['season'],
+        season_wide=True),
+    'streaks': Stage('get_streaks.py', ['games', 'players', 'player_game_stats'], ['season'], season_wide=True),
+    'game_scores': Stage(
+        'retain_top_bottom_game_scores.py', ['player_game_stats', 'goalie_game_stats', 'aggregated_stats'],
+        ['season'], season_wide=True),
+    'export': Stage(
+        'export_store.py', ['games', 'shots', 'player_game_stats', 'goalie_game_stats'], ['season']),
+}
+
+
+def get_stage_order(stages, selected=None):
+    """
+    Gets order of execution for selected (or all) stages, each stage
+    following all the stages it depends upon. Dependencies that haven't been
+    selected are skipped, i.e. their data is loaded from disk.
+    """
+    if selected is None:
+        selected = list(stages)
+
+    stage_order = list()
+    visiting = set()
+
+    def visit(stage_name):
+        if stage_name in stage_order:
+            return
+        if stage_name in visiting:
+            raise ValueError("Circular dependency of stage '%s'" % stage_name)
+        visiting.add(stage_name)
+        for dependency in stages[stage_name].dependencies:
+            visit(dependency)
+        visiting.discard(stage_name)
+        stage_order.append(stage_name)
+
+    for stage_name in stages:
+        visit(stage_name)
+
+    return [stage_name for stage_name in stage_order if stage_name in selected]
+
+
+def get_stage_args(stage, args, initial=False, manifest_paths=None):
+    """
+    Gets command line arguments for the script of specified stage from the
+    arguments specified for the pipeline. Optionally enforces re-creation of
+    all data or reprocessing of the games from additional manifests.
+    """
+    stage_args = list()
+    initial = initial or args.initial
+    manifest_paths = (args.manifest or list()) + (manifest_paths or list())
+
+    if 'season' in stage.options:
+        stage_args += ['-s', str(args.season)]
+    if 'dates' in stage.options:
+        if args.from_date:
+            stage_args += ['-f', args.from_date]
+        elif initial:
+            # re-creating data for the whole season
+            stage_args += ['-f', "%d-06-01" % args.season]
+        if args.to_date:
+            stage_args += ['-t', args.to_date]
+        elif initial:
+            stage_args += ['-t', "%d-05-31" % (args.season + 1)]
+    if 'initial' in stage.options and initial:
+        stage_args.append('--initial')
+    if 'manifest' in stage.options:
+        if manifest_paths:
+            stage_args += ['--manifest'] + manifest_paths
+        if args.changed_since:
+            stage_args += ['--changed_since', args.changed_since]
+
+    return stage_args
+
+
+def get_build_plan(stage_order, build_cache, stage_fingerprints, changed_games):
+    """
+    Determines stages that have to be run according to the specified build
+    cache, i.e. stages with modified code, configuration or further raw data,
+    changed games or depending upon stages that have to be run. Returns
+    whether data of each stage has to be re-created from scratch, i.e.
+    because of modified code or configuration of the stage itself or one of
+    its dependencies or because a season-wide stage it depends upon is run.
+    Changed games are only regarded for stages processing data of a season.
+    """
+    build_plan = dict()
+
+    for stage_name in stage_order:
+        stage = STAGES[stage_name]
+        dependencies_run = [dependency for dependency in stage.dependencies if dependency in build_plan]
+        initial = build_cache.is_modified(stage_name, stage_fingerprints[stage_name], 'code') or any(
+            [build_plan[dependency] or STAGES[dependency].season_wide for dependency in dependencies_run])
+        games_changed = 'season' in stage.options and changed_games[stage_name]
+        if (
+            initial or dependencies_run or games_changed or
+            build_cache.is_modified(stage_name, stage_fingerprints[stage_name], 'inputs')
+        ):
+            build_plan[stage_name] = initial
+
+    return build_plan
+
+
+def run_stage(stage, stage_args):
+    """
+    Runs script of specified stage with the specified command line arguments
+    in the current process.
+    """
+    script_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), stage.script)
+    orig_argv = sys.argv
+    sys.argv = [script_path] + stage_args
+    try:
+        runpy.run_path(script_path, run_name='__main__')
+    finally:
+        sys.argv = orig_argv
+
+
+def run_pipeline(stage_runs, timings, written_stages):
+    """
+    Runs specified stages with their command line arguments in the given
+    order, handing processed data over to subsequent stages in memory. All
+    processed data is written to disk once all stages have been run (or one
+    of them has failed, discarding data of the failed stage). Run times of
+    all completed stages are collected in the specified list, names of
+    completed stages are added to the list of written stages only after
+    their data has been written successfully.
+    """
+    hold_data()
+    completed_stages = list()
+    try:
+        for stage_name, stage_args in stage_runs:
+            print("+ Running stage '%s'" % stage_name)
+            start = time.perf_counter()
+            checkpoint = checkpoint_held_data()
+            try:
+                run_stage(STAGES[stage_name], stage_args)
+            except BaseException:
+                # discarding data of a stage that hasn't been completed
+                discard_held_data(checkpoint)
+                raise
+            timings.append((stage_name, time.perf_counter() - start))
+            completed_stages.append(stage_name)
+    finally:
+        hold_data(False)
+        start = time.perf_counter()
+        tgt_paths = write_held_data()
+        timings.append(('(writing %d files)' % len(tgt_paths), time.perf_counter() - start))
+        written_stages.extend(completed_stages)
+
+
+if __name__ == '__main__':
+
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(description='Run DEL data processing stages in a single process.')
+    parser.add_argument(
+        'stages', metavar='stage', nargs='*',
+        help="The stages to be run (default: all), data of stages not run is loaded from disk. Available: %s" % (
+            ", ".join(STAGES)))
+    parser.add_argument(
+        '-s', '--season', dest='season', required=False, type=int, default=CONFIG['default_season'],
+        choices=CONFIG['seasons'], metavar='season to process data for',
+        help="The season information will be processed for")
+    parser.add_argument(
+        '-f', '--from', dest='from_date', required=False, metavar='first date to process games for',
+        help="The first date information will be processed for")
+    parser.add_argument(
+        '-t', '--to', dest='to_date', required=False, metavar='last date to process games for',
+        help="The last date information will be processed for")
+    parser.add_argument(
+        '--initial', dest='initial', required=False, action='store_true',
+        help='Re-create all processed data')
+    parser.add_argument(
+        '--build_cache', dest='build_cache', required=False, action='store_true',
+        help="Only run stages (and process games) with inputs modified since the last run")
+    add_manifest_arguments(parser)
+
+    args = parser.parse_args()
+
+    for stage_name in args.stages:
+        if stage_name not in STAGES:
+            parser.error("unknown stage '%s'" % stage_name)
+
+    stage_order = get_stage_order(STAGES, args.stages or None)
+
+    if args.build_cache:
+        tgt_dir = os.path.join(CONFIG['tgt_processing_dir'], str(args.season))
+        build_cache = BuildCache(os.path.join(tgt_dir, BUILD_CACHE_TGT))
+        # fingerprinting raw data of all games as well as code and further raw data of all stages
+        schedule_index = load_schedule_index(os.path.join(CONFIG['base_data_dir'], 'schedules'))
+        game_fingerprints = build_cache.get_game_fingerprints(args.season, schedule_index)
+        stage_fingerprints = {
+            stage_name: build_cache.get_stage_fingerprints(STAGES[stage_name]) for stage_name in stage_order}
+        changed_games = {
+            stage_name: build_cache.get_changed_games(
+                stage_name, args.season, game_fingerprints) for stage_name in stage_order}
+        build_plan = get_build_plan(stage_order, build_cache, stage_fingerprints, changed_games)
+
+        stage_runs = list()
+        for stage_name in stage_order:
+            if stage_name not in build_plan:
+                print("+ Skipping stage '%s' with unchanged inputs" % stage_name)
+                continue
+            # saving games changed since the last run of the stage to a manifest
+            manifest_paths = list()
+            if not build_plan[stage_name] and changed_games[stage_name] and 'manifest' in STAGES[stage_name].options:
+                manifest_path = os.path.join(tgt_dir, BUILD_CHANGES_DIR, "%s.json" % stage_name)
+                if not os.path.isdir(os.path.dirname(manifest_path)):
+                    os.makedirs(os.path.dirname(manifest_path))
+                save_manifest(manifest_path, changed_games[stage_name])
+                manifest_paths.append(manifest_path)
+                print("+ Processing %d changed games in stage '%s'" % (len(changed_games[stage_name]), stage_name))
+            stage_runs.append((stage_name, get_stage_args(
+                STAGES[stage_name], args, build_plan[stage_name], manifest_paths)))
+    else:
+        build_cache = None
+        stage_runs = [(stage_name, get_stage_args(STAGES[stage_name], args)) for stage_name in stage_order]
+
+    print("+ Running stages: %s" % ", ".join([stage_name for stage_name, _ in stage_runs]))
+
+    timings = list()
+    written_stages = list()
+    try:
+        run_pipeline(stage_runs, timings, written_stages)
+    finally:
+        # registering fingerprints of all stages that have been completed and written successfully
+        if build_cache is not None:
+            for stage_name in written_stages:
+                build_cache.register_stage(stage_name, stage_fingerprints[stage_name], game_fingerprints)
+            build_cache.save()
+
+    print("+ Stage timings:")
+    for stage_name, run_time in timings:
+        print("\t+ %-25s %8.2f s" % (stage_name, run_time))
+    print("\t+ %-25s %8.2f s" % ('total', sum([run_time for _, run_time in timings])))
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+
+from collections import defaultdict
+
+from dateutil.parser import parse
+
+SCHEDULE_INDEX_TGT = 'schedule_index.json'
+
+ROUND_MAPPING = {
+    '1. Playoff-Runde': 'first_round',
+    'Viertelfinale': 'quarter_finals',
+    'Halbfinale': 'semi_finals',
+    'Finale': 'finals',
+    # MSC rounds:
+    'Halbfinale 1': 'semi_finals',
+    'Halbfinale 2': 'semi_finals',
+}
+
+
+def normalize_round(round):
+    """
+    Converts round designation from original schedule data, e.g. for
+    playoff games, into a normalized form.
+    """
+    # regular season rounds are just numbers
+    if not round or round.isdigit():
+        return round
+    try:
+        rnd_type, rnd = round.rsplit(maxsplit=1)
+        return "_".join((ROUND_MAPPING[rnd_type], rnd))
+    except (ValueError, KeyError):
+        # single-word rounds are only checked for validity and retain the
+        # designation they have originally been given
+        ROUND_MAPPING[round]
+        return "rnd_type_%d" % 1
+
+
+def get_schedule_index_path(schedule_dir):
+    """
+    Gets path to schedule index for specified schedule directory. The index
+    is stored alongside (not within) the schedule directory.
+    """
+    return os.path.join(os.path.dirname(os.path.normpath(schedule_dir)), SCHEDULE_INDEX_TGT)
+
+
+def load_schedule_index(schedule_dir, update=True):
+    """
+    Loads persisted schedule index for specified schedule directory and
+    (optionally) updates it with all team schedules that have been modified
+    since the last update.
+    """
+    index_path = get_schedule_index_path(schedule_dir)
+    if os.path.isfile(index_path):
+        index = json.loads(open(index_path).read())
+    else:
+        index = {'files': dict(), 'games': dict()}
+
+    if update and update_schedule_index(schedule_dir, index):
+        open(index_path, 'w').write(json.dumps(index))
+    elif any('position' not in game for game in index['games'].values()):
+        # indexes persisted by earlier versions lack schedule positions
+        order_schedule_index(index)
+        if update:
+            open(index_path, 'w').write(json.dumps(index))
+
+    return index
+
+
+def update_schedule_index(schedule_dir, index):
+    """
+    Updates specified schedule index by (re-)parsing only those team
+    schedules that have been added or modified since their last
+    registration. Returns whether the index has been changed.
+    """
+    # collecting timestamps of last modification for all team schedules
+    current_files = dict()
+    for dirpath, _, filenames in os.walk(schedule_dir):
+        for schedule_file in filenames:
+            if not schedule_file.endswith('.json'):
+                continue
+            src_path = os.path.join(dirpath, schedule_file)
+            rel_path = os.path.relpath(src_path, schedule_dir).replace(os.sep, '/')
+            current_files[rel_path] = os.path.getmtime(src_path)
+
+    changed_files = [
+        rel_path for rel_path, mtime in current_files.items() if
+        rel_path not in index['files'] or index['files'][rel_path]['mtime'] != mtime]
+    removed_files = [rel_path for rel_path in index['files'] if rel_path not in current_files]
+
+    if not changed_files and not removed_files:
+        return False
+
+    # collecting ids of games only registered from removed team schedules
+    for rel_path in removed_files:
+        removed_game_ids = set(index['files'].pop(rel_path)['game_ids'])
+        for file_data in index['files'].values():
+            removed_game_ids.difference_update(file_data['game_ids'])
+        for game_id in removed_game_ids:
+            index['games'].pop(str(game_id), None)
+
+    for rel_path in sorted(changed_files):
+        # retrieving season and game type from path to team schedule
+        season, game_type = [int(token) for token in rel_path.split('/')[-3:-1]]
+        src_path = os.path.join(schedule_dir, *rel_path.split('/'))
+        schedule = json.loads(open(src_path).read())['matches']
+        for game in schedule:
+            index['games'][str(game['id'])] = {
+                'game_id': game['id'],
+                'season': season,
+                'game_type': game_type,
+                'home_id': game['home']['id'],
+                'road_id': game['guest']['id'],
+                'start_date': game['start_date'],
+                'status': game['status'],
+                'round': normalize_round(game['round']),
+                'match': game,
+            }
+        index['files'][rel_path] = {
+            'mtime': current_files[rel_path], 'game_ids': [game['id'] for game in schedule]}
+
+    order_schedule_index(index)
+
+    return True
+
+
+def get_schedule_file_key(rel_path):
+    """
+    Gets sort key for team schedule at specified relative path, i.e. season,
+    game type and team id.
+    """
+    return tuple(int(token) for token in rel_path[:-len('.json')].split('/')[-3:])
+
+
+def order_schedule_index(index):
+    """
+    Registers position of each indexed game in the full league schedule, i.e.
+    the order in which games are first encountered when going through team
+    schedules by season, game type and team id, and arranges indexed games
+    accordingly.
+    """
+    position = 0
+    ordered_games = dict()
+    for rel_path in sorted(index['files'], key=get_schedule_file_key):
+        for game_id in index['files'][rel_path]['game_ids']:
+            if str(game_id) in ordered_games or str(game_id) not in index['games']:
+                continue
+            game = index['games'][str(game_id)]
+            game['position'] = position
+            ordered_games[str(game_id)] = game
+            position += 1
+
+    index['games'] = ordered_games
+
+
+def get_game(index, game_id):
+    """
+    Gets indexed information for game with specified id.
+    """
+    return index['games'].get(str(game_id))
+
+
+def get_games(index, season='', game_type='', team='', status=''):
+    """
+    Gets indexed information for all games matching the specified season,
+    game type, team and/or status in the order of the full league schedule.
+    """
+    games = list()
+    for game in index['games'].values():
+        if season and game['season'] != int(season):
+            continue
+        if game_type and game['game_type'] != int(game_type):
+            continue
+        if team and int(team) not in (game['home_id'], game['road_id']):
+            continue
+        if status and game['status'] != status:
+            continue
+        games.append(game)
+
+    return games
+
+
+def get_games_by_date(index, status=None):
+    """
+    Groups indexed information for all games (optionally only those with one
+    of the specified statuses) by date of play in a single pass over the
+    index, retaining the order of the full league schedule.
+    """
+    games_by_date = defaultdict(list)
+    for game in index['games'].values():
+        if status and game['status'] not in status:
+            continue
+        try:
+            start_date = parse(game['start_date']).date()
+        except ValueError:
+            continue
+        games_by_date[start_date].append(game)
+
+    return games_by_date
@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+
+import numpy as np
+
+from pipeline_data import is_held, read_json, write_file
+from sqlite_store import open_store_table, get_stored_mtime
+
+SHOT_TABLE_TGT = 'del_shots.npz'
+SHOT_DATA_SRC = 'del_shots.json'
+
+# shot tables set up from shot data held in memory, by source path
+HELD_TABLES = dict()
+
+
+def encode_value(value):
+    return json.dumps(value, default=str)
+
+
+class ShotTable():
+    """
+    Columnar representation of shot data. Integer, float and boolean
+    attributes are stored as typed arrays, lists of integers (e.g. players on
+    ice) as flattened values with offsets and a mask designating shots that
+    actually have the attribute. All other attributes (e.g. team,
+    shot zone or situation) are dictionary-encoded, i.e. stored as codes
+    referring to a list of distinct (JSON-encoded) values with a code of -1
+    indicating that a shot doesn't have the attribute at all.
+    """
+    def __init__(self, size, columns):
+        self.size = size
+        # columns by field as tuples of kind and arrays (or categories)
+        self.columns = columns
+        self.decoded = dict()
+
+    def __len__(self):
+        return self.size
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Sets up shot table from specified list of shot dictionaries.
+        """
+        fields = dict()
+        for record in records:
+            for field in record:
+                fields[field] = None
+
+        columns = dict()
+        for field in fields:
+            values = [record.get(field, cls) for record in records]
+            columns[field] = cls.encode_column(values)
+
+        return cls(len(records), columns)
+
+    @classmethod
+    def encode_column(cls, values):
+        """
+        Encodes specified values of a single attribute (with missing values
+        designated by the class itself) using the most compact kind of
+        column possible.
+        """
+        present = np.array([value is not cls for value in values], dtype=bool)
+        types = set([type(value) for value in values if value is not cls])
+
+        if types == {bool} and present.all():
+            return ('bool', np.array(values, dtype=bool))
+        if types == {int} and present.all():
+            return ('int', np.array(values, dtype=np.int64))
+        if types == {float} and present.all():
+            return ('float', np.array(values, dtype=np.float64))
+        if types == {list} and all([
+                type(item) is int for value in values if value is not cls for item in value]):
+            values = [value if value is not cls else list() for value in values]
+            offsets = np.zeros(len(values) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(value) for value in values])
+            return ('list', np.array([item for value in values for item in value], dtype=np.int64), offsets, present)
+
+        categories = dict()
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            if value is cls:
+                codes[i] = -1
+                continue
+            codes[i] = categories.setdefault(encode_value(value), len(categories))
+
+        return ('dict', codes, list(categories))
+
+    def save(self, tgt_path):
+        """
+        Saves shot table as (compressed) NumPy archive to specified path.
+        """
+        arrays = dict()
+        schema = {'size': self.size, 'columns': list()}
+        for i, (field, column) in enumerate(self.columns.items()):
+            kind = column[0]
+            schema['columns'].append((field, kind))
+            if kind == 'dict':
+                arrays["c%d" % i] = column[1]
+                arrays["c%d_categories" % i] = np.array(column[2], dtype=str)
+            elif kind == 'list':
+                arrays["c%d" % i] = column[1]
+                arrays["c%d_offsets" % i] = column[2]
+                arrays["c%d_present" % i] = column[3]
+            else:
+                arrays["c%d" % i] = column[1]
+        arrays['schema'] = np.array(json.dumps(schema))
+
+        with open(tgt_path, 'wb') as tgt_file:
+            np.savez_compressed(tgt_file, **arrays)
+
+    @classmethod
+    def load(cls, src_path):
+        """
+        Loads shot table from NumPy archive at specified path.
+        """
+        with np.load(src_path, allow_pickle=False) as archive:
+            schema = json.loads(str(archive['schema']))
+            columns = dict()
+            for i, (field, kind) in enumerate(schema['columns']):
+                if kind == 'dict':
+                    columns[field] = (kind, archive["c%d" % i], archive["c%d_categories" % i].tolist())
+                elif kind == 'list':
+                    columns[field] = (
+                        kind, archive["c%d" % i], archive["c%d_offsets" % i], archive["c%d_present" % i])
+                else:
+                    columns[field] = (kind, archive["c%d" % i])
+
+        return cls(schema['size'], columns)
+
+    def column(self, field):
+        """
+        Gets values of specified attribute for all shots, with None for shots
+        without the attribute. Values of dictionary-encoded attributes are
+        decoded once and retained.
+        """
+        kind = self.columns[field][0]
+        if kind == 'list':
+            values, offsets, present = self.columns[field][1:]
+            return [
+                values[offsets[i]:offsets[i + 1]].tolist() if present[i] else None for i in range(self.size)]
+        if kind != 'dict':
+            return self.columns[field][1]
+
+        if field not in self.decoded:
+            codes, categories = self.columns[field][1:]
+            decoded = np.empty(len(categories) + 1, dtype=object)
+            decoded[:-1] = [json.loads(category) for category in categories]
+            decoded[-1] = None
+            self.decoded[field] = decoded[codes]
+
+        return self.decoded[field]
+
+    def equals(self, field, value):
+        """
+        Gets mask of all shots with specified value for specified attribute.
+        """
+        if field not in self.columns:
+            return np.zeros(self.size, dtype=bool)
+        kind = self.columns[field][0]
+        if kind == 'dict':
+            codes, categories = self.columns[field][1:]
+            try:
+                return codes == categories.index(encode_value(value))
+            except ValueError:
+                return np.zeros(self.size, dtype=bool)
+        if kind == 'list':
+            raise ValueError("Unable to compare list attribute '%s', use contains instead" % field)
+
+        return self.columns[field][1] == value
+
+    def isin(self, field, values):
+        """
+        Gets mask of all shots with one of the specified values for specified
+        attribute.
+        """
+        mask = np.zeros(self.size, dtype=bool)
+        for value in values:
+            mask |= self.equals(field, value)
+
+        return mask
+
+    def contains(self, field, value):
+        """
+        Gets mask of all shots with specified value contained in the list of
+        values for specified attribute, e.g. players on ice.
+        """
+        if field not in self.columns:
+            return np.zeros(self.size, dtype=bool)
+        values, offsets, _ = self.columns[field][1:]
+        mask = np.zeros(self.size, dtype=bool)
+        rows = np.repeat(np.arange(self.size), np.diff(offsets))
+        mask[rows[values == value]] = True
+
+        return mask
+
+    def select(self, mask):
+        """
+        Gets shot table containing only the shots selected by specified mask
+        (or array of indexes).
+        """
+        indexes = np.flatnonzero(mask) if np.asarray(mask).dtype == bool else np.asarray(mask)
+        columns = dict()
+        for field, column in self.columns.items():
+            kind = column[0]
+            if kind == 'dict':
+                columns[field] = (kind, column[1][indexes], column[2])
+            elif kind == 'list':
+                values, offsets, present = column[1:]
+                lengths = offsets[indexes + 1] - offsets[indexes]
+                new_offsets = np.zeros(len(indexes) + 1, dtype=np.int64)
+                new_offsets[1:] = np.cumsum(lengths)
+                value_indexes = np.repeat(offsets[indexes] - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+                columns[field] = (kind, values[value_indexes], new_offsets, present[indexes])
+            else:
+                columns[field] = (kind, column[1][indexes])
+
+        return ShotTable(len(indexes), columns)
+
+    def find(self, **conditions):
+        """
+        Finds all shots with the specified values for the specified
+        attributes. Returns a list of shot dictionaries.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for field, value in conditions.items():
+            mask &= self.equals(field, value)
+
+        return self.select(mask).to_records()
+
+    def group_by(self, *fields):
+        """
+        Groups shots by specified attributes. Returns distinct combinations of
+        attribute values (in order of first occurrence) and the index of the
+        corresponding group for each shot.
+        """
+        keys = list(zip(*[self.column(field).tolist() for field in fields]))
+        groups = dict()
+        group_index = np.empty(self.size, dtype=np.int64)
+        for i, key in enumerate(keys):
+            group_index[i] = groups.setdefault(key, len(groups))
+
+        return list(groups), group_index
+
+    def to_records(self):
+        """
+        Converts shot table back to a list of shot dictionaries.
+        """
+        records = [dict() for _ in range(self.size)]
+        for field, column in self.columns.items():
+            kind = column[0]
+            if kind == 'dict':
+                for record, code, value in zip(records, column[1], self.column(field)):
+                    if code >= 0:
+                        record[field] = value
+            elif kind == 'list':
+                for record, present, value in zip(records, column[3], self.column(field)):
+                    if present:
+                        record[field] = value
+            else:
+                for record, value in zip(records, column[1].tolist()):
+                    record[field] = value
+
+        return records
+
+
+def save_shot_table(tgt_dir, shots):
+    """
+    Saves specified shot data as shot table to specified target directory.
+    """
+    shot_table = ShotTable.from_records(shots)
+    write_file(os.path.join(tgt_dir, SHOT_TABLE_TGT), shot_table.save)
+
+    return shot_table
+
+
+def load_shot_table(tgt_dir):
+    """
+    Loads shot table from specified target directory. Uses shot data held in
+    memory by a previous pipeline stage or the original shot data if the
+    shot table isn't available or older than the original shot data (as
+    kept in the store, if available).
+    """
+    table_path = os.path.join(tgt_dir, SHOT_TABLE_TGT)
+    src_path = os.path.join(tgt_dir, SHOT_DATA_SRC)
+
+    if is_held(src_path):
+        shots = read_json(src_path)
+        if src_path not in HELD_TABLES or HELD_TABLES[src_path][0] is not shots:
+            HELD_TABLES[src_path] = (shots, ShotTable.from_records(shots))
+        return HELD_TABLES[src_path][1]
+
+    # comparing with the time shot data was last modified in the store (if
+    # available) as the original file is only an export
+    src_mtime = get_stored_mtime(src_path)
+    if src_mtime is None and os.path.isfile(src_path):
+        src_mtime = os.path.getmtime(src_path)
+    if os.path.isfile(table_path) and (src_mtime is None or os.path.getmtime(table_path) >= src_mtime):
+        return ShotTable.load(table_path)
+
+    return ShotTable.from_records(read_json(src_path))
+
+
+def get_shot_lookup(tgt_dir):
+    """
+    Gets lookups of shots in specified target directory, using the store's
+    indexes if shot data is available from the store (and not held in memory
+    by a previous pipeline stage) or the shot table otherwise.
+    """
+    if not is_held(os.path.join(tgt_dir, SHOT_DATA_SRC)):
+        shot_lookup = open_store_table(tgt_dir, 'shots')
+        if shot_lookup is not None:
+            return shot_lookup
+
+    return load_shot_table(tgt_dir)
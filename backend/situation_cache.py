@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import yaml
+import hashlib
+import argparse
+import traceback
+
+from collections import namedtuple, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+
+from utils import get_game_info, get_game_type_from_season_type
+from data_archive import get_raw_data_digest
+from event_cache import get_game_events_src_path
+from build_cache import get_code_fingerprint
+from reconstruct_skater_situation import build_interval_tree, sweep_situation_intervals, get_goalie_shifts
+from reconstruct_skater_situation import GoalieShift
+from situation_timeline import SituationInterval, SituationTimeline
+from game_store import load_games
+
+# loading external configuration
+CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
+
+SITUATION_CACHE_DIR = 'situation_cache'
+
+# reconstructed skater situation of a game, i.e. intervals of constant skater
+# counts and goaltenders on ice, times goals have been scored at, goalie
+# shifts, time of game end and implausible skater counts encountered during
+# reconstruction
+Situation = namedtuple('Situation', ['situation_intervals', 'goal_times', 'goalie_shifts', 'game_end', 'anomalies'])
+
+
+def get_situation_cache_dir():
+    return CONFIG.get('situation_cache_dir', os.path.join(CONFIG['tgt_processing_dir'], SITUATION_CACHE_DIR))
+
+
+@lru_cache(maxsize=1)
+def get_reconstruction_fingerprint():
+    """
+    Gets fingerprint of the code used to reconstruct skater situations.
+    """
+    return get_code_fingerprint('reconstruct_skater_situation.py')
+
+
+def get_situation_key(game):
+    """
+    Gets key for cached skater situation of specified game, i.e. a digest of
+    the game's raw event data, the reconstruction code and game attributes
+    used during reconstruction.
+    """
+    game_type = get_game_type_from_season_type(game)
+    events_digest = get_raw_data_digest(get_game_events_src_path(game['season'], game_type, game['game_id']))
+
+    return hashlib.sha1(json.dumps([
+        events_digest, get_reconstruction_fingerprint(), game['game_id'],
+        game['season_type'], game['home_abbr'], game['road_abbr']]).encode('utf-8')).hexdigest()
+
+
+def get_situation_cache_path(game, situation_cache_dir):
+    game_type = get_game_type_from_season_type(game)
+
+    return os.path.join(situation_cache_dir, str(game['season']), str(game_type), "%d.json" % game['game_id'])
+
+
+def reconstruct_situation(game):
+    """
+    Reconstructs skater situation for specified game from its raw event data.
+    """
+    interval_tree, goal_times = build_interval_tree(game)
+    anomalies = list()
+    situation_intervals = sweep_situation_intervals(game, interval_tree, goal_times, anomalies=anomalies)
+
+    return Situation(
+        situation_intervals, goal_times, get_goalie_shifts(interval_tree), - interval_tree.range().begin, anomalies)
+
+
+def encode_situation(key, situation):
+    return json.dumps({
+        'key': key,
+        'situation_intervals': [list(si) for si in situation.situation_intervals],
+        'goal_times': list(situation.goal_times.items()),
+        'goalie_shifts': [list(gs) for gs in situation.goalie_shifts],
+        'game_end': situation.game_end,
+        'anomalies': [list(anomaly) for anomaly in situation.anomalies],
+    })
+
+
+def decode_situation(cached):
+    return Situation(
+        [SituationInterval(*si) for si in cached['situation_intervals']],
+        {time: balance for time, balance in cached['goal_times']},
+        [GoalieShift(*gs) for gs in cached['goalie_shifts']],
+        cached['game_end'],
+        [tuple(anomaly) for anomaly in cached.get('anomalies', [])])
+
+
+def read_cached_situation(cache_path, key):
+    """
+    Reads skater situation from specified cache file. Returns None if the
+    file doesn't exist, is corrupt or has been cached with a different key.
+    """
+    if not os.path.isfile(cache_path):
+        return None
+    try:
+        cached = json.loads(open(cache_path).read())
+    except json.decoder.JSONDecodeError:
+        return None
+    if cached.get('key') == key:
+        return decode_situation(cached)
+
+
+def load_situation(game, refresh=False):
+    """
+    Loads reconstructed skater situation for specified game from the cache,
+    (re-)creating the cached situation if it doesn't exist yet, the game's
+    raw event data has changed since or a refresh has been requested.
+    """
+    situation_cache_dir = get_situation_cache_dir()
+    if not situation_cache_dir:
+        return reconstruct_situation(game)
+
+    cache_path = get_situation_cache_path(game, situation_cache_dir)
+    key = get_situation_key(game)
+
+    if not refresh:
+        situation = read_cached_situation(cache_path, key)
+        if situation is not None:
+            return situation
+
+    situation = reconstruct_situation(game)
+
+    if not os.path.isdir(os.path.dirname(cache_path)):
+        os.makedirs(os.path.dirname(cache_path))
+    tmp_path = "%s.tmp" % cache_path
+    open(tmp_path, 'w').write(encode_situation(key, situation))
+    os.replace(tmp_path, cache_path)
+
+    return situation
+
+
+def load_skater_situation(game):
+    """
+    Loads timeline of skater situations for specified game along with
+    times goals have been scored at, using the cache of reconstructed skater
+    situations.
+    """
+    situation = load_situation(game)
+
+    return SituationTimeline.from_intervals(situation.situation_intervals, game), situation.goal_times
+
+
+def get_situation_distribution(situation):
+    """
+    Gets number of seconds played in each skater situation (home vs. road
+    skaters) from specified reconstructed skater situation.
+    """
+    distribution = defaultdict(int)
+    for si in situation.situation_intervals:
+        distribution["%dv%d" % (si.home, si.road)] += si.to_time - si.from_time + 1
+
+    return dict(distribution)
+
+
+def try_load_situation(game, refresh=False):
+    """
+    Loads reconstructed skater situation for specified game (see
+    load_situation) and summarizes it for the batch report. Returns game
+    summary including an error description if the skater situation couldn't
+    be reconstructed.
+    """
+    summary = {
+        'game_id': game['game_id'], 'season': game['season'], 'season_type': game['season_type'],
+        'home_abbr': game['home_abbr'], 'road_abbr': game['road_abbr'],
+        'cached': False, 'time': None, 'situations': dict(), 'anomalies': list(), 'error': None}
+
+    start = time.perf_counter()
+    try:
+        situation = None
+        situation_cache_dir = get_situation_cache_dir()
+        if situation_cache_dir and not refresh:
+            situation = read_cached_situation(
+                get_situation_cache_path(game, situation_cache_dir), get_situation_key(game))
+            summary['cached'] = situation is not None
+        if situation is None:
+            situation = load_situation(game, refresh=True)
+    except Exception:
+        summary['error'] = traceback.format_exc()
+        return summary
+    summary['time'] = round(time.perf_counter() - start, 4)
+    summary['situations'] = get_situation_distribution(situation)
+    summary['anomalies'] = [list(anomaly) for anomaly in situation.anomalies]
+
+    return summary
+
+
+def load_situations(games, refresh=False, executor=None):
+    """
+    Loads reconstructed skater situations for all specified games, either in
+    parallel or one after another. Returns summaries for all games in the
+    original order.
+    """
+    if executor is not None:
+        return list(executor.map(try_load_situation, games, repeat(refresh)))
+
+    return list(map(try_load_situation, games, repeat(refresh)))
+
+
+def summarize_situations(game_summaries):
+    """
+    Summarizes skater situations loaded for multiple games, i.e. reports
+    number of (reconstructed, cached and failed) games, reconstruction times,
+    overall situation distribution and games with anomalies.
+    """
+    loaded = [gs for gs in game_summaries if gs['error'] is None]
+    reconstructed = [gs for gs in loaded if not gs['cached']]
+    times = [gs['time'] for gs in reconstructed]
+
+    distribution = defaultdict(int)
+    for gs in loaded:
+        for situation, seconds in gs['situations'].items():
+            distribution[situation] += seconds
+    total_seconds = sum(distribution.values())
+
+    return {
+        'games': len(game_summaries),
+        'reconstructed': len(reconstructed),
+        'cached': len(loaded) - len(reconstructed),
+        'failed': [gs['game_id'] for gs in game_summaries if gs['error'] is not None],
+        'total_time': round(sum(times), 4),
+        'mean_time': round(sum(times) / len(times), 4) if times else None,
+        'max_time': max(times) if times else None,
+        'situations': {
+            situation: {'seconds': seconds, 'pctg': round(seconds / total_seconds * 100, 2)}
+            for situation, seconds in sorted(distribution.items(), key=lambda item: -item[1])},
+        'anomalies': {gs['game_id']: len(gs['anomalies']) for gs in loaded if gs['anomalies']},
+    }
+
+
+if __name__ == '__main__':
+
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(description='Reconstruct and cache DEL skater situations.')
+    parser.add_argument(
+        '-s', '--season', dest='seasons', required=False, type=int, nargs='+',
+        default=[CONFIG['default_season']], choices=CONFIG['seasons'],
+        metavar='season to reconstruct skater situations for',
+        help="The season(s) for which skater situations will be reconstructed")
+    parser.add_argument(
+        '--initial', dest='initial', required=False,
+        action='store_true', help='Re-create cached skater situations')
+    parser.add_argument(
+        '--workers', dest='workers', required=False, type=int, default=1,
+        metavar='number of worker processes',
+        help='The number of processes used to reconstruct skater situations in parallel')
+    parser.add_argument(
+        '--report', dest='report', required=False, metavar='report file',
+        help='Path to the JSON file the summary report will be written to')
+
+    args = parser.parse_args()
+
+    if not get_situation_cache_dir():
+        print("+ Skater situation cache not enabled, situations will not be stored")
+
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+
+    report = dict()
+    for season in args.seasons:
+        games = load_games(os.path.join(CONFIG['tgt_processing_dir'], str(season)))
+        print("+ Loading skater situations for %d games of season %d" % (len(games), season))
+
+        game_summaries = load_situations(games, args.initial, executor)
+        for game, game_summary in zip(games, game_summaries):
+            if game_summary['error'] is not None:
+                print("\t+ Unable to reconstruct skater situation for %s:" % get_game_info(game))
+                print(game_summary['error'])
+            elif game_summary['anomalies']:
+                print("\t+ %d anomalies in skater situation for %s" % (
+                    len(game_summary['anomalies']), get_game_info(game)))
+
+        summary = summarize_situations(game_summaries)
+        print("+ %d games: %d reconstructed (%s s, %s s per game, max %s s), %d from cache, %d failed" % (
+            summary['games'], summary['reconstructed'], summary['total_time'], summary['mean_time'],
+            summary['max_time'], summary['cached'], len(summary['failed'])))
+        print("+ Skater situations: %s" % ", ".join(
+            "%s %.2f%%" % (situation, values['pctg']) for situation, values in summary['situations'].items()))
+        print("+ %d games with anomalies" % len(summary['anomalies']))
+
+        report[season] = {'summary': summary, 'games': game_summaries}
+
+    if executor is not None:
+        executor.shutdown()
+
+    if args.report:
+        open(args.report, 'w').write(json.dumps(report, indent=2))
+        print("+ Report written to %s" % args.report)
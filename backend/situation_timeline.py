@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+import numpy as np
+
+# interval of constant skater counts and goaltenders on ice (inclusively
+# ranging from start to end time)
+SituationInterval = namedtuple('SituationInterval', [
+    'from_time', 'to_time', 'home', 'road', 'home_goalie', 'road_goalie'])
+
+
+class SituationTimeline():
+    """
+    Skater situation for each second of a game, backed by arrays of skater
+    counts and goaltender ids (zero for an empty net) for home and road team.
+    The situation at a certain time is retrieved as a dictionary holding
+    skater counts (by home/road and team abbreviation) and goaltenders on
+    ice, i.e. timeline[time]['home'] or timeline[time][team].
+    """
+    def __init__(self, home_abbr, road_abbr, home, road, home_goalie, road_goalie, start=0):
+        self.home_abbr = home_abbr
+        self.road_abbr = road_abbr
+        self.home = home
+        self.road = road
+        self.home_goalie = home_goalie
+        self.road_goalie = road_goalie
+        # time of the first second covered by the timeline
+        self.start = start
+
+    @classmethod
+    def from_intervals(cls, situation_intervals, game):
+        """
+        Sets up timeline from specified intervals of skater situations for
+        specified game.
+        """
+        lengths = [si.to_time - si.from_time + 1 for si in situation_intervals]
+
+        def expand(values, dtype):
+            return np.repeat(np.array(values, dtype=dtype), lengths)
+
+        return cls(
+            game['home_abbr'], game['road_abbr'],
+            expand([si.home for si in situation_intervals], np.int8),
+            expand([si.road for si in situation_intervals], np.int8),
+            expand([si.home_goalie or 0 for si in situation_intervals], np.int32),
+            expand([si.road_goalie or 0 for si in situation_intervals], np.int32),
+            situation_intervals[0].from_time if situation_intervals else 0)
+
+    def __len__(self):
+        return len(self.home)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __contains__(self, time):
+        return self.start <= time < self.start + len(self)
+
+    def keys(self):
+        return range(self.start, self.start + len(self))
+
+    @property
+    def end(self):
+        """
+        Time of the last second covered by the timeline.
+        """
+        return self.start + len(self) - 1
+
+    def __getitem__(self, time):
+        """
+        Gets skater situation at specified time or, for a slice of times, a
+        timeline covering these times only (sharing the underlying arrays).
+        """
+        if isinstance(time, slice):
+            if time.step is not None:
+                raise ValueError("Unable to slice situation timeline with step")
+            from_idx = max(time.start - self.start, 0) if time.start is not None else 0
+            to_idx = max(time.stop - self.start, from_idx) if time.stop is not None else len(self)
+            return SituationTimeline(
+                self.home_abbr, self.road_abbr, self.home[from_idx:to_idx], self.road[from_idx:to_idx],
+                self.home_goalie[from_idx:to_idx], self.road_goalie[from_idx:to_idx],
+                self.start + min(from_idx, len(self)))
+
+        if time not in self:
+            raise KeyError(time)
+        idx = time - self.start
+        home = int(self.home[idx])
+        road = int(self.road[idx])
+
+        return {
+            'home': home, 'road': road,
+            'home_goalie': int(self.home_goalie[idx]) or None, 'road_goalie': int(self.road_goalie[idx]) or None,
+            self.home_abbr: home, self.road_abbr: road}
+
+    def to_intervals(self):
+        """
+        Converts timeline into intervals of constant skater counts and
+        goaltenders on ice.
+        """
+        if not len(self):
+            return list()
+
+        changed = np.zeros(len(self) - 1, dtype=bool)
+        for values in (self.home, self.road, self.home_goalie, self.road_goalie):
+            changed |= values[1:] != values[:-1]
+        from_idxs = np.concatenate(([0], np.flatnonzero(changed) + 1))
+        to_idxs = np.concatenate((from_idxs[1:] - 1, [len(self) - 1]))
+
+        return [
+            SituationInterval(
+                self.start + from_idx, self.start + to_idx, int(self.home[from_idx]), int(self.road[from_idx]),
+                int(self.home_goalie[from_idx]) or None, int(self.road_goalie[from_idx]) or None)
+            for from_idx, to_idx in zip(from_idxs.tolist(), to_idxs.tolist())]
@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import yaml
+import sqlite3
+
+from collections import namedtuple
+
+# loading external configuration
+CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
+
+SQLITE_STORE_TGT = 'del_stats.db'
+
+StoreTable = namedtuple('StoreTable', ['src', 'columns', 'indexes'])
+
+# processed data kept in the store with the JSON file it is exported to, the
+# columns extracted from each record (mapped to the corresponding record
+# attributes) and the indexes set up on these columns
+TABLES = {
+    'games': StoreTable(
+        'del_games.json', {'game_id': 'game_id', 'game_date': 'date', 'season_type': 'season_type'},
+        [('game_id',), ('game_date',)]),
+    'shots': StoreTable(
+        'del_shots.json', {
+            'game_id': 'game_id', 'player_id': 'player_id', 'team': 'team',
+            'season_type': 'season_type', 'goalie': 'goalie'},
+        [('game_id',), ('player_id', 'team', 'season_type'), ('goalie', 'game_id')]),
+    'player_games': StoreTable(
+        'del_player_game_stats.json', {
+            'game_id': 'game_id', 'player_id': 'player_id', 'team': 'team',
+            'season_type': 'season_type', 'game_date': 'game_date'},
+        [('game_id',), ('player_id', 'team', 'season_type'), ('game_date',)]),
+    'goalie_games': StoreTable(
+        'del_goalie_game_stats.json', {
+            'game_id': 'game_id', 'goalie': 'goalie_id', 'team': 'team',
+            'season_type': 'season_type', 'game_date': 'game_date'},
+        [('game_id',), ('goalie', 'game_id'), ('game_date',)]),
+}
+
+# store tables by name of the JSON file they are exported to
+TABLES_BY_SRC = {table.src: table_name for table_name, table in TABLES.items()}
+
+# open stores by path
+OPEN_STORES = dict()
+
+
+def is_store_enabled():
+    return CONFIG.get('sqlite_store', False)
+
+
+def get_store_table_name(path):
+    """
+    Gets name of the store table holding the processed data originally
+    written to specified path (or None if the data isn't kept in the store).
+    """
+    return TABLES_BY_SRC.get(os.path.basename(path))
+
+
+def convert_column_value(value, default=None):
+    """
+    Converts specified record attribute to a value that can be stored in a
+    column, i.e. in the same way the attribute would be dumped to JSON.
+    """
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    if default is not None:
+        return default(value)
+
+    return str(value)
+
+
+class SQLiteStore():
+    """
+    Embedded SQLite store of processed data. Each record is kept as JSON
+    along with the columns used for indexed lookups. Processed data that
+    originally was a list of records with leading attributes (e.g. the
+    timestamp of the last modification) retains these as a header. The time
+    of the last modification is registered for each table.
+    """
+    def __init__(self, store_path):
+        self.store_path = store_path
+        self.conn = sqlite3.connect(store_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS store_tables "
+            "(name TEXT PRIMARY KEY, header TEXT, indent INTEGER, modified REAL)")
+        # adding time of last modification to stores created without it
+        if 'modified' not in [column[1] for column in self.conn.execute("PRAGMA table_info(store_tables)")]:
+            self.conn.execute("ALTER TABLE store_tables ADD COLUMN modified REAL")
+        for table_name, table in TABLES.items():
+            self.conn.execute("CREATE TABLE IF NOT EXISTS %s (%s, data TEXT NOT NULL)" % (
+                table_name, ", ".join(table.columns)))
+            for index in table.indexes:
+                self.conn.execute("CREATE INDEX IF NOT EXISTS %s_%s ON %s (%s)" % (
+                    table_name, "_".join(index), table_name, ", ".join(index)))
+        self.conn.commit()
+
+    def has_table(self, table_name):
+        """
+        Checks whether data has been stored in specified table at all.
+        """
+        return self.conn.execute(
+            "SELECT 1 FROM store_tables WHERE name = ?", (table_name,)).fetchone() is not None
+
+    def put(self, table_name, data, indent=2, default=None):
+        """
+        Replaces all data in specified table with the specified processed
+        data.
+        """
+        if data and isinstance(data[-1], list):
+            header, records = data[:-1], data[-1]
+        else:
+            header, records = None, data
+
+        columns = TABLES[table_name].columns
+        rows = [
+            [convert_column_value(record.get(attr), default) for attr in columns.values()] +
+            [json.dumps(record, default=default)] for record in records]
+
+        with self.conn:
+            self.conn.execute("DELETE FROM %s" % table_name)
+            self.conn.executemany("INSERT INTO %s VALUES (%s)" % (
+                table_name, ", ".join(["?"] * (len(columns) + 1))), rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO store_tables (name, header, indent, modified) VALUES (?, ?, ?, ?)", (
+                    table_name, None if header is None else json.dumps(header, default=default), indent,
+                    time.time()))
+
+    def get_header(self, table_name):
+        """
+        Gets leading attributes of the processed data in specified table (or
+        None if there are none).
+        """
+        header, = self.conn.execute("SELECT header FROM store_tables WHERE name = ?", (table_name,)).fetchone()
+        if header is not None:
+            return json.loads(header)
+
+    def get_modified(self, table_name):
+        """
+        Gets time of the last modification of specified table (or None if it
+        hasn't been registered).
+        """
+        modified, = self.conn.execute("SELECT modified FROM store_tables WHERE name = ?", (table_name,)).fetchone()
+
+        return modified
+
+    def get(self, table_name):
+        """
+        Gets all processed data from specified table, in the form it was
+        originally stored in. Returns processed data and indentation to export
+        it with.
+        """
+        header = self.get_header(table_name)
+        indent, = self.conn.execute("SELECT indent FROM store_tables WHERE name = ?", (table_name,)).fetchone()
+        records = self.find(table_name)
+        if header is not None:
+            return header + [records], indent
+
+        return records, indent
+
+    def find(self, table_name, **conditions):
+        """
+        Finds all records in specified table matching the specified
+        conditions. Conditions on indexed columns are resolved using the
+        store's indexes, all others by inspecting the stored records.
+        """
+        return self.find_between(table_name, **conditions)
+
+    def find_between(self, table_name, from_date=None, to_date=None, **conditions):
+        """
+        Finds all records in specified table for games played between the
+        specified dates (inclusively) and matching further conditions.
+        """
+        clauses = list()
+        params = list()
+        if from_date is not None:
+            clauses.append("game_date >= ?")
+            params.append(str(from_date))
+        if to_date is not None:
+            clauses.append("game_date <= ?")
+            params.append(str(to_date))
+        for attr, value in conditions.items():
+            if attr in TABLES[table_name].columns:
+                clause = attr
+            else:
+                clause = "json_extract(data, '$.%s')" % attr
+            # null values never match in comparisons
+            if value is None:
+                clauses.append("%s IS NULL" % clause)
+            else:
+                clauses.append("%s = ?" % clause)
+                params.append(value)
+
+        query = "SELECT data FROM %s" % table_name
+        if clauses:
+            query += " WHERE %s" % " AND ".join(clauses)
+
+        return [json.loads(data) for data, in self.conn.execute("%s ORDER BY rowid" % query, params)]
+
+    def table(self, table_name):
+        return StoreTableView(self, table_name)
+
+    def close(self):
+        self.conn.close()
+
+
+class StoreTableView():
+    """
+    Lookups in a single table of the store, offering the same interface as
+    the shot table.
+    """
+    def __init__(self, store, table_name):
+        self.store = store
+        self.table_name = table_name
+
+    def get_header(self):
+        return self.store.get_header(self.table_name)
+
+    def find(self, **conditions):
+        return self.store.find(self.table_name, **conditions)
+
+    def find_between(self, from_date=None, to_date=None, **conditions):
+        return self.store.find_between(self.table_name, from_date, to_date, **conditions)
+
+
+def open_store(tgt_dir, create=False):
+    """
+    Opens store in specified directory (if enabled). Returns None if the
+    store is disabled or doesn't exist and isn't supposed to be created.
+    """
+    if not is_store_enabled():
+        return None
+
+    store_path = os.path.join(tgt_dir, SQLITE_STORE_TGT)
+    if store_path not in OPEN_STORES:
+        if not create and not os.path.isfile(store_path):
+            return None
+        OPEN_STORES[store_path] = SQLiteStore(store_path)
+
+    return OPEN_STORES[store_path]
+
+
+def store_json(tgt_path, data, indent=2, default=None):
+    """
+    Puts processed data originally written to specified path into the store
+    (if enabled and the data is kept in the store at all). Returns whether
+    the data has been stored.
+    """
+    table_name = get_store_table_name(tgt_path)
+    if table_name is None:
+        return False
+    store = open_store(os.path.dirname(tgt_path), create=True)
+    if store is None:
+        return False
+
+    store.put(table_name, data, indent, default)
+
+    return True
+
+
+def load_stored_json(src_path):
+    """
+    Loads processed data originally written to specified path from the store.
+    Returns None if the data isn't available from the store.
+    """
+    table_name = get_store_table_name(src_path)
+    if table_name is None:
+        return None
+    store = open_store(os.path.dirname(src_path))
+    if store is None or not store.has_table(table_name):
+        return None
+
+    return store.get(table_name)[0]
+
+
+def is_stored(path):
+    """
+    Checks whether processed data originally written to specified path is
+    available from the store.
+    """
+    table_name = get_store_table_name(path)
+    if table_name is None:
+        return False
+    store = open_store(os.path.dirname(path))
+
+    return store is not None and store.has_table(table_name)
+
+
+def get_stored_mtime(path):
+    """
+    Gets time of the last modification of processed data originally written
+    to specified path in the store. Returns None if the data isn't available
+    from the store.
+    """
+    table_name = get_store_table_name(path)
+    if table_name is None:
+        return None
+    store = open_store(os.path.dirname(path))
+    if store is None or not store.has_table(table_name):
+        return None
+
+    return store.get_modified(table_name)
+
+
+def open_store_table(tgt_dir, table_name):
+    """
+    Opens specified table of the store in specified directory for indexed
+    lookups. Returns None if the table isn't available from the store.
+    """
+    store = open_store(tgt_dir)
+    if store is None or not store.has_table(table_name):
+        return None
+
+    return store.table(table_name)
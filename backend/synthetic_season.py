@@ -0,0 +1,1315 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import yaml
+import heapq
+import random
+import bisect
+import argparse
+
+from collections import namedtuple, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+from utils import coaches, capacities
+from data_archive import CATEGORIES, pack_raw_data
+from get_del_games import PLAYOFF_DATES
+from get_del_player_game_stats import PENALTY_CATEGORIES
+
+# loading external configuration
+CONFIG = yaml.safe_load(open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.yml')))
+
+# number of regular season games of each team against each other team (at
+# single scale)
+RS_GAMES_PER_OPPONENT = 4
+# playoff rounds (in original designation) and number of wins needed to
+# advance, the first rounds are skipped if not enough teams are available
+PLAYOFF_ROUNDS = [('Viertelfinale', 4), ('Halbfinale', 4), ('Finale', 4)]
+# regular season start dates differing from mid-september
+RS_START_DATES = {2020: date(2020, 12, 17)}
+
+# players per team roster and dressed for each game by position
+ROSTER_SIZES = {'GK': 3, 'DE': 9, 'FO': 15}
+LINEUP_SIZES = {'GK': 2, 'DE': 8, 'FO': 12}
+# attributes of team game statistics
+TEAM_STATS_ATTRS = [
+    'shotsAttempts', 'shotsOnGoal', 'shotsMissed', 'shotsBlocked', 'saves', 'penaltyMinutes',
+    'powerPlaySeconds', 'ppCount', 'ppGoals', 'shCount', 'shGoals', 'faceOffsWon']
+
+# average number of shot attempts and penalties per team and second
+SHOT_RATE = 56 / 3600
+PENALTY_RATE = 4 / 3600
+
+# rotation of forward lines and defensive pairs (by index) at even
+# strength, on the power play and while killing penalties
+LINE_ROTATIONS = {'ev': [0, 1, 2, 0, 1, 3], 'pp': [0, 1], 'pk': [1, 2]}
+PAIR_ROTATIONS = {'ev': [0, 1, 2, 0, 1, 3], 'pp': [0, 1], 'pk': [1, 0]}
+
+# faceoff spots in the defensive zones and the neutral zone of each team
+DEFENSIVE_ZONE_SPOTS = {'home': ['HDL', 'HDR'], 'road': ['ADL', 'ADR']}
+NEUTRAL_ZONE_SPOTS = {'home': ['HBL', 'HBR'], 'road': ['ABL', 'ABR']}
+
+FIRST_NAMES = [
+    'Alexander', 'Andreas', 'Christian', 'Daniel', 'David', 'Dominik', 'Fabian', 'Felix', 'Florian', 'Jan',
+    'Jonas', 'Julian', 'Kevin', 'Korbinian', 'Leon', 'Lukas', 'Marcel', 'Markus', 'Matthias', 'Maximilian',
+    'Michael', 'Moritz', 'Niklas', 'Patrick', 'Philipp', 'Sebastian', 'Simon', 'Stefan', 'Thomas', 'Tobias',
+    'Austin', 'Brett', 'Chad', 'Colin', 'Derek', 'Justin', 'Kyle', 'Ryan', 'Travis', 'Tyler',
+    'Erik', 'Jakub', 'Jere', 'Mikko', 'Oskar', 'Petr']
+SURNAMES = [
+    'Bauer', 'Becker', 'Berger', 'Brandl', 'Eder', 'Fischer', 'Franke', 'Gruber', 'Hartmann', 'Hofmann',
+    'Huber', 'Kaiser', 'Keller', 'Klein', 'Koch', 'Krause', 'Lang', 'Lehmann', 'Maier', 'Meyer',
+    'Neumann', 'Richter', 'Roth', 'Schäfer', 'Schneider', 'Schulz', 'Schwarz', 'Vogel', 'Wagner', 'Weber',
+    'Wolf', 'Zimmermann', 'Anderson', 'Campbell', 'Fraser', 'MacLeod', 'Murray', 'Sullivan', 'Thompson',
+    'Ward', 'Lindqvist', 'Nyström', 'Virtanen', 'Mäkelä', 'Novotny', 'Svoboda']
+NATIONALITIES = [
+    ('GER', 0.62), ('CAN', 0.16), ('USA', 0.08), ('SWE', 0.04), ('FIN', 0.04), ('AUT', 0.03), ('CZE', 0.03)]
+REFEREES = [
+    'Andre Schrader', 'Daniel Piechaczek', 'Gordon Schukies', 'Lasse Kopitz', 'Marian Rohatsch',
+    'Roman Gofman', 'Sirko Hunnius', 'Stephen Menz', 'Andris Ansons', 'Tobias Schwenk',
+    'Jonas Merten', 'Kai Jürgens', 'Maksim Cepik', 'Nikolaj Ponomarjow', 'Tim Kannegießer', 'Rene Hurtik']
+
+Player = namedtuple('Player', [
+    'player_id', 'first_name', 'last_name', 'jersey', 'position', 'stick',
+    'nationality', 'height', 'weight', 'date_of_birth', 'rating'])
+Team = namedtuple('Team', ['team_id', 'abbr', 'name', 'arena', 'coach_id', 'coach', 'players'])
+# single game to be generated, i.e. its schedule information and both teams
+# involved
+GameTask = namedtuple('GameTask', [
+    'tgt_dir', 'seed', 'season', 'game_type', 'game_id', 'start_date', 'round', 'home', 'road'])
+# outcome of a generated game along with season totals contributed by each
+# player (games played, goals, assists and penalty minutes)
+GameResult = namedtuple('GameResult', [
+    'game_id', 'home_score', 'road_score', 'overtime', 'shootout', 'player_totals'])
+
+
+def switch_team(home_road):
+    return 'road' if home_road == 'home' else 'home'
+
+
+def get_period(time):
+    """
+    Gets key of the period specified time of the game belongs to in event
+    data.
+    """
+    if time <= 3600:
+        return str(max(1, (time - 1) // 1200 + 1))
+    return 'overtime'
+
+
+def get_player_ref(player, id_key='playerId'):
+    """
+    Gets reference to specified player as used in event data.
+    """
+    return {id_key: player.player_id, 'name': player.first_name, 'surname': player.last_name, 'jersey': player.jersey}
+
+
+class SyntheticGame():
+    """
+    Synthetic game between two teams. The course of the game, i.e. penalties,
+    shot attempts, goals, goaltender changes and shootout, is simulated
+    first. Skaters are then put on ice in shifts according to the resulting
+    skater counts. Finally all raw data is derived from both.
+    """
+    def __init__(self, game_id, season, season_type, start_date, home, road, rng):
+        self.game_id = game_id
+        self.season = season
+        self.season_type = season_type
+        self.start_date = start_date
+        self.teams = {'home': home, 'road': road}
+        self.rng = rng
+        self.lineups = {home_road: self.create_lineup(team) for home_road, team in self.teams.items()}
+        self.game_end = 3600
+        self.score = {'home': 0, 'road': 0}
+        # penalties, shot attempts (including goals) and goals in the order
+        # of their occurrence
+        self.penalties = list()
+        self.shots = list()
+        self.goals = list()
+        # goaltender changes as time, team, outgoing and incoming goaltender
+        self.goalie_changes = list()
+        # intervals with pulled goaltenders as team, start and end time (None
+        # while the net is still empty)
+        self.pulls = list()
+        self.shootout = list()
+        # penalties currently served and waiting to be served by each team
+        self.serving = {'home': list(), 'road': list()}
+        self.queued = {'home': list(), 'road': list()}
+        self.goalie_pulled = {'home': False, 'road': False}
+        self.goalie_replaced = {'home': False, 'road': False}
+        self.moments = list()
+        self.moment_cnt = 0
+
+    def create_lineup(self, team):
+        """
+        Dresses goaltenders, defensemen (in pairs) and forwards (in lines)
+        for the game, the better players being more likely to play in the top
+        pairs and lines.
+        """
+        players = defaultdict(list)
+        for player in team.players:
+            players[player.position].append(player)
+        goalies = sorted(players['GK'], key=lambda p: -p.rating)
+        starter = self.rng.choices(goalies, weights=[0.7, 0.25, 0.05][:len(goalies)])[0]
+        backup = [goalie for goalie in goalies if goalie != starter][0]
+
+        lineup = {'GK': [starter, backup]}
+        for position in ['DE', 'FO']:
+            lineup[position] = sorted(
+                players[position], key=lambda p: -(p.rating + self.rng.uniform(0, 0.4)))[:LINEUP_SIZES[position]]
+
+        return lineup
+
+    # simulating the course of the game
+
+    def add_moment(self, time, kind, home_road):
+        self.moment_cnt += 1
+        heapq.heappush(self.moments, (time, self.moment_cnt, kind, home_road))
+
+    def add_random_moments(self, from_time, to_time, kind, rate):
+        """
+        Adds moments of specified kind at random times in specified interval
+        for both teams.
+        """
+        for home_road in ['home', 'road']:
+            expected = rate * (to_time - from_time + 1)
+            for _ in range(max(0, round(self.rng.gauss(expected, expected ** 0.5)))):
+                self.add_moment(self.rng.randint(from_time, to_time), kind, home_road)
+
+    def simulate(self):
+        for home_road in ['home', 'road']:
+            self.change_goalie(0, home_road, None, self.lineups[home_road]['GK'][0].player_id)
+
+        # regulation
+        for period in range(3):
+            self.play_period(period * 1200 + 1, (period + 1) * 1200)
+
+        if self.score['home'] == self.score['road']:
+            if self.season_type == 'RS':
+                # regular season overtime is followed by a shootout if it
+                # remains scoreless
+                if not self.play_period(3601, 3900):
+                    self.game_end = 3900
+                    self.simulate_shootout()
+            else:
+                # playoff overtime periods are played until a goal is scored
+                overtime = 0
+                while not self.play_period(3600 + overtime * 1200 + 1, 3600 + (overtime + 1) * 1200, overtime >= 4):
+                    overtime += 1
+
+        # finally setting start and end times of all penalties still waiting
+        # to be served, penalties end with the game at the latest
+        self.release_penalties(float('inf'))
+        for penalty in self.penalties:
+            penalty['from_time'] = min(penalty['from_time'], self.game_end)
+            penalty['to_time'] = min(penalty['to_time'], self.game_end)
+
+    def play_period(self, from_time, to_time, sudden=False):
+        """
+        Plays a period or overtime ranging from specified start to end time.
+        Returns whether the game has been decided in overtime.
+        """
+        self.moments = list()
+        self.add_random_moments(from_time, to_time, 'shot', SHOT_RATE)
+        self.add_random_moments(from_time, to_time, 'penalty', PENALTY_RATE)
+        # trailing teams may pull their goaltender late in regulation
+        if to_time == 3600:
+            self.add_moment(self.rng.randint(3480, 3570), 'pull', None)
+
+        while self.moments:
+            time, _, kind, home_road = heapq.heappop(self.moments)
+            self.release_penalties(time)
+            if kind == 'shot':
+                decided = self.take_shot(time, home_road, sudden=sudden)
+            elif kind == 'penalty':
+                decided = self.call_penalty(time, home_road)
+            elif kind == 'pull':
+                decided = self.pull_goalie(time)
+            if decided:
+                self.game_end = time
+                return True
+
+        return False
+
+    def get_skater_counts(self, time):
+        """
+        Gets number of skaters on ice for both teams at specified time, both
+        including extra attackers and as determined by penalties only.
+        """
+        base_counts = {'home': 5, 'road': 5}
+        for penalty in self.penalties:
+            if penalty['duration'] in (120, 300) and penalty['from_time'] is not None:
+                if penalty['from_time'] < time <= penalty['to_time']:
+                    base_counts[penalty['home_road']] -= 1
+
+        # regular season overtime is played three-on-three, power plays
+        # four-on-three
+        if self.season_type == 'RS' and time > 3600:
+            if base_counts['home'] == base_counts['road']:
+                base_counts = {'home': 3, 'road': 3}
+            elif sorted(base_counts.values()) == [4, 5]:
+                base_counts = {
+                    home_road: count - 1 if count == 5 else 3 for home_road, count in base_counts.items()}
+
+        skater_counts = dict(base_counts)
+        for home_road, from_time, to_time in self.pulls:
+            if from_time < time and (to_time is None or time <= to_time):
+                skater_counts[home_road] += 1
+
+        return skater_counts, base_counts
+
+    def get_goalie(self, home_road, time):
+        """
+        Gets goaltender on ice for specified team at specified time (or None
+        if the net is empty).
+        """
+        goalie = None
+        for change_time, change_home_road, _, goalie_in in self.goalie_changes:
+            if change_time >= time and change_time:
+                break
+            if change_home_road == home_road:
+                goalie = goalie_in
+
+        return goalie
+
+    def change_goalie(self, time, home_road, goalie_out, goalie_in):
+        self.goalie_changes.append((time, home_road, goalie_out, goalie_in))
+
+    def pull_goalie(self, time):
+        """
+        Pulls goaltender of team trailing by one or two goals in favor of an
+        extra attacker.
+        """
+        score_diff = self.score['home'] - self.score['road']
+        if not score_diff or abs(score_diff) > 2:
+            return False
+        home_road = 'road' if score_diff > 0 else 'home'
+        if self.goalie_pulled[home_road]:
+            return False
+
+        self.change_goalie(time, home_road, self.get_goalie(home_road, time + 1), None)
+        self.pulls.append([home_road, time, None])
+        self.goalie_pulled[home_road] = True
+
+        return False
+
+    def release_penalties(self, time):
+        """
+        Releases penalties expired before specified time, putting penalties
+        waiting to be served into effect.
+        """
+        for home_road in ['home', 'road']:
+            while True:
+                expired = [penalty for penalty in self.serving[home_road] if penalty['to_time'] < time]
+                if not expired:
+                    break
+                penalty = min(expired, key=lambda p: p['to_time'])
+                self.serving[home_road].remove(penalty)
+                if self.queued[home_road]:
+                    queued_penalty = self.queued[home_road].pop(0)
+                    queued_penalty['from_time'] = penalty['to_time']
+                    queued_penalty['to_time'] = penalty['to_time'] + queued_penalty['duration']
+                    self.serving[home_road].append(queued_penalty)
+
+    def add_penalty(self, time, home_road, duration, codename, shooting=False, player_of=None):
+        """
+        Adds penalty called at specified time for specified team. Penalties
+        affecting skater counts are delayed while two others are served.
+        """
+        penalty = {
+            'id': len(self.penalties) + 1, 'home_road': home_road, 'duration': duration, 'codename': codename,
+            'create_time': time, 'from_time': time, 'to_time': time + duration, 'shooting': shooting,
+            'player': None, 'player_of': player_of}
+        if duration in (120, 300):
+            if len(self.serving[home_road]) < 2:
+                self.serving[home_road].append(penalty)
+            else:
+                penalty['from_time'] = penalty['to_time'] = None
+                self.queued[home_road].append(penalty)
+        self.penalties.append(penalty)
+
+        return penalty
+
+    def call_penalty(self, time, home_road):
+        """
+        Calls a penalty (minor, major, misconduct or penalty shot) on
+        specified team at specified time. Returns whether the game has been
+        decided by a resulting penalty shot.
+        """
+        rnd = self.rng.random()
+        if rnd < 0.02:
+            self.add_penalty(time, home_road, 0, self.rng.choice(['HOOK', 'TRIP', 'SLASH']), shooting=True)
+            return self.take_shot(time, switch_team(home_road), penalty_shot=True)
+        elif rnd < 0.09:
+            self.add_penalty(time, home_road, 600, self.rng.choice(['UN-SP', 'ABUSE']))
+        elif rnd < 0.12:
+            major = self.add_penalty(time, home_road, 300, self.rng.choice(PENALTY_CATEGORIES['reckless']))
+            self.add_penalty(time, home_road, 1200, major['codename'], player_of=major)
+        else:
+            category = self.rng.choices(['lazy', 'roughing', 'reckless', 'other'], weights=[6, 2, 1, 1])[0]
+            self.add_penalty(time, home_road, 120, self.rng.choice(PENALTY_CATEGORIES[category]))
+            # coincidental minor penalty for the other team
+            if self.rng.random() < 0.07:
+                self.add_penalty(time, switch_team(home_road), 120, self.rng.choice(PENALTY_CATEGORIES['roughing']))
+
+        return False
+
+    def take_shot(self, time, home_road, penalty_shot=False, sudden=False):
+        """
+        Takes shot attempt for specified team at specified time. Returns
+        whether the game has been decided by a resulting goal.
+        """
+        opp_home_road = switch_team(home_road)
+        skater_counts, base_counts = self.get_skater_counts(time)
+
+        rnd = self.rng.random()
+        if penalty_shot:
+            result = 1
+            goal_probability = 0.32
+        elif rnd < 0.24:
+            result = 3
+        elif rnd < 0.46:
+            result = 2
+        elif rnd < 0.475:
+            result = 5
+        else:
+            result = 1
+            if self.get_goalie(opp_home_road, time) is None:
+                goal_probability = 0.5
+            else:
+                skater_diff = base_counts[home_road] - base_counts[opp_home_road]
+                goal_probability = min(max(0.09 * (1 + 0.4 * skater_diff), 0.03), 0.25)
+            if sudden:
+                goal_probability = 0.5
+        # goals are scored one at a time
+        if result == 1 and self.rng.random() < goal_probability and time not in [goal['time'] for goal in self.goals]:
+            result = 4
+
+        shot = {'time': time, 'home_road': home_road, 'result': result, 'penalty_shot': penalty_shot, 'player': None}
+        self.shots.append(shot)
+
+        if result == 4:
+            return self.score_goal(time, home_road, shot, base_counts)
+
+        return False
+
+    def score_goal(self, time, home_road, shot, base_counts):
+        """
+        Registers goal scored on specified shot. Returns whether the game has
+        been decided by the goal.
+        """
+        opp_home_road = switch_team(home_road)
+        skater_diff = base_counts[home_road] - base_counts[opp_home_road]
+        if shot['penalty_shot']:
+            balance = 'PS'
+        elif skater_diff > 0:
+            balance = "PP%d" % skater_diff
+        elif skater_diff < 0:
+            balance = "SH%d" % -skater_diff
+        else:
+            balance = 'EQ'
+
+        self.score[home_road] += 1
+        self.goals.append({
+            'time': time, 'home_road': home_road, 'balance': balance, 'shot': shot,
+            'en': self.get_goalie(opp_home_road, time) is None, 'ea': self.get_goalie(home_road, time) is None,
+            'score': (self.score['home'], self.score['road']), 'assistants': list()})
+
+        # power play goals end the opponent's minor penalty served the longest
+        if skater_diff > 0 and not shot['penalty_shot']:
+            minors = [
+                penalty for penalty in self.serving[opp_home_road] if
+                penalty['duration'] == 120 and penalty['from_time'] < time]
+            if minors:
+                min(minors, key=lambda p: p['to_time'])['to_time'] = time
+
+        # returning pulled goaltenders
+        for pull in self.pulls:
+            if pull[2] is None:
+                pull[2] = time
+                self.change_goalie(time, pull[0], None, self.goalie_changes[
+                    max(i for i, change in enumerate(self.goalie_changes) if change[1] == pull[0] and change[2])][2])
+                self.goalie_pulled[pull[0]] = False
+                if time < 3580:
+                    self.add_moment(time + self.rng.randint(5, 20), 'pull', None)
+
+        # replacing goaltenders that conceded too many goals
+        goalie = self.get_goalie(opp_home_road, time + 1)
+        if (
+            self.score[home_road] >= 4 and time < 3000 and goalie is not None and
+            not self.goalie_replaced[opp_home_road] and self.rng.random() < 0.4
+        ):
+            self.change_goalie(time, opp_home_road, goalie, self.lineups[opp_home_road]['GK'][1].player_id)
+            self.goalie_replaced[opp_home_road] = True
+
+        return time > 3600
+
+    def simulate_shootout(self):
+        """
+        Simulates shootout with (at least) five rounds, each team shooting
+        alternately until the shootout has been decided.
+        """
+        shooters = {
+            home_road: sorted(self.lineups[home_road]['FO'], key=lambda p: -p.rating)
+            for home_road in ['home', 'road']}
+        attempts = {'home': 0, 'road': 0}
+        goals = {'home': 0, 'road': 0}
+
+        while True:
+            for home_road in ['home', 'road']:
+                opp_home_road = switch_team(home_road)
+                shooter = shooters[home_road][attempts[home_road] % len(shooters[home_road])]
+                attempts[home_road] += 1
+                scored = self.rng.random() < 0.33
+                goals[home_road] += scored
+                self.shootout.append({
+                    'order': len(self.shootout) + 1, 'home_road': home_road, 'shooter': shooter,
+                    'goalie': self.get_goalie(opp_home_road, self.game_end), 'scored': scored})
+
+                if max(attempts.values()) <= 5:
+                    remaining = {key: 5 - value for key, value in attempts.items()}
+                    if (
+                        goals['home'] > goals['road'] + remaining['road'] or
+                        goals['road'] > goals['home'] + remaining['home']
+                    ):
+                        break
+                elif attempts['home'] == attempts['road'] and goals['home'] != goals['road']:
+                    break
+            else:
+                continue
+            break
+
+        winner = 'home' if goals['home'] > goals['road'] else 'road'
+        self.score[winner] += 1
+
+    # putting skaters on ice
+
+    def get_lines(self, home_road):
+        forwards = self.lineups[home_road]['FO']
+        defensemen = self.lineups[home_road]['DE']
+        return [forwards[i:i + 3] for i in range(0, len(forwards), 3)], [
+            defensemen[i:i + 2] for i in range(0, len(defensemen), 2)]
+
+    def pick_skaters(self, units, first_unit, count, unavailable):
+        """
+        Picks specified number of skaters from units (lines or pairs)
+        beginning with the specified one, skipping unavailable players.
+        """
+        skaters = list()
+        for i in range(len(units)):
+            for player in units[(first_unit + i) % len(units)]:
+                if player.player_id not in unavailable:
+                    skaters.append(player)
+                if len(skaters) == count:
+                    return skaters
+
+        return skaters
+
+    def create_shifts(self):
+        """
+        Puts skaters on ice for the whole game, changing them regularly as
+        well as with every change in skater counts, goal and penalty. Both
+        teams' skaters on ice are registered in segments of constant
+        personnel.
+        """
+        period_ends = set(t for t in range(1200, self.game_end, 1200))
+        boundaries = set([0, self.game_end]) | period_ends
+        for penalty in self.penalties:
+            for time in (penalty['create_time'], penalty['from_time'], penalty['to_time']):
+                boundaries.add(time)
+        for _, from_time, to_time in self.pulls:
+            boundaries.update([from_time, to_time])
+        boundaries.update([goal['time'] for goal in self.goals])
+        boundaries = sorted(t for t in boundaries if t is not None and 0 <= t <= self.game_end)
+
+        # adding regular line changes
+        change_times = set(boundaries)
+        for from_time, to_time in zip(boundaries[:-1], boundaries[1:]):
+            time = from_time + self.rng.randint(35, 55)
+            while time < to_time - 10:
+                change_times.add(time)
+                time += self.rng.randint(35, 55)
+        change_times = sorted(change_times)
+
+        lines = {home_road: self.get_lines(home_road) for home_road in ['home', 'road']}
+        rotations = {home_road: defaultdict(int) for home_road in ['home', 'road']}
+        unassigned_penalties = sorted(
+            [p for p in self.penalties if p['player_of'] is None], key=lambda p: p['create_time'])
+
+        self.segments = list()
+        for from_time, to_time in zip(change_times[:-1], change_times[1:]):
+            skater_counts, base_counts = self.get_skater_counts(from_time + 1)
+            # players in the penalty box are unavailable
+            unavailable = set(
+                penalty['player'].player_id for penalty in self.penalties if
+                penalty['player'] is not None and penalty['duration'] and
+                penalty['create_time'] <= from_time < (penalty['to_time'] or self.game_end))
+
+            units = dict()
+            for home_road in ['home', 'road']:
+                opp_home_road = switch_team(home_road)
+                if base_counts[home_road] > base_counts[opp_home_road]:
+                    situation = 'pp'
+                elif base_counts[home_road] < base_counts[opp_home_road]:
+                    situation = 'pk'
+                else:
+                    situation = 'ev'
+                skater_count = skater_counts[home_road]
+                defense_count = 1 if from_time >= 3600 and skater_count == 3 else 2
+                rotation = rotations[home_road][situation]
+                rotations[home_road][situation] += 1
+                forward_lines, defense_pairs = lines[home_road]
+                units[home_road] = self.pick_skaters(
+                    forward_lines, LINE_ROTATIONS[situation][rotation % len(LINE_ROTATIONS[situation])],
+                    skater_count - defense_count, unavailable) + self.pick_skaters(
+                    defense_pairs, PAIR_ROTATIONS[situation][rotation % len(PAIR_ROTATIONS[situation])],
+                    defense_count, unavailable)
+            self.segments.append((from_time, to_time, units))
+
+            # penalized players are on ice when the penalty is called
+            while unassigned_penalties and unassigned_penalties[0]['create_time'] <= to_time:
+                penalty = unassigned_penalties.pop(0)
+                penalty['player'] = self.rng.choice(units[penalty['home_road']])
+        for penalty in self.penalties:
+            if penalty['player_of'] is not None:
+                penalty['player'] = penalty['player_of']['player']
+
+        self.segment_ends = [to_time for _, to_time, _ in self.segments]
+
+    def get_skaters_on_ice(self, home_road, time):
+        """
+        Gets skaters on ice for specified team at specified time.
+        """
+        idx = min(bisect.bisect_left(self.segment_ends, max(time, 1)), len(self.segments) - 1)
+        return self.segments[idx][2][home_road]
+
+    def assign_players(self):
+        """
+        Assigns shooters, blockers, scorers, assistants and players on ice to
+        shot attempts and goals.
+        """
+        for shot in self.shots:
+            skaters = self.get_skaters_on_ice(shot['home_road'], shot['time'])
+            if shot['penalty_shot']:
+                skaters = self.lineups[shot['home_road']]['FO'][:6]
+            shot['player'] = self.rng.choices(
+                skaters, weights=[p.rating * (3 if p.position == 'FO' else 1.5) for p in skaters])[0]
+            if shot['result'] == 3:
+                shot['blocker'] = self.rng.choice(
+                    self.get_skaters_on_ice(switch_team(shot['home_road']), shot['time']))
+
+        for goal in self.goals:
+            home_road = goal['home_road']
+            opp_home_road = switch_team(home_road)
+            skaters = self.get_skaters_on_ice(home_road, goal['time'])
+            opp_skaters = self.get_skaters_on_ice(opp_home_road, goal['time'])
+            goalie = self.get_goalie(home_road, goal['time'])
+            opp_goalie = self.get_goalie(opp_home_road, goal['time'])
+            scorer = goal['shot']['player']
+            if not goal['shot']['penalty_shot']:
+                teammates = [p for p in skaters if p != scorer]
+                assist_cnt = self.rng.choices([0, 1, 2], weights=[0.08, 0.27, 0.65])[0]
+                goal['assistants'] = self.rng.sample(teammates, min(assist_cnt, len(teammates)))
+            goal['positive'] = [p.player_id for p in skaters] + ([goalie] if goalie else [])
+            goal['negative'] = [p.player_id for p in opp_skaters] + ([opp_goalie] if opp_goalie else [])
+
+    def create_faceoffs(self):
+        """
+        Creates faceoffs at the beginning of each period, after goals,
+        penalties and saves as well as after random other stoppages.
+        """
+        stoppages = [(t, 'C') for t in range(0, self.game_end, 1200)]
+        for goal in self.goals:
+            stoppages.append((goal['time'], 'C'))
+        for penalty in self.penalties:
+            stoppages.append((penalty['create_time'], self.rng.choice(DEFENSIVE_ZONE_SPOTS[penalty['home_road']])))
+        for shot in self.shots:
+            if shot['result'] == 1 and self.rng.random() < 0.35:
+                stoppages.append((
+                    shot['time'], self.rng.choice(DEFENSIVE_ZONE_SPOTS[switch_team(shot['home_road'])])))
+        for _ in range(self.rng.randint(8, 16)):
+            stoppages.append((
+                self.rng.randint(1, self.game_end - 1),
+                self.rng.choice(['C'] + NEUTRAL_ZONE_SPOTS['home'] + NEUTRAL_ZONE_SPOTS['road'])))
+
+        self.faceoffs = list()
+        for time, spot in sorted(set(stoppages)):
+            if time >= self.game_end or time in [faceoff['time'] for faceoff in self.faceoffs]:
+                continue
+            centers = {
+                home_road: self.get_skaters_on_ice(home_road, time + 1)[0] for home_road in ['home', 'road']}
+            home_win_probability = centers['home'].rating / (centers['home'].rating + centers['road'].rating)
+            winner = 'home' if self.rng.random() < home_win_probability else 'road'
+            self.faceoffs.append({
+                'time': time, 'spot': spot, 'winner': centers[winner], 'loser': centers[switch_team(winner)]})
+
+    def generate(self):
+        self.simulate()
+        self.create_shifts()
+        self.assign_players()
+        self.create_faceoffs()
+
+    # deriving raw data
+
+    def get_period_goals(self, period):
+        return [
+            len([g for g in self.goals if g['home_road'] == home_road and get_period(g['time']) == str(period)])
+            for home_road in ['home', 'road']]
+
+    def get_game_info(self):
+        results = {'final': {'score_home': self.score['home'], 'score_guest': self.score['road']}}
+        for period, key in [(1, 'first_period'), (2, 'second_period'), (3, 'third_period')]:
+            home_goals, road_goals = self.get_period_goals(period)
+            results[key] = {'score_home': home_goals, 'score_guest': road_goals}
+        home_goals, road_goals = self.get_period_goals('overtime')
+        results['overtime'] = {'score_home': home_goals, 'score_guest': road_goals}
+
+        referees = self.rng.sample(list(enumerate(REFEREES, start=1)), 4)
+        best_players = dict()
+        for home_road in ['home', 'road']:
+            best_player = self.rng.choice(self.lineups[home_road]['FO'][:6] + self.lineups[home_road]['GK'][:1])
+            best_players[home_road.replace('road', 'visitor')] = {
+                'id': best_player.player_id, 'name': "%s %s" % (best_player.first_name, best_player.last_name)}
+
+        return {
+            'id': self.game_id,
+            'startDate': self.start_date.strftime('%Y-%m-%d %H:%M:%S'),
+            'status': 'AFTER_MATCH',
+            'stadium': self.teams['home'].arena,
+            'numberOfViewers': int(capacities.get(self.teams['home'].arena, 5000) * self.rng.uniform(0.55, 1)),
+            'teamInfo': {
+                home_road.replace('road', 'visitor'): {
+                    'id': team.team_id, 'name': team.name, 'shortcut': team.abbr}
+                for home_road, team in self.teams.items()},
+            'trainers': {
+                "%sHeadCoach" % home_road.replace('road', 'visitor'): {'id': team.coach_id, 'name': team.coach}
+                for home_road, team in self.teams.items()},
+            'results': {
+                'score': results, 'extra_time': self.game_end > 3600, 'shooting': bool(self.shootout)},
+            'referees': {
+                key: {'id': referee_id, 'name': name} for key, (referee_id, name) in zip(
+                    ['headReferee1', 'headReferee2', 'lineReferee1', 'lineReferee2'], referees)},
+            'bestPlayers': best_players,
+        }
+
+    def get_game_roster(self):
+        roster = dict()
+        for home_road in ['home', 'road']:
+            team_roster = dict()
+            forward_lines, defense_pairs = self.get_lines(home_road)
+            for clr, goalie in enumerate(self.lineups[home_road]['GK'], start=1):
+                team_roster["10%d" % clr] = get_player_ref(goalie)
+            for line, pair in enumerate(defense_pairs, start=1):
+                for clr, player in enumerate(pair, start=1):
+                    team_roster["2%d%d" % (line, clr)] = get_player_ref(player)
+            for line, forwards in enumerate(forward_lines, start=1):
+                for clr, player in enumerate(forwards, start=1):
+                    team_roster["3%d%d" % (line, clr)] = get_player_ref(player)
+            roster[home_road.replace('road', 'visitor')] = team_roster
+
+        return roster
+
+    def get_game_events(self):
+        players = dict()
+        for home_road in ['home', 'road']:
+            for position_players in self.lineups[home_road].values():
+                for player in position_players:
+                    players[player.player_id] = player
+
+        events = list()
+        for time, home_road, goalie_out, goalie_in in self.goalie_changes:
+            events.append((time, 'goalkeeperChange', {
+                'time': time, 'team': home_road.replace('road', 'visitor'),
+                'outgoingGoalkeeper': get_player_ref(players[goalie_out]) if goalie_out else None,
+                'player': get_player_ref(players[goalie_in]) if goalie_in else None}))
+        for penalty in self.penalties:
+            events.append((penalty['create_time'], 'penalty', {
+                'id': penalty['id'], 'team': penalty['home_road'].replace('road', 'visitor'),
+                'disciplinedPlayer': get_player_ref(penalty['player']),
+                'time': {
+                    'from': {'scoreboardTime': penalty['from_time']}, 'to': {'scoreboardTime': penalty['to_time']}},
+                'codename': penalty['codename'], 'duration': penalty['duration'],
+                'createTime': penalty['create_time'], 'shooting': penalty['shooting']}))
+        for goal in self.goals:
+            events.append((goal['time'], 'goal', {
+                'team': goal['home_road'].replace('road', 'visitor'),
+                'currentScore': "%d:%d" % goal['score'], 'balance': goal['balance'],
+                'en': goal['en'], 'ea': goal['ea'],
+                'scorer': get_player_ref(goal['shot']['player']),
+                'assistants': [get_player_ref(player) for player in goal['assistants']],
+                'attendants': {
+                    'positive': [get_player_ref(players[player_id]) for player_id in goal['positive']],
+                    'negative': [get_player_ref(players[player_id]) for player_id in goal['negative']]}}))
+        for period_end in sorted(set(list(range(1200, self.game_end, 1200)) + [self.game_end])):
+            events.append((period_end, 'periodEnd', {}))
+
+        game_events = defaultdict(list)
+        for cnt, (time, event_type, data) in enumerate(sorted(events, key=lambda e: e[0]), start=1):
+            game_events[get_period(time)].append({'id': cnt, 'type': event_type, 'time': time, 'data': data})
+
+        # adding shootout attempts along with the game-winning shootout goal
+        if self.shootout:
+            winner = 'home' if self.score['home'] > self.score['road'] else 'road'
+            for attempt in self.shootout:
+                game_events['shootout'].append({'type': 'shootout', 'time': self.game_end, 'data': {
+                    'order': attempt['order'], 'team': attempt['home_road'].replace('road', 'visitor'),
+                    'scored': attempt['scored'], 'scorer': get_player_ref(attempt['shooter']),
+                    'goalkeeper': get_player_ref(players[attempt['goalie']])}})
+            decisive_attempt = [a for a in self.shootout if a['home_road'] == winner and a['scored']][-1]
+            game_events['shootout'].append({'type': 'goal', 'time': self.game_end, 'data': {
+                'team': winner.replace('road', 'visitor'),
+                'currentScore': "%d:%d" % (self.score['home'], self.score['road']), 'balance': 'GWS',
+                'en': False, 'ea': False, 'scorer': get_player_ref(decisive_attempt['shooter']),
+                'assistants': list(), 'attendants': {'positive': list(), 'negative': list()}}})
+
+        return dict(game_events)
+
+    def get_shifts(self):
+        shifts = list()
+        period_starts = set(range(0, self.game_end, 1200))
+        for home_road in ['home', 'road']:
+            team = self.teams[home_road]
+            open_shifts = dict()
+            for from_time, to_time, units in self.segments + [(self.game_end, None, {'home': [], 'road': []})]:
+                on_ice = set(units[home_road]) if from_time not in period_starts else set()
+                for player in list(open_shifts):
+                    if player not in on_ice:
+                        shifts.append({
+                            'id': len(shifts) + 1,
+                            'player': {'id': player.player_id, 'name': "%s %s" % (
+                                player.first_name, player.last_name), 'jersey': player.jersey},
+                            'team': {'id': team.team_id, 'shortcut': team.abbr},
+                            'startTime': {'time': open_shifts.pop(player)}, 'endTime': {'time': from_time}})
+                for player in units[home_road]:
+                    if player not in open_shifts:
+                        open_shifts[player] = from_time
+
+        return sorted(shifts, key=lambda s: (s['startTime']['time'], s['id']))
+
+    def get_shots(self):
+        shots = list()
+        for cnt, shot in enumerate(self.shots, start=1):
+            player = shot['player']
+            if shot['penalty_shot']:
+                x, y = self.rng.randint(70, 82), self.rng.randint(-6, 6)
+            elif self.rng.random() < 0.02:
+                x, y = self.rng.randint(88, 98), self.rng.randint(-60, 60)
+            elif player.position == 'DE' and shot['result'] != 4:
+                x, y = self.rng.randint(30, 55), self.rng.randint(-90, 90)
+            else:
+                x = self.rng.randint(62 if shot['result'] == 4 else 52, 86)
+                y = min(max(round(self.rng.gauss(0, 25 if shot['result'] == 4 else 40)), -95), 95)
+            # road team shoots at the home team's goal on the other side
+            if shot['home_road'] == 'road':
+                x, y = -x, -y
+            shots.append({
+                'id': cnt, 'player_id': player.player_id, 'jersey': player.jersey,
+                'first_name': player.first_name, 'last_name': player.last_name,
+                'team_id': self.teams[shot['home_road']].team_id, 'time': shot['time'],
+                'coordinate_x': x, 'coordinate_y': y, 'match_shot_resutl_id': shot['result'],
+                'real_date': (self.start_date + timedelta(seconds=shot['time'] * 2)).strftime('%Y-%m-%d %H:%M:%S')})
+
+        return {'match': {'id': self.game_id, 'shots': shots}}
+
+    def get_faceoffs(self):
+        return [{
+            'id': cnt, 'time': faceoff['time'], 'positionShortcut': faceoff['spot'],
+            'winner': {'id': faceoff['winner'].player_id, 'name': "%s %s" % (
+                faceoff['winner'].first_name, faceoff['winner'].last_name)},
+            'losser': {'id': faceoff['loser'].player_id, 'name': "%s %s" % (
+                faceoff['loser'].first_name, faceoff['loser'].last_name)},
+        } for cnt, faceoff in enumerate(self.faceoffs, start=1)]
+
+    def get_game_winning_goal(self):
+        """
+        Gets game-winning goal, i.e. the winning team's goal that exceeds the
+        losing team's final goal count (not applicable for shootouts).
+        """
+        if self.shootout:
+            return
+        winner = 'home' if self.score['home'] > self.score['road'] else 'road'
+        winner_goals = [goal for goal in self.goals if goal['home_road'] == winner]
+
+        return winner_goals[self.score[switch_team(winner)]]
+
+    def get_player_stats(self, home_road, shifts):
+        """
+        Gets game statistics for all dressed players of specified team using
+        the specified shifts of both teams.
+        """
+        key = 'home' if home_road == 'home' else 'away'
+        stats = defaultdict(lambda: defaultdict(int))
+
+        for shot in self.shots:
+            if shot['home_road'] == home_road:
+                player_stats = stats[shot['player'].player_id]
+                player_stats['shotsAttempts'] += 1
+                if shot['result'] in (1, 4):
+                    player_stats['shotsOnGoal'] += 1
+                elif shot['result'] in (2, 5):
+                    player_stats['shotsMissed'] += 1
+                else:
+                    player_stats['shotsBlocked'] += 1
+            elif shot['result'] == 3:
+                stats[shot['blocker'].player_id]['blockedShotsByPlayer'] += 1
+
+        gw_goal = self.get_game_winning_goal()
+        for goal in self.goals:
+            if goal['home_road'] == home_road:
+                scorer_stats = stats[goal['shot']['player'].player_id]
+                scorer_stats['goals'] += 1
+                if goal['balance'].startswith('PP'):
+                    scorer_stats['ppGoals'] += 1
+                elif goal['balance'].startswith('SH'):
+                    scorer_stats['shGoals'] += 1
+                if goal is gw_goal:
+                    scorer_stats['gwGoals'] += 1
+                for assistant in goal['assistants']:
+                    stats[assistant.player_id]['assists'] += 1
+            # power play goals and penalty shots are not considered for
+            # plus/minus
+            if goal['balance'].startswith('PP') or goal['balance'] == 'PS':
+                continue
+            goalies = set(player.player_id for lineup in self.lineups.values() for player in lineup['GK'])
+            for player_id in goal['positive' if goal['home_road'] == home_road else 'negative']:
+                if player_id not in goalies:
+                    stats[player_id]['positive' if goal['home_road'] == home_road else 'negative'] += 1
+
+        for penalty in self.penalties:
+            if penalty['home_road'] == home_road:
+                stats[penalty['player'].player_id]['penaltyMinutes'] += penalty['duration'] // 60
+
+        for faceoff in self.faceoffs:
+            for player, result in [(faceoff['winner'], 'faceoffsWin'), (faceoff['loser'], 'faceoffsLosses')]:
+                if player in self.lineups[home_road]['FO'] + self.lineups[home_road]['DE']:
+                    stats[player.player_id]['faceoffsCount'] += 1
+                    stats[player.player_id][result] += 1
+
+        opp_home_road = switch_team(home_road)
+        for shift in shifts:
+            if shift['team']['id'] == self.teams[home_road].team_id:
+                player_stats = stats[shift['player']['id']]
+                player_stats['shifts'] += 1
+                player_stats['timeOnIce'] += shift['endTime']['time'] - shift['startTime']['time']
+        for from_time, to_time, units in self.segments:
+            _, base_counts = self.get_skater_counts(from_time + 1)
+            if base_counts[home_road] == base_counts[opp_home_road]:
+                continue
+            toi_key = 'timeOnIcePP' if base_counts[home_road] > base_counts[opp_home_road] else 'timeOnIceSH'
+            for player in units[home_road]:
+                stats[player.player_id][toi_key] += to_time - from_time
+        changes = [change for change in self.goalie_changes if change[1] == home_road]
+        for (change_time, _, _, goalie_in), next_change_time in zip(
+            changes, [change[0] for change in changes[1:]] + [self.game_end]
+        ):
+            if goalie_in is not None:
+                stats[goalie_in]['timeOnIce'] += next_change_time - change_time
+                stats[goalie_in]['shifts'] = 1
+
+        player_stats = list()
+        for position in ['GK', 'DE', 'FO']:
+            for player in self.lineups[home_road][position]:
+                plr_stats = stats[player.player_id]
+                points = plr_stats['goals'] + plr_stats['assists']
+                player_stats.append({
+                    'id': player.player_id, 'jersey': player.jersey, 'position': player.position,
+                    'firstname': player.first_name, 'surname': player.last_name,
+                    'name': "%s %s" % (player.first_name, player.last_name),
+                    'nationalityShort': player.nationality, 'stick': player.stick,
+                    'weight': player.weight, 'height': player.height, 'dateOfBirth': player.date_of_birth,
+                    'statistics': {
+                        'teamShortcut': self.teams[home_road].abbr,
+                        'games': 1 if plr_stats['timeOnIce'] else 0,
+                        'goals': {key: plr_stats['goals']},
+                        'assists': {key: plr_stats['assists']},
+                        'points': {key: points},
+                        'shotsOnGoal': {key: plr_stats['shotsOnGoal']},
+                        'shotEfficiency': round(
+                            plr_stats['goals'] / plr_stats['shotsOnGoal'] * 100, 2) if plr_stats['shotsOnGoal'] else 0,
+                        **{attr: plr_stats[attr] for attr in [
+                            'penaltyMinutes', 'positive', 'negative', 'ppGoals', 'shGoals', 'gwGoals',
+                            'shotsAttempts', 'shotsMissed', 'shotsBlocked', 'faceoffsCount', 'faceoffsWin',
+                            'faceoffsLosses', 'blockedShotsByPlayer', 'timeOnIce', 'timeOnIcePP', 'timeOnIceSH',
+                            'shifts']},
+                    }})
+
+        return player_stats
+
+    def get_team_stats(self, home_road):
+        opp_home_road = switch_team(home_road)
+        stats = defaultdict(int)
+        for shot in self.shots:
+            if shot['home_road'] == home_road:
+                stats['shotsAttempts'] += 1
+                if shot['result'] in (1, 4):
+                    stats['shotsOnGoal'] += 1
+                elif shot['result'] in (2, 5):
+                    stats['shotsMissed'] += 1
+                else:
+                    stats['shotsBlocked'] += 1
+            elif shot['result'] == 1:
+                stats['saves'] += 1
+        for goal in self.goals:
+            if goal['home_road'] == home_road:
+                if goal['balance'].startswith('PP'):
+                    stats['ppGoals'] += 1
+                elif goal['balance'].startswith('SH'):
+                    stats['shGoals'] += 1
+        for penalty in self.penalties:
+            if penalty['home_road'] == home_road:
+                stats['penaltyMinutes'] += penalty['duration'] // 60
+
+        # counting power play time and opportunities
+        previous_situation = None
+        for from_time, to_time, _ in self.segments:
+            _, base_counts = self.get_skater_counts(from_time + 1)
+            if base_counts[home_road] > base_counts[opp_home_road]:
+                situation = 'pp'
+                stats['powerPlaySeconds'] += to_time - from_time
+            elif base_counts[home_road] < base_counts[opp_home_road]:
+                situation = 'sh'
+            else:
+                situation = None
+            if situation and situation != previous_situation:
+                stats["%sCount" % situation] += 1
+            previous_situation = situation
+        stats['faceOffsWon'] = len([
+            f for f in self.faceoffs if f['winner'] in self.lineups[home_road]['FO'] + self.lineups[home_road]['DE']])
+
+        return {attr: stats[attr] for attr in TEAM_STATS_ATTRS}
+
+    def get_player_totals(self, player_stats_by_team):
+        """
+        Gets games played, goals, assists and penalty minutes for all
+        players participating in the game from specified game statistics of
+        both teams.
+        """
+        player_totals = dict()
+        for home_road in ['home', 'road']:
+            key = 'home' if home_road == 'home' else 'away'
+            for player_stats in player_stats_by_team[home_road]:
+                stat_dict = player_stats['statistics']
+                if stat_dict['games']:
+                    player_totals[player_stats['id']] = [
+                        1, stat_dict['goals'][key], stat_dict['assists'][key], stat_dict['penaltyMinutes']]
+
+        return player_totals
+
+
+def write_raw_data(tgt_dir, category, season, game_type, file_name, data):
+    """
+    Writes raw data to the same location (and in the same form) it would
+    have been downloaded to.
+    """
+    tgt_path = os.path.join(tgt_dir, category, str(season), str(game_type), file_name)
+    if not os.path.isdir(os.path.dirname(tgt_path)):
+        os.makedirs(os.path.dirname(tgt_path), exist_ok=True)
+    open(tgt_path, 'w').write(json.dumps(data, indent=2))
+
+
+def generate_game(task):
+    """
+    Generates all raw data for specified game. Returns the game's result.
+    """
+    season_type = CONFIG['game_types'][task.game_type]
+    rng = random.Random("%d:%d:%d" % (task.seed, task.season, task.game_id))
+    game = SyntheticGame(task.game_id, task.season, season_type, task.start_date, task.home, task.road, rng)
+    game.generate()
+
+    def write(category, file_name, data):
+        write_raw_data(task.tgt_dir, category, task.season, task.game_type, file_name, data)
+
+    write('game_info', "%d.json" % task.game_id, game.get_game_info())
+    write('game_roster', "%d.json" % task.game_id, game.get_game_roster())
+    write('game_events', "%d.json" % task.game_id, game.get_game_events())
+    shifts = game.get_shifts()
+    write('shifts', "%d.json" % task.game_id, shifts)
+    write('shots', "%d.json" % task.game_id, game.get_shots())
+    write('faceoffs', "%d.json" % task.game_id, game.get_faceoffs())
+    player_stats_by_team = dict()
+    for home_road, team in game.teams.items():
+        file_name = "%d_%d.json" % (task.game_id, team.team_id)
+        player_stats_by_team[home_road] = game.get_player_stats(home_road, shifts)
+        write('game_player_stats', file_name, player_stats_by_team[home_road])
+        write('game_team_stats', file_name, game.get_team_stats(home_road))
+
+    return GameResult(
+        task.game_id, game.score['home'], game.score['road'], game.game_end > 3600, bool(game.shootout),
+        game.get_player_totals(player_stats_by_team))
+
+
+def create_player(rng, player_id, position, jersey):
+    nationality = rng.choices([n for n, _ in NATIONALITIES], weights=[w for _, w in NATIONALITIES])[0]
+    date_of_birth = date(rng.randint(1982, 2002), rng.randint(1, 12), rng.randint(1, 28))
+
+    return Player(
+        player_id, rng.choice(FIRST_NAMES), rng.choice(SURNAMES), jersey, position,
+        rng.choice(['left', 'left', 'right']), nationality, rng.randint(175, 198), rng.randint(75, 105),
+        date_of_birth.isoformat(), round(rng.uniform(0.5, 1.5), 3))
+
+
+def create_teams(team_count, seed):
+    """
+    Creates specified number of teams (from the configured ones) with
+    synthetic rosters. Rosters are the same for all seasons.
+    """
+    if team_count > len(CONFIG['teams']):
+        raise ValueError("Unable to create more than %d teams" % len(CONFIG['teams']))
+    arenas = sorted(capacities)
+
+    teams = list()
+    for i, team_id in enumerate(sorted(CONFIG['teams'])[:team_count]):
+        rng = random.Random("%d:team:%d" % (seed, team_id))
+        jerseys = rng.sample(range(1, 100), sum(ROSTER_SIZES.values()))
+        players = list()
+        for position, roster_size in ROSTER_SIZES.items():
+            for _ in range(roster_size):
+                player_id = team_id * 100 + len(players) + 1
+                players.append(create_player(rng, player_id, position, jerseys[len(players)]))
+        teams.append(Team(
+            team_id, CONFIG['teams'][team_id], "Team %s" % CONFIG['teams'][team_id],
+            arenas[i % len(arenas)], i + 1, coaches[i % len(coaches)], players))
+
+    return teams
+
+
+def get_round_robin(teams):
+    """
+    Gets rounds of games with each team facing each other team once (and
+    at most once per round).
+    """
+    teams = list(teams) + ([None] if len(teams) % 2 else [])
+    rounds = list()
+    for round_no in range(len(teams) - 1):
+        pairs = [(teams[i], teams[-1 - i]) for i in range(len(teams) // 2)]
+        rounds.append([
+            (road, home) if round_no % 2 else (home, road) for home, road in pairs if home and road])
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+
+    return rounds
+
+
+def get_start_date(game_date, rng):
+    """
+    Gets start date (and time) for game played on specified date.
+    """
+    if game_date.weekday() == 6:
+        hour, minute = rng.choice([(14, 0), (16, 30), (19, 0)])
+    else:
+        hour, minute = (19, 30)
+
+    return datetime(game_date.year, game_date.month, game_date.day, hour, minute)
+
+
+def create_regular_season_tasks(tgt_dir, season, teams, scale, seed):
+    """
+    Sets up tasks for all regular season games of specified season, spread
+    evenly across the regular season.
+    """
+    rng = random.Random("%d:%d:schedule" % (seed, season))
+    rounds = get_round_robin(teams)
+    matchdays = list()
+    for cycle in range(RS_GAMES_PER_OPPONENT * scale):
+        for pairs in rounds:
+            matchdays.append([(road, home) if cycle % 2 else (home, road) for home, road in pairs])
+
+    start = RS_START_DATES.get(season, date(season, 9, 14))
+    days = (PLAYOFF_DATES[season] - start).days - 2
+
+    tasks = list()
+    for matchday_no, matchday in enumerate(matchdays):
+        game_date = start + timedelta(days=matchday_no * days // len(matchdays))
+        for home, road in matchday:
+            tasks.append(GameTask(
+                tgt_dir, seed, season, 1, (season % 100) * 1000000 + len(tasks) + 1,
+                get_start_date(game_date, rng), str(matchday_no + 1), home, road))
+
+    return tasks
+
+
+def get_standings(teams, tasks, results):
+    """
+    Gets teams ordered by regular season points (and goal differential).
+    """
+    points = defaultdict(int)
+    goal_diff = defaultdict(int)
+    for task, result in zip(tasks, results):
+        for team, score, opp_score in [
+            (task.home, result.home_score, result.road_score), (task.road, result.road_score, result.home_score)
+        ]:
+            goal_diff[team.team_id] += score - opp_score
+            if score > opp_score:
+                points[team.team_id] += 2 if result.overtime else 3
+            elif result.overtime:
+                points[team.team_id] += 1
+
+    return sorted(teams, key=lambda team: (-points[team.team_id], -goal_diff[team.team_id], team.team_id))
+
+
+def generate_games(tasks, executor=None):
+    if executor is not None:
+        return list(executor.map(generate_game, tasks))
+    return list(map(generate_game, tasks))
+
+
+def generate_playoffs(tgt_dir, season, standings, seed, first_game_id, executor=None):
+    """
+    Generates playoff series of the best teams in specified regular season
+    standings, re-seeding the remaining teams after each round. Returns
+    tasks and results for all playoff games.
+    """
+    rng = random.Random("%d:%d:playoffs" % (seed, season))
+    playoff_team_cnt = 2 ** min(len(PLAYOFF_ROUNDS), (len(standings)).bit_length() - 1)
+    playoff_rounds = PLAYOFF_ROUNDS[len(PLAYOFF_ROUNDS) - (playoff_team_cnt.bit_length() - 1):]
+    remaining = standings[:playoff_team_cnt]
+
+    all_tasks, all_results = list(), list()
+    round_start = PLAYOFF_DATES[season]
+    for round_name, wins_needed in playoff_rounds:
+        series = [
+            [remaining[i], remaining[-1 - i], {'wins': [0, 0], 'games': 0}] for i in range(len(remaining) // 2)]
+        last_date = round_start
+        while True:
+            active = [s for s in series if max(s[2]['wins']) < wins_needed]
+            if not active:
+                break
+            tasks = list()
+            for higher_seed, lower_seed, state in active:
+                state['games'] += 1
+                # higher seeds have home ice in odd-numbered games
+                home, road = (higher_seed, lower_seed) if state['games'] % 2 else (lower_seed, higher_seed)
+                last_date = round_start + timedelta(days=2 * (state['games'] - 1))
+                tasks.append(GameTask(
+                    tgt_dir, seed, season, 3, first_game_id + len(all_tasks) + len(tasks),
+                    get_start_date(last_date, rng), "%s %d" % (round_name, state['games']), home, road))
+            results = generate_games(tasks, executor)
+            for (higher_seed, _, state), task, result in zip(active, tasks, results):
+                home_won = result.home_score > result.road_score
+                state['wins'][0 if (task.home == higher_seed) == home_won else 1] += 1
+            all_tasks.extend(tasks)
+            all_results.extend(results)
+        print("\t+ %s: %s" % (round_name, ", ".join(
+            "%s vs. %s %d:%d" % (s[0].abbr, s[1].abbr, *s[2]['wins']) for s in series)))
+
+        # re-seeding remaining teams by their regular season standings
+        winners = set(s[0 if s[2]['wins'][0] == wins_needed else 1].team_id for s in series)
+        remaining = [team for team in remaining if team.team_id in winners]
+        round_start = last_date + timedelta(days=2)
+
+    return all_tasks, all_results
+
+
+def write_schedules(tgt_dir, season, game_type, teams, tasks, results):
+    """
+    Writes schedules for all teams listing specified games.
+    """
+    for team in teams:
+        matches = list()
+        for task, result in zip(tasks, results):
+            if team not in (task.home, task.road):
+                continue
+            matches.append({
+                'id': task.game_id, 'round': task.round,
+                'start_date': task.start_date.strftime('%Y-%m-%d %H:%M:%S'), 'status': 'AFTER_MATCH',
+                'home': {'id': task.home.team_id, 'shortcut': task.home.abbr, 'name': task.home.name},
+                'guest': {'id': task.road.team_id, 'shortcut': task.road.abbr, 'name': task.road.name},
+                'results': {
+                    'score': {'final': {'score_home': result.home_score, 'score_guest': result.road_score}},
+                    'extra_time': result.overtime, 'shooting': result.shootout},
+            })
+        write_raw_data(tgt_dir, 'schedules', season, game_type, "%d.json" % team.team_id, {'matches': matches})
+
+
+def write_roster_stats(tgt_dir, season, game_type, teams, results):
+    """
+    Writes roster statistics with season totals for all players of all
+    teams.
+    """
+    totals = defaultdict(lambda: [0, 0, 0, 0])
+    for result in results:
+        for player_id, player_totals in result.player_totals.items():
+            totals[player_id] = [total + value for total, value in zip(totals[player_id], player_totals)]
+
+    for team in teams:
+        roster = list()
+        for player in team.players:
+            games, goals, assists, pim = totals[player.player_id]
+            roster.append({
+                'id': player.player_id, 'team_id': team.team_id, 'jersey': player.jersey,
+                'firstname': player.first_name, 'surname': player.last_name,
+                'name': "%s %s" % (player.first_name, player.last_name), 'position': player.position,
+                'stick': player.stick, 'nationalityShort': player.nationality, 'height': player.height,
+                'weight': player.weight, 'dateOfBirth': player.date_of_birth,
+                'statistics': {
+                    'games': games, 'goals': goals, 'assists': assists, 'points': goals + assists,
+                    'penaltyMinutes': pim}})
+        write_raw_data(tgt_dir, 'roster_stats', season, game_type, "%d.json" % team.team_id, roster)
+
+
+def generate_season(tgt_dir, season, teams, scale=1, seed=0, executor=None):
+    """
+    Generates raw data for a complete season, i.e. regular season and
+    playoffs. Returns number of games generated.
+    """
+    rs_tasks = create_regular_season_tasks(tgt_dir, season, teams, scale, seed)
+    print("+ Generating %d regular season games for season %d" % (len(rs_tasks), season))
+    rs_results = generate_games(rs_tasks, executor)
+
+    standings = get_standings(teams, rs_tasks, rs_results)
+    print("+ Generating playoffs for season %d" % season)
+    po_tasks, po_results = generate_playoffs(
+        tgt_dir, season, standings, seed, (season % 100) * 1000000 + len(rs_tasks) + 1, executor)
+
+    for game_type, tasks, results in [(1, rs_tasks, rs_results), (3, po_tasks, po_results)]:
+        write_schedules(tgt_dir, season, game_type, teams, tasks, results)
+        write_roster_stats(tgt_dir, season, game_type, teams, results)
+
+    return len(rs_tasks) + len(po_tasks)
+
+
+if __name__ == '__main__':
+
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(description='Generate synthetic raw DEL data for benchmarks and tests.')
+    parser.add_argument(
+        '-t', '--tgt_dir', dest='tgt_dir', required=True, metavar='target directory',
+        help="The directory raw data will be written to, i.e. base_data_dir for subsequent processing")
+    parser.add_argument(
+        '-s', '--season', dest='seasons', required=False, type=int, nargs='+',
+        default=[CONFIG['default_season']], choices=sorted(PLAYOFF_DATES),
+        metavar='season to generate data for',
+        help="The season(s) for which raw data will be generated")
+    parser.add_argument(
+        '--teams', dest='teams', required=False, type=int, default=14, metavar='number of teams',
+        help="The number of teams (taken from configured teams) participating in each season")
+    parser.add_argument(
+        '--scale', dest='scale', required=False, type=int, default=1, metavar='season scale',
+        help="The multiple of the regular number of games played in each regular season")
+    parser.add_argument(
+        '--seed', dest='seed', required=False, type=int, default=0, metavar='random seed',
+        help="The seed used to generate reproducible data")
+    parser.add_argument(
+        '--workers', dest='workers', required=False, type=int, default=1,
+        metavar='number of worker processes',
+        help='The number of processes used to generate games in parallel')
+    parser.add_argument(
+        '--pack', dest='pack', required=False, action='store_true',
+        help='Pack generated raw data per category and season (removing the single files)')
+
+    args = parser.parse_args()
+
+    teams = create_teams(args.teams, args.seed)
+
+    # setting up process pool to generate games in parallel
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+
+    for season in args.seasons:
+        game_cnt = generate_season(args.tgt_dir, season, teams, args.scale, args.seed, executor)
+        print("+ Generated raw data for %d games of season %d in %s" % (game_cnt, season, args.tgt_dir))
+        if args.pack:
+            for category in CATEGORIES:
+                pack_raw_data(args.tgt_dir, category, season, remove_files=True)
+
+    if executor is not None:
+        executor.shutdown()
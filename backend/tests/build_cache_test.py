@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from build_cache import BuildCache  # noqa: E402
+from run_pipeline import STAGES, get_stage_order, get_build_plan  # noqa: E402
+from schedule_index import load_schedule_index  # noqa: E402
+from synthetic_season import create_teams, generate_season  # noqa: E402
+from incremental_processing_test import run_script, setup_config  # noqa: E402
+
+
+def setup_season(tmp_path):
+    raw_dir = tmp_path / 'raw'
+    generate_season(str(raw_dir), 2020, create_teams(2, 0))
+    return raw_dir
+
+
+def get_fingerprints(build_cache, raw_dir, stage_order):
+    schedule_index = load_schedule_index(str(raw_dir / 'schedules'))
+    game_fingerprints = build_cache.get_game_fingerprints(2020, schedule_index)
+    stage_fingerprints = {
+        stage_name: build_cache.get_stage_fingerprints(STAGES[stage_name]) for stage_name in stage_order}
+    changed_games = {
+        stage_name: build_cache.get_changed_games(
+            stage_name, 2020, game_fingerprints) for stage_name in stage_order}
+
+    return game_fingerprints, stage_fingerprints, changed_games
+
+
+def register_all_stages(build_cache, game_fingerprints, stage_fingerprints):
+    for stage_name in stage_fingerprints:
+        build_cache.register_stage(stage_name, stage_fingerprints[stage_name], game_fingerprints)
+    build_cache.save()
+
+
+def test_initial_build(tmp_path):
+    raw_dir = setup_season(tmp_path)
+    stage_order = get_stage_order(STAGES)
+    build_cache = BuildCache(str(tmp_path / 'build_cache.json'), str(raw_dir))
+    game_fingerprints, stage_fingerprints, changed_games = get_fingerprints(build_cache, raw_dir, stage_order)
+
+    # all stages are re-created from scratch, all games have changed
+    assert get_build_plan(stage_order, build_cache, stage_fingerprints, changed_games) == {
+        stage_name: True for stage_name in stage_order}
+    assert set(changed_games['shots']) == set(game_fingerprints)
+
+
+def test_unchanged_build(tmp_path):
+    raw_dir = setup_season(tmp_path)
+    stage_order = get_stage_order(STAGES)
+    build_cache = BuildCache(str(tmp_path / 'build_cache.json'), str(raw_dir))
+    register_all_stages(build_cache, *get_fingerprints(build_cache, raw_dir, stage_order)[:2])
+
+    build_cache = BuildCache(str(tmp_path / 'build_cache.json'), str(raw_dir))
+    _, stage_fingerprints, changed_games = get_fingerprints(build_cache, raw_dir, stage_order)
+    assert get_build_plan(stage_order, build_cache, stage_fingerprints, changed_games) == dict()
+
+
+def test_changed_game(tmp_path):
+    raw_dir = setup_season(tmp_path)
+    stage_order = get_stage_order(STAGES)
+    build_cache = BuildCache(str(tmp_path / 'build_cache.json'), str(raw_dir))
+    game_fingerprints, stage_fingerprints, _ = get_fingerprints(build_cache, raw_dir, stage_order)
+    register_all_stages(build_cache, game_fingerprints, stage_fingerprints)
+
+    # modifying shot data of a single game
+    game_id = sorted(game_fingerprints)[0]
+    shots_path = str(raw_dir / 'shots' / '2020' / '1' / ("%d.json" % game_id))
+    shots = json.loads(open(shots_path).read())
+    shots['match']['shots'] = shots['match']['shots'][1:]
+    open(shots_path, 'w').write(json.dumps(shots))
+    os.utime(shots_path, (0, 0))
+
+    build_cache = BuildCache(str(tmp_path / 'build_cache.json'), str(raw_dir))
+    _, stage_fingerprints, changed_games = get_fingerprints(build_cache, raw_dir, stage_order)
+    assert list(changed_games['shots']) == [game_id]
+    assert changed_games['shots'][game_id]['game_type'] == 1
+
+    # stages processing games are run incrementally unless they depend upon a
+    # season-wide stage that is run, stages not processing games are skipped
+    build_plan = get_build_plan(stage_order, build_cache, stage_fingerprints, changed_games)
+    assert build_plan == {
+        'games': False, 'shots': False, 'league_stats': False, 'player_game_stats': False,
+        'team_game_stats': False, 'goalie_game_stats': True, 'aggregated_stats': True, 'streaks': False,
+        'game_scores': True, 'export': True}
+
+
+def test_file_digests_reused(tmp_path):
+    raw_dir = setup_season(tmp_path)
+    build_cache = BuildCache(str(tmp_path / 'build_cache.json'), str(raw_dir))
+    shots_path = str(raw_dir / 'shots' / '2020' / '1' / '20000001.json')
+    digest = build_cache.get_raw_data_digest(shots_path)
+    build_cache.save()
+
+    # registered digest is used as long as the file hasn't been modified
+    build_cache = BuildCache(str(tmp_path / 'build_cache.json'), str(raw_dir))
+    build_cache.files[shots_path][2] = 'registered'
+    assert build_cache.get_raw_data_digest(shots_path) == 'registered'
+    os.utime(shots_path, (0, 0))
+    assert build_cache.get_raw_data_digest(shots_path) == digest
+
+
+def test_changed_game_matches_full_rebuild(tmp_path):
+    config_path = setup_config(tmp_path)
+    run_script(config_path, 'synthetic_season.py', '-t', str(tmp_path / 'raw'), '-s', '2020', '--teams', '2')
+    run_script(config_path, 'run_pipeline.py', '-s', '2020', '--build_cache')
+
+    # removing a saved shot from a single game, affecting league-wide save
+    # percentages used for goalie stats of all games
+    game_id = 20000001
+    shots_path = str(tmp_path / 'raw' / 'shots' / '2020' / '1' / ("%d.json" % game_id))
+    shots = json.loads(open(shots_path).read())
+    saved_shots = [shot for shot in shots['match']['shots'] if shot['match_shot_resutl_id'] == 1]
+    shots['match']['shots'].remove(saved_shots[0])
+    open(shots_path, 'w').write(json.dumps(shots))
+    run_script(config_path, 'run_pipeline.py', '-s', '2020', '--build_cache')
+    goalie_game_stats = json.loads(open(str(tmp_path / 'proc' / '2020' / 'del_goalie_game_stats.json')).read())
+
+    # re-creating all data from scratch
+    full_config_path = setup_config(tmp_path / 'full', tmp_path / 'raw')
+    run_script(full_config_path, 'run_pipeline.py', '-s', '2020', '--initial', '-f', '2020-06-01', '-t', '2021-05-31')
+    full_goalie_game_stats = json.loads(
+        open(str(tmp_path / 'full' / 'proc' / '2020' / 'del_goalie_game_stats.json')).read())
+
+    assert [stat_line for stat_line in goalie_game_stats if stat_line['game_id'] != game_id]
+    assert goalie_game_stats == full_goalie_game_stats
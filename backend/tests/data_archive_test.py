@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+import data_archive  # noqa: E402
+from data_archive import get_pack_paths, get_raw_data_paths, load_raw_data, raw_data_exists  # noqa: E402
+from data_archive import pack_raw_data  # noqa: E402
+
+
+def write_raw_data(base_data_dir, game_type, game_id, data):
+    tgt_path = os.path.join(str(base_data_dir), 'shots', '2020', str(game_type), "%d.json" % game_id)
+    if not os.path.isdir(os.path.dirname(tgt_path)):
+        os.makedirs(os.path.dirname(tgt_path))
+    open(tgt_path, 'w').write(json.dumps(data, indent=2))
+    return tgt_path
+
+
+def test_pack_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_archive, 'OPEN_PACKS', dict())
+    src_paths = [write_raw_data(tmp_path, game_type, game_id, {'game_id': game_id}) for game_type, game_id in [
+        (1, 1), (1, 2), (3, 3)]]
+
+    assert pack_raw_data(str(tmp_path), 'shots', 2020, remove_files=True) == 3
+    for src_path in src_paths:
+        assert not os.path.isfile(src_path)
+        assert raw_data_exists(src_path, str(tmp_path))
+    assert get_raw_data_paths(str(tmp_path), 'shots', 2020) == src_paths
+    assert load_raw_data(src_paths[2], str(tmp_path)) == {'game_id': 3}
+    assert not raw_data_exists(src_paths[0].replace('1.json', '4.json'), str(tmp_path))
+
+
+def test_repack(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_archive, 'OPEN_PACKS', dict())
+    first_path = write_raw_data(tmp_path, 1, 1, {'game_id': 1})
+    pack_raw_data(str(tmp_path), 'shots', 2020, remove_files=True)
+
+    # packed data no longer available as original file is retained
+    second_path = write_raw_data(tmp_path, 1, 2, {'game_id': 2})
+    assert pack_raw_data(str(tmp_path), 'shots', 2020) == 2
+    assert load_raw_data(first_path, str(tmp_path)) == {'game_id': 1}
+    assert load_raw_data(second_path, str(tmp_path)) == {'game_id': 2}
+
+    # original file updated after packing is preferred
+    write_raw_data(tmp_path, 1, 2, {'game_id': 2, 'updated': True})
+    pack_path, _ = get_pack_paths(str(tmp_path), 'shots', 2020)
+    os.utime(second_path, (os.path.getmtime(pack_path) + 1, os.path.getmtime(pack_path) + 1))
+    assert load_raw_data(second_path, str(tmp_path)) == {'game_id': 2, 'updated': True}
+
+
+def test_pack_with_separate_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_archive, 'OPEN_PACKS', dict())
+    src_path = os.path.join(str(tmp_path), 'shots', '2020', '1', '1.json')
+
+    # setting up pack without index of its own as created previously
+    pack_path, index_path = get_pack_paths(str(tmp_path), 'shots', 2020)
+    os.makedirs(os.path.dirname(pack_path))
+    record = zlib.compress(json.dumps({'game_id': 1}).encode('utf-8'))
+    open(pack_path, 'wb').write(record)
+    open(index_path, 'w').write(json.dumps({'1/1.json': [0, len(record)]}))
+    assert load_raw_data(src_path, str(tmp_path)) == {'game_id': 1}
+
+    # separate index is removed when re-packing
+    write_raw_data(tmp_path, 1, 2, {'game_id': 2})
+    assert pack_raw_data(str(tmp_path), 'shots', 2020, remove_files=True) == 2
+    assert not os.path.isfile(index_path)
+    assert load_raw_data(src_path, str(tmp_path)) == {'game_id': 1}
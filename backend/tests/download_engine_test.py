@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+import download_engine  # noqa: E402
+from download_engine import TokenBucket, AdaptiveLimiter  # noqa: E402
+
+
+class Clock():
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_rate():
+    async def acquire_all(token_bucket, cnt):
+        start = time.monotonic()
+        for _ in range(cnt):
+            await token_bucket.acquire()
+        return time.monotonic() - start
+
+    # a burst up to the capacity is allowed right away, further requests are
+    # limited to the specified rate
+    assert asyncio.run(acquire_all(TokenBucket(50, 5), 5)) < 0.1
+    assert asyncio.run(acquire_all(TokenBucket(50, 5), 15)) >= 0.18
+
+
+def test_adaptive_limit_increase(monkeypatch):
+    monkeypatch.setattr(download_engine.time, 'monotonic', Clock())
+    limiter = AdaptiveLimiter(10, initial_limit=2)
+    for _ in range(2):
+        limiter.update_limit(200, 0.1)
+    assert limiter.limit == 3
+    # windows dominated by unmodified data allow for a faster increase
+    for _ in range(3):
+        limiter.update_limit(304, 0.1)
+    assert limiter.limit == 5
+    for _ in range(100):
+        limiter.update_limit(304, 0.1)
+    assert limiter.limit == 10
+
+
+def test_adaptive_limit_decrease(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(download_engine.time, 'monotonic', clock)
+    limiter = AdaptiveLimiter(10, initial_limit=8)
+    limiter.update_limit(200, 0.1)
+    limiter.update_limit(503, 0.1)
+    assert limiter.limit == 4
+    # limit is decreased at most once per round trip
+    limiter.update_limit(None, 0.1)
+    assert limiter.limit == 4
+    clock.now += 1
+    limiter.update_limit(429, 0.1)
+    assert limiter.limit == 2
+    assert limiter.errors == 3
+
+
+def test_latency_baseline_window(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(download_engine.time, 'monotonic', clock)
+    limiter = AdaptiveLimiter(10, initial_limit=8, baseline_window=30)
+    limiter.update_limit(200, 0.1)
+    assert limiter.best_latency == 0.1
+
+    # rising latency is regarded as congestion while the best latency is
+    # within the baseline window
+    for _ in range(5):
+        clock.now += 1
+        limiter.update_limit(200, 1.0)
+    assert limiter.decreases > 0
+    assert limiter.best_latency == 0.1
+
+    # the baseline follows the latency once the best latency has expired
+    for _ in range(40):
+        clock.now += 1
+        limiter.update_limit(200, 1.0)
+    assert limiter.best_latency > 0.5
+    decreases = limiter.decreases
+    for _ in range(20):
+        clock.now += 1
+        limiter.update_limit(200, 1.0)
+    assert limiter.decreases == decreases
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from download_engine import DownloadTask, DownloadResult  # noqa: E402
+from download_journal import DownloadJournal  # noqa: E402
+from download_manifest import get_changed_games  # noqa: E402
+
+
+def get_result(url, status, last_modified=None):
+    return DownloadResult(url, url, url, 'shots', status, last_modified)
+
+
+def interrupt_run(tmp_path, results, name='game_data'):
+    # running downloads without closing the journal, i.e. as if the run has
+    # been killed
+    journal = DownloadJournal(str(tmp_path), dict(), name).open()
+    for result in results:
+        journal.record(result)
+    journal.journal_file.close()
+
+
+def test_resume_completed_downloads(tmp_path):
+    interrupt_run(tmp_path, [
+        get_result('a', 200, 'Mon, 01 Feb 2021'), get_result('b', 304), get_result('c', 404),
+        get_result('d', 500), get_result('e', None), get_result('f', 429)])
+
+    last_modified_dict = dict()
+    journal = DownloadJournal(str(tmp_path), last_modified_dict, 'game_data').open(resume=True)
+    assert journal.completed_urls == {'a', 'b', 'c'}
+    assert journal.is_completed(DownloadTask('a', None, 'a', 'shots'))
+    assert not journal.is_completed(DownloadTask('d', None, 'd', 'shots'))
+    assert last_modified_dict == {'a': 'Mon, 01 Feb 2021'}
+
+
+def test_new_run_merges_timestamps(tmp_path):
+    interrupt_run(tmp_path, [get_result('a', 200, 'Mon, 01 Feb 2021'), get_result('b', 200)])
+
+    last_modified_dict = dict()
+    journal = DownloadJournal(str(tmp_path), last_modified_dict, 'game_data').open()
+    # completed downloads are only retained when resuming
+    assert journal.completed_urls == set()
+    assert last_modified_dict == {'a': 'Mon, 01 Feb 2021'}
+    assert json.loads(open(str(tmp_path / 'last_modified.json')).read()) == {'a': 'Mon, 01 Feb 2021'}
+
+
+def test_resume_after_compaction(tmp_path):
+    journal = DownloadJournal(str(tmp_path), dict(), 'game_data', compact_every=2).open()
+    for url in 'abc':
+        journal.record(get_result(url, 200))
+    journal.record(get_result('d', 500))
+    journal.journal_file.close()
+
+    journal = DownloadJournal(str(tmp_path), dict(), 'game_data').open(resume=True)
+    assert journal.completed_urls == {'a', 'b', 'c'}
+
+
+def test_partially_written_entry(tmp_path):
+    interrupt_run(tmp_path, [get_result('a', 200)])
+    with open(str(tmp_path / 'download_journal_game_data.jsonl'), 'a') as journal_file:
+        journal_file.write('{"url": "b", "sta')
+
+    journal = DownloadJournal(str(tmp_path), dict(), 'game_data').open(resume=True)
+    assert journal.completed_urls == {'a'}
+
+
+def test_close_removes_journal(tmp_path):
+    journal = DownloadJournal(str(tmp_path), dict(), 'game_data').open()
+    journal.record(get_result('a', 200, 'Mon, 01 Feb 2021'))
+    journal.close()
+
+    assert not os.path.isfile(journal.journal_path)
+    assert json.loads(open(journal.last_modified_path).read()) == {'a': 'Mon, 01 Feb 2021'}
+
+
+def test_separate_journals(tmp_path):
+    game_journal = DownloadJournal(str(tmp_path), dict(), 'game_data').open()
+    team_journal = DownloadJournal(str(tmp_path), dict(), 'team_data').open()
+    game_journal.record(get_result('a', 200, 'Mon, 01 Feb 2021'))
+    team_journal.record(get_result('b', 200, 'Tue, 02 Feb 2021'))
+    game_journal.close()
+    team_journal.close()
+
+    # timestamps persisted by either journal are retained
+    assert json.loads(open(str(tmp_path / 'last_modified.json')).read()) == {
+        'a': 'Mon, 01 Feb 2021', 'b': 'Tue, 02 Feb 2021'}
+
+
+def test_changed_downloads_retained(tmp_path):
+    shots_path = os.path.join('shots', '2020', '1', '20000001.json')
+    interrupt_run(tmp_path, [
+        DownloadResult('a', 'a', shots_path, 'shots', 200, None),
+        DownloadResult('b', 'b', os.path.join('shots', '2020', '1', '20000002.json'), 'shots', 304, None)])
+
+    # changed downloads of the interrupted run are retained when resuming
+    # (after compaction) as well as in a new run
+    journal = DownloadJournal(str(tmp_path), dict(), 'game_data', compact_every=1).open(resume=True)
+    journal.record(DownloadResult('c', 'c', os.path.join('shots', '2020', '1', '20000003.json'), 'shots', 200, None))
+    journal.journal_file.close()
+    journal = DownloadJournal(str(tmp_path), dict(), 'game_data').open()
+    assert journal.completed_urls == set()
+    assert get_changed_games(journal.get_changed_results()) == {
+        20000001: {'season': 2020, 'game_type': 1, 'categories': ['shots']},
+        20000003: {'season': 2020, 'game_type': 1, 'categories': ['shots']}}
+
+    # changed downloads are discarded once the journal has been closed
+    journal.close()
+    assert DownloadJournal(str(tmp_path), dict(), 'game_data').open().get_changed_results() == list()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from download_engine import DownloadResult  # noqa: E402
+from download_manifest import get_changed_games, save_manifest, load_changed_games  # noqa: E402
+from download_manifest import replace_game_entries, MANIFEST_DIR, MANIFEST_TIMESTAMP_FORMAT  # noqa: E402
+
+
+def get_result(tgt_path, category, status=200):
+    return DownloadResult(tgt_path, tgt_path, tgt_path, category, status, None)
+
+
+def test_changed_games():
+    changed_games = get_changed_games([
+        get_result(os.path.join('shots', '2020', '1', '20000001.json'), 'shots'),
+        get_result(os.path.join('game_team_stats', '2020', '1', '20000001_1.json'), 'game_team_stats'),
+        get_result(os.path.join('game_team_stats', '2020', '1', '20000001_2.json'), 'game_team_stats'),
+        get_result(os.path.join('shots', '2020', '3', '20000002.json'), 'shots', 304),
+    ])
+    assert changed_games == {
+        20000001: {'season': 2020, 'game_type': 1, 'categories': ['shots', 'game_team_stats']}}
+
+
+def test_load_changed_games(tmp_path):
+    manifest_dir = tmp_path / MANIFEST_DIR
+    os.makedirs(str(manifest_dir))
+    for timestamp, changed_games in [
+        (datetime(2021, 2, 1, 10), {1: {'season': 2020, 'game_type': 1, 'categories': ['shots']}}),
+        (datetime(2021, 2, 2, 10), {
+            1: {'season': 2020, 'game_type': 1, 'categories': ['shots', 'shifts']},
+            2: {'season': 2019, 'game_type': 1, 'categories': ['shots']}}),
+        (datetime(2021, 2, 3, 10), {3: {'season': 2020, 'game_type': 3, 'categories': ['game_info']}}),
+    ]:
+        manifest_path = str(manifest_dir / ("%s.json" % timestamp.strftime(MANIFEST_TIMESTAMP_FORMAT)))
+        save_manifest(manifest_path, changed_games, timestamp)
+
+    assert load_changed_games(str(tmp_path), changed_since='2021-02-02', season=2020) == {
+        1: {'season': 2020, 'game_type': 1, 'categories': ['shots', 'shifts']},
+        3: {'season': 2020, 'game_type': 3, 'categories': ['game_info']}}
+    assert list(load_changed_games(str(tmp_path), [manifest_path], '2021-02-02 12:00')) == [3]
+    assert load_changed_games(str(tmp_path)) == dict()
+
+
+def test_replace_game_entries():
+    entries = [
+        {'game_id': 1, 'value': 'a'}, {'game_id': 2, 'value': 'b'}, {'game_id': 1, 'value': 'c'},
+        {'game_id': 3, 'value': 'd'}]
+    new_entries = {1: [{'game_id': 1, 'value': 'e'}], 3: list(), 4: [{'game_id': 4, 'value': 'f'}]}
+
+    # entries are replaced in place
+    assert replace_game_entries(entries, new_entries) is entries
+    assert entries == [{'game_id': 1, 'value': 'e'}, {'game_id': 2, 'value': 'b'}, {'game_id': 4, 'value': 'f'}]
+    assert replace_game_entries(entries, dict()) == entries
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+import sqlite_store  # noqa: E402
+import pipeline_data  # noqa: E402
+from export_store import export_table  # noqa: E402
+from pipeline_data import write_json, write_held_data  # noqa: E402
+from shot_table import ShotTable, load_shot_table, save_shot_table  # noqa: E402
+
+SHOTS = [{'game_id': 1, 'team': 'ING', 'goalie': 201}, {'game_id': 2, 'team': 'MAN', 'goalie': None}]
+
+
+def setup_store(monkeypatch):
+    monkeypatch.setattr(sqlite_store, 'CONFIG', {'sqlite_store': True})
+    monkeypatch.setattr(sqlite_store, 'OPEN_STORES', dict())
+
+
+def close_stores():
+    for store in sqlite_store.OPEN_STORES.values():
+        store.close()
+
+
+def test_export_indent(tmp_path, monkeypatch):
+    setup_store(monkeypatch)
+    write_json(str(tmp_path / 'del_shots.json'), [1612137600.0, SHOTS], indent=None)
+    write_json(str(tmp_path / 'del_games.json'), SHOTS)
+
+    assert export_table(str(tmp_path), 'shots')
+    assert open(str(tmp_path / 'del_shots.json')).read() == json.dumps([1612137600.0, SHOTS])
+    assert export_table(str(tmp_path), 'games')
+    assert open(str(tmp_path / 'del_games.json')).read() == json.dumps(SHOTS, indent=2)
+    assert not export_table(str(tmp_path), 'player_games')
+    close_stores()
+
+
+def test_export_held_indent(tmp_path, monkeypatch):
+    setup_store(monkeypatch)
+    monkeypatch.setattr(pipeline_data, 'HOLD_DATA', True)
+    write_json(str(tmp_path / 'del_shots.json'), SHOTS, indent=None)
+
+    assert export_table(str(tmp_path), 'shots')
+    assert open(str(tmp_path / 'del_shots.json')).read() == json.dumps(SHOTS)
+    monkeypatch.setattr(pipeline_data, 'HOLD_DATA', False)
+    write_held_data()
+    close_stores()
+
+
+def test_shot_table_after_export(tmp_path, monkeypatch):
+    setup_store(monkeypatch)
+    write_json(str(tmp_path / 'del_shots.json'), SHOTS)
+    save_shot_table(str(tmp_path), SHOTS)
+
+    # shot table is still used after exporting shot data from the store
+    monkeypatch.setattr(ShotTable, 'from_records', None)
+    export_table(str(tmp_path), 'shots')
+    assert load_shot_table(str(tmp_path)).to_records() == SHOTS
+    close_stores()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from game_store import GameStore, open_game_store, load_games, GAME_STORE_TGT, GAME_EXPORT_TGT  # noqa: E402
+
+
+def get_game(game_id, date, **attrs):
+    return {'game_id': game_id, 'date': date, **attrs}
+
+
+def test_date_index():
+    game_store = GameStore()
+    for game in [
+        get_game(3, '2021-01-02'), get_game(1, '2021-01-01'), get_game(2, '2021-01-01'), get_game(4, '2021-01-05')
+    ]:
+        game_store.put(game)
+
+    assert [game['game_id'] for game in game_store.get_games_for_date('2021-01-01')] == [1, 2]
+    assert [game['game_id'] for game in game_store.get_games_between('2021-01-01', '2021-01-04')] == [1, 2, 3]
+    assert game_store.get_games_for_date('2021-01-03') == list()
+
+    # updated game is moved to its new date, order of first insertion is retained
+    game_store.put(get_game(3, '2021-01-05'))
+    assert [game['game_id'] for game in game_store.get_games_for_date('2021-01-05')] == [3, 4]
+    assert [game['game_id'] for game in game_store] == [3, 1, 2, 4]
+
+
+def test_persisted_store(tmp_path):
+    store_path = str(tmp_path / GAME_STORE_TGT)
+    game_store = GameStore(store_path)
+    game_store.put(get_game(1, '2021-01-01'))
+    game_store.put(get_game(2, '2021-01-02'))
+    game_store.put(get_game(1, '2021-01-01', home_score=3))
+    game_store.close()
+    # appending partially written record as left behind by a killed run
+    open(store_path, 'a').write('{"game_id": 3, "da')
+
+    game_store = GameStore(store_path)
+    assert len(game_store) == 2
+    assert game_store.get(1)['home_score'] == 3
+    assert 3 not in game_store
+
+    game_store.compact(force=True)
+    assert len(open(store_path).readlines()) == 2
+    assert [game['game_id'] for game in GameStore(store_path)] == [1, 2]
+
+
+def test_open_store_from_export(tmp_path):
+    games = [get_game(1, '2021-01-01'), get_game(2, '2021-01-02')]
+    open(str(tmp_path / GAME_EXPORT_TGT), 'w').write(json.dumps(games))
+
+    game_store = open_game_store(str(tmp_path))
+    game_store.put(get_game(3, '2021-01-03'))
+    game_store.close()
+    assert [game['game_id'] for game in load_games(str(tmp_path))] == [1, 2, 3]
+
+    game_store = open_game_store(str(tmp_path), initial=True)
+    assert len(game_store) == 0
+    assert not os.path.isfile(str(tmp_path / GAME_STORE_TGT))
+
+    game_store.put(get_game(4, '2021-01-04'))
+    game_store.export(str(tmp_path / GAME_EXPORT_TGT))
+    game_store.close()
+    assert json.loads(open(str(tmp_path / GAME_EXPORT_TGT)).read()) == [get_game(4, '2021-01-04')]
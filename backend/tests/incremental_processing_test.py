@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import yaml
+import subprocess
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+
+CONFIG = yaml.safe_load(open(os.path.join(BACKEND_DIR, 'config.yml')))
+
+# running a script with a configuration loaded from the first command line
+# argument instead of the one in the backend directory
+BOOTSTRAP = """
+import sys
+import yaml
+import runpy
+
+config = yaml.safe_load(open(sys.argv[1]))
+safe_load = yaml.safe_load
+
+
+def load_config(stream):
+    if getattr(stream, 'name', '').endswith('config.yml'):
+        return config
+    return safe_load(stream)
+
+
+yaml.safe_load = load_config
+sys.argv = sys.argv[2:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+
+def run_script(config_path, script, *args):
+    subprocess.run(
+        [sys.executable, '-c', BOOTSTRAP, config_path, os.path.join(BACKEND_DIR, script)] + list(args),
+        cwd=BACKEND_DIR, check=True, stdout=subprocess.DEVNULL)
+
+
+def setup_config(tmp_path, raw_dir=None):
+    os.makedirs(str(tmp_path / 'proc' / '2020'))
+    config = dict(CONFIG)
+    config['base_data_dir'] = config['tgt_base_dir'] = str(raw_dir or tmp_path / 'raw')
+    config['tgt_processing_dir'] = str(tmp_path / 'proc')
+    config_path = str(tmp_path / 'config.yml')
+    open(config_path, 'w').write(yaml.safe_dump(config))
+    return config_path
+
+
+def load_processed_data(tmp_path, file_name):
+    return json.loads(open(str(tmp_path / 'proc' / '2020' / file_name)).read())
+
+
+def test_incremental_shots_full_team_stats(tmp_path):
+    config_path = setup_config(tmp_path)
+    run_script(config_path, 'synthetic_season.py', '-t', str(tmp_path / 'raw'), '-s', '2020', '--teams', '2')
+
+    # initial pass for the first part of the season
+    run_script(
+        config_path, 'run_pipeline.py', '-s', '2020', '--initial', '-f', '2020-09-01', '-t', '2021-01-31',
+        'games', 'players', 'shots')
+    first_game_ids = [game['game_id'] for game in load_processed_data(tmp_path, 'del_games.json')]
+    assert first_game_ids
+
+    # incremental pass for the remainder of the season
+    run_script(config_path, 'run_pipeline.py', '-s', '2020', '-f', '2021-02-01', '-t', '2021-05-31', 'games', 'shots')
+    game_ids = [game['game_id'] for game in load_processed_data(tmp_path, 'del_games.json')]
+    assert len(game_ids) > len(first_game_ids)
+
+    # power play situations and goals are retained for games of the initial pass
+    pp_situations_goals = load_processed_data(tmp_path, 'del_pp_sits_goals.json')
+    assert sorted(pp_situations_goals) == sorted(str(game_id) for game_id in game_ids)
+
+    # full pass of team game stats depending on power play situations of all games
+    run_script(config_path, 'run_pipeline.py', '-s', '2020', '--initial', 'team_game_stats')
+    _, team_game_stats = load_processed_data(tmp_path, 'del_team_game_stats.json')
+    assert sorted(stat_line['game_id'] for stat_line in team_game_stats) == sorted(game_ids * 2)
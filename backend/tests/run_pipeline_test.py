@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+import run_pipeline  # noqa: E402
+from pipeline_data import write_json, write_file  # noqa: E402
+
+
+def fail_stage(stage, stage_args):
+    if stage is run_pipeline.STAGES['shots']:
+        raise RuntimeError('stage failed')
+
+
+def fail_writing():
+    raise IOError('writing failed')
+
+
+def test_completed_stages_written(monkeypatch):
+    monkeypatch.setattr(run_pipeline, 'run_stage', fail_stage)
+    monkeypatch.setattr(run_pipeline, 'write_held_data', lambda: list())
+    timings = list()
+    written_stages = list()
+    with pytest.raises(RuntimeError):
+        run_pipeline.run_pipeline([('games', []), ('players', []), ('shots', [])], timings, written_stages)
+    assert written_stages == ['games', 'players']
+    assert [stage_name for stage_name, _ in timings] == ['games', 'players', '(writing 0 files)']
+
+
+def test_no_stages_written_if_writing_fails(monkeypatch):
+    monkeypatch.setattr(run_pipeline, 'run_stage', lambda stage, stage_args: None)
+    monkeypatch.setattr(run_pipeline, 'write_held_data', fail_writing)
+    written_stages = list()
+    with pytest.raises(IOError):
+        run_pipeline.run_pipeline([('games', []), ('players', [])], list(), written_stages)
+    assert written_stages == list()
+
+
+def test_failed_stage_data_discarded(tmp_path, monkeypatch):
+    def write_and_fail(stage, stage_args):
+        if stage is run_pipeline.STAGES['games']:
+            write_json(str(tmp_path / 'games.json'), ['games'])
+            return
+        # failing after data of an earlier stage has been overwritten
+        write_json(str(tmp_path / 'games.json'), ['shots'])
+        write_json(str(tmp_path / 'shots.json'), ['shots'])
+        write_file(str(tmp_path / 'shots.npz'), lambda tgt_path: open(tgt_path, 'w').write('shots'))
+        raise RuntimeError('stage failed')
+
+    monkeypatch.setattr(run_pipeline, 'run_stage', write_and_fail)
+    written_stages = list()
+    with pytest.raises(RuntimeError):
+        run_pipeline.run_pipeline([('games', []), ('shots', [])], list(), written_stages)
+    assert written_stages == ['games']
+    assert json.loads(open(str(tmp_path / 'games.json')).read()) == ['games']
+    assert sorted(os.listdir(str(tmp_path))) == ['games.json']
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from schedule_index import load_schedule_index, get_schedule_index_path, get_game, get_games  # noqa: E402
+from schedule_index import get_games_by_date, normalize_round  # noqa: E402
+
+
+def get_match(game_id, home_id, road_id, start_date, status='AFTER_MATCH', round='1'):
+    return {
+        'id': game_id, 'home': {'id': home_id}, 'guest': {'id': road_id},
+        'start_date': start_date, 'status': status, 'round': round}
+
+
+def write_schedule(schedule_dir, season, game_type, team_id, matches, mtime=None):
+    tgt_path = os.path.join(str(schedule_dir), str(season), str(game_type), "%d.json" % team_id)
+    if not os.path.isdir(os.path.dirname(tgt_path)):
+        os.makedirs(os.path.dirname(tgt_path))
+    open(tgt_path, 'w').write(json.dumps({'matches': matches}))
+    if mtime is not None:
+        os.utime(tgt_path, (mtime, mtime))
+
+
+def setup_schedules(schedule_dir):
+    write_schedule(schedule_dir, 2020, 1, 1, [
+        get_match(12, 1, 2, '2020-12-17 19:30:00'),
+        get_match(11, 3, 1, '2020-12-17 17:00:00'),
+        get_match(15, 1, 3, '2020-12-20 14:00:00', 'BEFORE_MATCH')], 1)
+    write_schedule(schedule_dir, 2020, 1, 2, [
+        get_match(12, 1, 2, '2020-12-17 19:30:00'),
+        get_match(10, 2, 3, '2020-12-17 20:30:00')], 1)
+    write_schedule(schedule_dir, 2020, 3, 1, [
+        get_match(20, 1, 2, '2021-04-20 19:30:00', round='Finale 1')], 1)
+
+
+def test_schedule_order(tmp_path):
+    setup_schedules(tmp_path / 'schedules')
+    index = load_schedule_index(str(tmp_path / 'schedules'))
+
+    # games retain their order in the full schedule, i.e. by game type, team
+    # and position in team schedule
+    assert [game['game_id'] for game in get_games(index, 2020)] == [12, 11, 15, 10, 20]
+    assert [game['game_id'] for game in get_games(index, 2020, 1, 2)] == [12, 10]
+    assert [game['game_id'] for game in get_games(index, 2020, status='BEFORE_MATCH')] == [15]
+    assert get_game(index, 20)['round'] == 'finals_1'
+
+
+def test_games_by_date(tmp_path):
+    setup_schedules(tmp_path / 'schedules')
+    index = load_schedule_index(str(tmp_path / 'schedules'))
+
+    games_by_date = get_games_by_date(index, ['AFTER_MATCH'])
+    assert {date: [game['game_id'] for game in games] for date, games in games_by_date.items()} == {
+        datetime.date(2020, 12, 17): [12, 11, 10], datetime.date(2021, 4, 20): [20]}
+
+
+def test_updated_schedules(tmp_path):
+    setup_schedules(tmp_path / 'schedules')
+    load_schedule_index(str(tmp_path / 'schedules'))
+
+    # updating a team schedule and removing another one
+    write_schedule(tmp_path / 'schedules', 2020, 1, 2, [
+        get_match(12, 1, 2, '2020-12-17 19:30:00'),
+        get_match(16, 2, 1, '2020-12-22 19:30:00')], 2)
+    os.remove(str(tmp_path / 'schedules' / '2020' / '3' / '1.json'))
+
+    index = load_schedule_index(str(tmp_path / 'schedules'))
+    assert [game['game_id'] for game in get_games(index, 2020)] == [12, 11, 15, 16]
+    assert json.loads(open(get_schedule_index_path(str(tmp_path / 'schedules'))).read()) == index
+
+
+def test_index_without_positions(tmp_path):
+    setup_schedules(tmp_path / 'schedules')
+    index = load_schedule_index(str(tmp_path / 'schedules'))
+
+    # reverting index to the form persisted without schedule positions
+    for game in index['games'].values():
+        del game['position']
+    index['games'] = dict(sorted(index['games'].items()))
+    open(get_schedule_index_path(str(tmp_path / 'schedules')), 'w').write(json.dumps(index))
+
+    index = load_schedule_index(str(tmp_path / 'schedules'))
+    assert [game['game_id'] for game in get_games(index, 2020)] == [12, 11, 15, 10, 20]
+
+
+def test_normalize_round():
+    assert normalize_round('12') == '12'
+    assert normalize_round('Viertelfinale 3') == 'quarter_finals_3'
+    assert normalize_round('Halbfinale 1') == 'semi_finals_1'
+    assert normalize_round('Finale') == 'rnd_type_1'
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from shot_table import ShotTable  # noqa: E402
+
+SHOTS = [
+    {'game_id': 1, 'team': 'ING', 'player_id': 101, 'distance': 7.5, 'scored': True,
+     'plrs_on_ice': [101, 102, 103], 'shot_zone': 'slot', 'goalie': 201},
+    {'game_id': 1, 'team': 'MAN', 'player_id': 201, 'distance': 12.0, 'scored': False,
+     'plrs_on_ice': [201, 202], 'shot_zone': 'left', 'goalie': None},
+    {'game_id': 2, 'team': 'ING', 'player_id': 102, 'distance': 20.25, 'scored': False,
+     'shot_zone': 'blue_line', 'goalie': 301, 'situation': '5v4'},
+    {'game_id': 2, 'team': 'ING', 'player_id': 101, 'distance': 3.0, 'scored': True,
+     'plrs_on_ice': [], 'shot_zone': 'slot', 'goalie': 301},
+]
+
+
+def test_records_round_trip():
+    shot_table = ShotTable.from_records(SHOTS)
+    assert len(shot_table) == 4
+    assert [shot_table.columns[field][0] for field in ['game_id', 'distance', 'scored', 'plrs_on_ice', 'team']] == [
+        'int', 'float', 'bool', 'list', 'dict']
+    assert shot_table.to_records() == SHOTS
+
+
+def test_save_load(tmp_path):
+    ShotTable.from_records(SHOTS).save(str(tmp_path / 'shots.npz'))
+    shot_table = ShotTable.load(str(tmp_path / 'shots.npz'))
+    assert shot_table.to_records() == SHOTS
+    assert shot_table.column('situation').tolist() == [None, None, '5v4', None]
+
+
+def test_lookups():
+    shot_table = ShotTable.from_records(SHOTS)
+    assert shot_table.equals('team', 'ING').tolist() == [True, False, True, True]
+    assert shot_table.equals('goalie', None).tolist() == [False, True, False, False]
+    assert shot_table.equals('unknown', 1).tolist() == [False] * 4
+    assert shot_table.isin('shot_zone', ['left', 'blue_line']).tolist() == [False, True, True, False]
+    assert shot_table.contains('plrs_on_ice', 102).tolist() == [True, False, False, False]
+    assert shot_table.find(team='ING', scored=True) == [SHOTS[0], SHOTS[3]]
+
+    groups, group_index = shot_table.group_by('game_id', 'team')
+    assert groups == [(1, 'ING'), (1, 'MAN'), (2, 'ING')]
+    assert group_index.tolist() == [0, 1, 2, 2]
+
+
+def test_select():
+    shot_table = ShotTable.from_records(SHOTS)
+    assert shot_table.select([3, 1]).to_records() == [SHOTS[3], SHOTS[1]]
+    assert shot_table.select(shot_table.equals('game_id', 2)).to_records() == SHOTS[2:]
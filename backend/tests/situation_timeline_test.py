@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from situation_timeline import SituationInterval, SituationTimeline  # noqa: E402
+from situation_cache import Situation, encode_situation, decode_situation  # noqa: E402
+from reconstruct_skater_situation import GoalieShift  # noqa: E402
+
+GAME = {'home_abbr': 'ING', 'road_abbr': 'MAN'}
+
+SITUATION_INTERVALS = [
+    SituationInterval(0, 99, 5, 5, 101, 201),
+    SituationInterval(100, 219, 5, 4, 101, 201),
+    SituationInterval(220, 229, 5, 5, 101, 201),
+    SituationInterval(230, 259, 5, 6, 101, None),
+    SituationInterval(260, 3600, 5, 5, 102, 201),
+]
+
+
+def test_intervals_round_trip():
+    timeline = SituationTimeline.from_intervals(SITUATION_INTERVALS, GAME)
+    assert len(timeline) == 3601
+    assert timeline.end == 3600
+    assert timeline.to_intervals() == SITUATION_INTERVALS
+
+
+def test_situation_at_time():
+    timeline = SituationTimeline.from_intervals(SITUATION_INTERVALS, GAME)
+    assert timeline[100] == {
+        'home': 5, 'road': 4, 'home_goalie': 101, 'road_goalie': 201, 'ING': 5, 'MAN': 4}
+    assert timeline[230]['road_goalie'] is None
+    assert 3600 in timeline and 3601 not in timeline
+    with pytest.raises(KeyError):
+        timeline[3601]
+
+
+def test_slice_round_trip():
+    timeline = SituationTimeline.from_intervals(SITUATION_INTERVALS, GAME)
+    sliced = timeline[150:240]
+    assert (sliced.start, sliced.end) == (150, 239)
+    assert sliced.to_intervals() == [
+        SituationInterval(150, 219, 5, 4, 101, 201),
+        SituationInterval(220, 229, 5, 5, 101, 201),
+        SituationInterval(230, 239, 5, 6, 101, None),
+    ]
+    assert SituationTimeline.from_intervals(sliced.to_intervals(), GAME)[200] == timeline[200]
+    # slicing beyond the covered times
+    assert len(timeline[3500:4000]) == 101
+    assert len(timeline[4000:]) == 0 and timeline[4000:].to_intervals() == list()
+
+
+def test_empty_timeline():
+    timeline = SituationTimeline.from_intervals(list(), GAME)
+    assert len(timeline) == 0
+    assert timeline.to_intervals() == list()
+
+
+def test_cached_situation_round_trip():
+    situation = Situation(
+        SITUATION_INTERVALS, {1250: 1, 3100: -1},
+        [GoalieShift(101, 'ING', 'home', 0, 259), GoalieShift(102, 'ING', 'home', 260, 3600)],
+        3600, [(1300, 'Implausible skater count')])
+
+    # decoding situation from JSON as it is read from the cache
+    decoded = decode_situation(json.loads(encode_situation('key', situation)))
+    assert decoded == situation
+    assert SituationTimeline.from_intervals(decoded.situation_intervals, GAME).to_intervals() == SITUATION_INTERVALS
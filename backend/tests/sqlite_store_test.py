@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+import sqlite3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+import sqlite_store  # noqa: E402
+from sqlite_store import SQLiteStore, store_json, load_stored_json, is_stored, open_store_table  # noqa: E402
+
+PLAYER_GAMES = [
+    {'game_id': 1, 'player_id': 101, 'team': 'ING', 'season_type': 'RS', 'game_date': '2021-01-01', 'goals': 1},
+    {'game_id': 1, 'player_id': 201, 'team': 'MAN', 'season_type': 'RS', 'game_date': '2021-01-01', 'goals': 0},
+    {'game_id': 2, 'player_id': 101, 'team': 'ING', 'season_type': 'RS', 'game_date': '2021-01-03', 'goals': 2},
+]
+
+
+def test_store_round_trip(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'store.db'))
+    assert not store.has_table('player_games')
+
+    # processed data with timestamp of last modification as header
+    store.put('player_games', [1612137600.0, PLAYER_GAMES], indent=None)
+    assert store.has_table('player_games')
+    assert store.get('player_games') == ([1612137600.0, PLAYER_GAMES], None)
+    assert store.get_header('player_games') == [1612137600.0]
+
+    store.put('player_games', PLAYER_GAMES[:1])
+    assert store.get('player_games') == (PLAYER_GAMES[:1], 2)
+    store.close()
+
+
+def test_store_lookups(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'store.db'))
+    store.put('player_games', PLAYER_GAMES)
+
+    # lookups by indexed columns and other record attributes
+    assert store.find('player_games', player_id=101, team='ING') == [PLAYER_GAMES[0], PLAYER_GAMES[2]]
+    assert store.find('player_games', goals=0) == [PLAYER_GAMES[1]]
+    assert store.find('player_games', goals=None) == list()
+    assert store.find('player_games', team=None) == list()
+    assert store.find_between('player_games', '2021-01-02', '2021-01-03') == [PLAYER_GAMES[2]]
+    assert store.table('player_games').find_between(to_date='2021-01-01', team='MAN') == [PLAYER_GAMES[1]]
+
+    # lookups by missing values
+    shots = [{'game_id': 1, 'goalie': 201, 'situation': None}, {'game_id': 1, 'situation': '5v4'}]
+    store.put('shots', shots)
+    assert store.find('shots', goalie=None) == shots[1:]
+    assert store.find('shots', game_id=1, situation=None) == shots[:1]
+    store.close()
+
+
+def test_store_json(tmp_path, monkeypatch):
+    monkeypatch.setattr(sqlite_store, 'CONFIG', {'sqlite_store': True})
+    monkeypatch.setattr(sqlite_store, 'OPEN_STORES', dict())
+    tgt_path = str(tmp_path / 'del_player_game_stats.json')
+
+    # only processed data kept in the store is stored
+    assert not store_json(str(tmp_path / 'del_team_game_stats.json'), PLAYER_GAMES)
+    assert not is_stored(tgt_path)
+    assert store_json(tgt_path, PLAYER_GAMES)
+    assert is_stored(tgt_path)
+    assert load_stored_json(tgt_path) == PLAYER_GAMES
+    assert not os.path.isfile(tgt_path)
+    assert open_store_table(str(tmp_path), 'player_games').find(game_id=2) == PLAYER_GAMES[2:]
+    assert open_store_table(str(tmp_path), 'shots') is None
+
+    for store in sqlite_store.OPEN_STORES.values():
+        store.close()
+
+
+def test_store_modified(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'store.db'))
+    start = time.time()
+    store.put('player_games', PLAYER_GAMES)
+    assert start <= store.get_modified('player_games') <= time.time()
+    store.close()
+
+    # registering time of last modification in stores created without it
+    conn = sqlite3.connect(str(tmp_path / 'legacy.db'))
+    conn.execute("CREATE TABLE store_tables (name TEXT PRIMARY KEY, header TEXT, indent INTEGER)")
+    conn.execute("INSERT INTO store_tables VALUES ('games', NULL, 2)")
+    conn.commit()
+    conn.close()
+    store = SQLiteStore(str(tmp_path / 'legacy.db'))
+    assert store.get_modified('games') is None
+    store.put('games', list())
+    assert store.get_modified('games') >= start
+    store.close()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from synthetic_season import GameTask, create_teams, generate_game  # noqa: E402
+
+TEAMS = create_teams(2, 0)
+
+
+def get_task(tgt_dir, game_id, game_type=1):
+    return GameTask(
+        str(tgt_dir), 0, 2020, game_type, game_id, datetime(2021, 1, 10, 19, 30), '1', TEAMS[0], TEAMS[1])
+
+
+def load_raw_data(tgt_dir, category, game_type, file_name):
+    return json.loads(open(os.path.join(str(tgt_dir), category, '2020', str(game_type), file_name)).read())
+
+
+def test_generate_game_deterministic(tmp_path):
+    result = generate_game(get_task(tmp_path / 'a', 1))
+    assert generate_game(get_task(tmp_path / 'b', 1)) == result
+    for category in ['game_info', 'game_events', 'shifts', 'shots', 'faceoffs']:
+        assert load_raw_data(tmp_path / 'a', category, 1, '1.json') == load_raw_data(
+            tmp_path / 'b', category, 1, '1.json')
+
+
+def test_generate_game_consistent(tmp_path):
+    for game_type in [1, 3]:
+        for game_id in range(1, 11):
+            result = generate_game(get_task(tmp_path, game_id, game_type))
+            game_info = load_raw_data(tmp_path, 'game_info', game_type, "%d.json" % game_id)
+            final = game_info['results']['score']['final']
+            assert (final['score_home'], final['score_guest']) == (result.home_score, result.road_score)
+            assert final['score_home'] != final['score_guest']
+
+            # all goals (including a game-winning shootout goal) are registered
+            # in event data
+            game_events = load_raw_data(tmp_path, 'game_events', game_type, "%d.json" % game_id)
+            goals = [event for period in game_events.values() for event in period if event['type'] == 'goal']
+            assert goals[-1]['data']['currentScore'] == "%d:%d" % (result.home_score, result.road_score)
+            assert ('shootout' in game_events) == result.shootout
+            assert game_type == 1 or not result.shootout
+
+            shots = load_raw_data(tmp_path, 'shots', game_type, "%d.json" % game_id)['match']['shots']
+            for team in TEAMS:
+                file_name = "%d_%d.json" % (game_id, team.team_id)
+                team_shots = [shot for shot in shots if shot['team_id'] == team.team_id]
+                team_stats = load_raw_data(tmp_path, 'game_team_stats', game_type, file_name)
+                assert team_stats['shotsAttempts'] == len(team_shots)
+                assert team_stats['shotsOnGoal'] == len([
+                    shot for shot in team_shots if shot['match_shot_resutl_id'] in (1, 4)])
+                player_stats = load_raw_data(tmp_path, 'game_player_stats', game_type, file_name)
+                assert sum(sum(plr['statistics']['goals'].values()) for plr in player_stats) == len([
+                    shot for shot in team_shots if shot['match_shot_resutl_id'] == 4])